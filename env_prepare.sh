@@ -66,12 +66,14 @@ start_server() {
   # 后台启动 vLLM OpenAI 兼容服务；日志追加到文件
   # --served-model-name 使 /v1/models 返回的 id 与 config 中 model_name 一致
   # 显存不足时可调低 --gpu-memory-utilization（默认 0.9）
+  # --enable-prefix-caching：各请求共享的 system/topics 前缀只做一次 prefill
   nohup python -u -m vllm.entrypoints.openai.api_server \
     --host 0.0.0.0 \
     --port "$PORT" \
     --model "$MODEL_DIR" \
     --served-model-name "$MODEL_NAME" \
     --gpu-memory-utilization 0.85 \
+    --enable-prefix-caching \
     >> "$LOG_FILE" 2>&1 &
   echo $! > "$PID_FILE"
   echo "     PID: $(cat "$PID_FILE")，日志: $LOG_FILE"
@@ -63,7 +63,7 @@ def main() -> int:
         "abstract": "We propose a method to compress KV-cache in transformer inference, reducing memory and improving throughput for LLM serving.",
     }
 
-    client = OpenAI(base_url=base_url, api_key=api_key, timeout=timeout_s)
+    client = OpenAI(base_url=base_url, api_key=api_key, timeout=timeout_s, max_retries=0)
     messages = model_client.build_stage1_prompt(topics_list, paper)
 
     print("Sending Stage1 request to vLLM...")
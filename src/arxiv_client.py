@@ -1,20 +1,34 @@
 """
 Fetch daily arXiv papers per category with date filtering. Retries with exponential backoff.
+Queries the arXiv Atom API directly (one request per category) and parses it with feedparser.
 """
 
+import calendar
 import logging
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Any
-from urllib.parse import urljoin
+from urllib.parse import urlencode
 
-import arxiv
+import feedparser
+import requests
+
+from .ratelimit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
 # Base URL for PDFs
 ARXIV_ABS_BASE = "https://arxiv.org/abs/"
 ARXIV_PDF_BASE = "https://arxiv.org/pdf/"
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+# The API serves at most 2000 entries per request (validate_config rejects larger values)
+_MAX_RESULTS_PER_REQUEST = 2000
+
+_WHITESPACE = re.compile(r"\s+")
+_SESSION = requests.Session()
 
 
 def _parse_arxiv_id(entry_id: str) -> str:
@@ -23,8 +37,12 @@ def _parse_arxiv_id(entry_id: str) -> str:
 
 
 def _is_rate_limit(err: Exception) -> bool:
-    """Check if error is HTTP 429 (rate limit). arxiv.HTTPError uses .status."""
-    code = getattr(err, "status", None) or getattr(err, "status_code", None) or getattr(err, "code", None)
+    """Check if error is HTTP 429 (rate limit). requests.HTTPError carries .response.status_code."""
+    response = getattr(err, "response", None)
+    code = (
+        getattr(response, "status_code", None)
+        or getattr(err, "status", None) or getattr(err, "status_code", None) or getattr(err, "code", None)
+    )
     if code == 429:
         return True
     if "429" in str(err):
@@ -51,6 +69,95 @@ def _effective_days_back(days_back: int) -> int:
     return days_back
 
 
+def _to_datetime(ts: time.struct_time | None) -> datetime | None:
+    return datetime.fromtimestamp(calendar.timegm(ts), tz=timezone.utc) if ts else None
+
+
+def _parse_feed(content: bytes, cutoff: datetime) -> list[dict[str, Any]]:
+    """Convert an arXiv API Atom feed into paper dicts, dropping entries published before cutoff."""
+    feed = feedparser.parse(content)
+    if not feed.entries and int(feed.feed.get("opensearch_totalresults", 0) or 0) > 0:
+        # arXiv occasionally returns an empty page for a non-empty result set; retry
+        raise RuntimeError("arXiv API returned an unexpectedly empty page")
+    papers: list[dict[str, Any]] = []
+    for entry in feed.entries:
+        entry_id = entry.get("id")
+        if not entry_id:
+            continue
+        published = _to_datetime(entry.get("published_parsed"))
+        if published and published < cutoff:
+            continue
+        updated = _to_datetime(entry.get("updated_parsed"))
+        aid = _parse_arxiv_id(entry_id)
+        pdf_url = next(
+            (link.get("href") for link in entry.get("links", []) if link.get("title") == "pdf"),
+            None,
+        )
+        papers.append({
+            "arxiv_id": aid,
+            "title": _WHITESPACE.sub(" ", entry.get("title", "")),
+            "authors": [a.get("name", "") for a in entry.get("authors", [])],
+            "categories": [t.get("term") for t in entry.get("tags", [])],
+            "published": published.isoformat() if published else "",
+            "updated": updated.isoformat() if updated else "",
+            "abstract": entry.get("summary", ""),
+            "pdf_url": pdf_url or (ARXIV_PDF_BASE + aid + ".pdf"),
+        })
+    return papers
+
+
+@lru_cache(maxsize=128)
+def _category_query_url(cat: str, max_results: int) -> str:
+    """API URL for a category's newest submissions; depends only on (cat, max_results)."""
+    return ARXIV_API_URL + "?" + urlencode({
+        "search_query": f"cat:{cat}",
+        "sortBy": "submittedDate",
+        "sortOrder": "descending",
+        "start": 0,
+        "max_results": min(max_results, _MAX_RESULTS_PER_REQUEST),
+    })
+
+
+def _fetch_category(
+    cat: str,
+    max_results: int,
+    cutoff: datetime,
+    max_retries: int,
+    base_delay: float,
+    limiter: TokenBucket | None = None,
+) -> list[dict[str, Any]]:
+    """Fetch one category's newest papers published after cutoff, retrying with backoff."""
+    url = _category_query_url(cat, max_results)
+    for attempt in range(max_retries):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            r = _SESSION.get(url, timeout=60)
+            r.raise_for_status()
+            papers = _parse_feed(r.content, cutoff)
+            logger.info("Fetched category %s: %d papers", cat, len(papers))
+            return papers
+        except Exception as e:
+            if _is_rate_limit(e):
+                delay = 60.0 * (2 ** attempt)  # 60s, 120s, 240s, ... for 429
+                logger.warning(
+                    "arXiv rate limit (429) for %s (attempt %s/%s); retry in %.0fs",
+                    cat, attempt + 1, max_retries, delay,
+                )
+            else:
+                delay = base_delay * (2 ** attempt)
+                logger.warning(
+                    "arXiv fetch failed for %s (attempt %s/%s): %s; retry in %.1fs",
+                    cat, attempt + 1, max_retries, e, delay,
+                )
+            if attempt == max_retries - 1:
+                raise
+            if limiter is not None and _is_rate_limit(e):
+                limiter.drain()
+            time.sleep(delay)
+    return []
+
+
 def fetch_papers(
     categories: list[str],
     max_results_per_category: int,
@@ -58,79 +165,55 @@ def fetch_papers(
     max_retries: int = 5,
     base_delay: float = 2.0,
     delay_between_categories: float = 3.0,
+    max_workers: int = 1,
 ) -> list[dict[str, Any]]:
     """
     Fetch papers from arXiv for each category, filtered by published date within days_back.
     Returns list of dicts: arxiv_id, title, authors, categories, published, updated, abstract, pdf_url.
-    Uses longer backoff on HTTP 429 (rate limit) and a delay between categories to avoid throttling.
+    Uses longer backoff on HTTP 429 (rate limit). Request starts (including retries) share one
+    token bucket allowing a request every delay_between_categories seconds, to avoid throttling.
     Automatically extends days_back on Mondays to compensate for the weekend gap.
+
+    With max_workers > 1, categories are fetched concurrently by a thread pool; results are
+    merged in category order so the output matches the sequential path.
     """
     days_back = _effective_days_back(days_back)
     cutoff = datetime.now(timezone.utc) - timedelta(days=days_back)
     logger.info("Fetching arXiv papers (days_back=%d, cutoff=%s)", days_back, cutoff.date())
-    seen_ids: set[str] = set()
-    all_papers: list[dict[str, Any]] = []
-
-    for i, cat in enumerate(categories):
-        if i > 0:
-            time.sleep(delay_between_categories)
-        query = f"cat:{cat}"
-        before = len(all_papers)
-        for attempt in range(max_retries):
-            try:
-                client = arxiv.Client()
-                search = arxiv.Search(
-                    query=query,
-                    sort_by=arxiv.SortCriterion.SubmittedDate,
-                    sort_order=arxiv.SortOrder.Descending,
-                    max_results=max_results_per_category,
+
+    limiter = TokenBucket.per_interval(delay_between_categories) if delay_between_categories > 0 else None
+
+    per_category: list[list[dict[str, Any]]] = []
+    if max_workers <= 1 or len(categories) <= 1:
+        for cat in categories:
+            per_category.append(_fetch_category(
+                cat, max_results_per_category, cutoff, max_retries, base_delay, limiter,
+            ))
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(categories))) as executor:
+            futures = [
+                executor.submit(
+                    _fetch_category, cat, max_results_per_category, cutoff, max_retries, base_delay, limiter,
                 )
-                for result in client.results(search):
-                    aid = _parse_arxiv_id(result.entry_id)
-                    if aid in seen_ids:
-                        continue
-                    pub = result.published
-                    if pub and pub.replace(tzinfo=timezone.utc) < cutoff:
-                        continue
-                    seen_ids.add(aid)
-                    cat_list = [c for c in result.categories]
-                    all_papers.append({
-                        "arxiv_id": aid,
-                        "title": result.title or "",
-                        "authors": [a.name for a in result.authors],
-                        "categories": cat_list,
-                        "published": (result.published or result.updated).isoformat() if result.published else "",
-                        "updated": result.updated.isoformat() if result.updated else "",
-                        "abstract": result.summary or "",
-                        "pdf_url": result.pdf_url or (ARXIV_PDF_BASE + aid + ".pdf"),
-                    })
-                logger.info("Fetched category %s: %d papers", cat, len(all_papers) - before)
-                break
-            except Exception as e:
-                if _is_rate_limit(e):
-                    delay = 60.0 * (2 ** attempt)  # 60s, 120s, 240s, ... for 429
-                    logger.warning(
-                        "arXiv rate limit (429) for %s (attempt %s/%s); retry in %.0fs",
-                        cat, attempt + 1, max_retries, delay,
-                    )
-                else:
-                    delay = base_delay * (2 ** attempt)
-                    logger.warning(
-                        "arXiv fetch failed for %s (attempt %s/%s): %s; retry in %.1fs",
-                        cat, attempt + 1, max_retries, e, delay,
-                    )
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(delay)
+                for cat in categories
+            ]
+            per_category = [f.result() for f in futures]
 
     # Deduplicate by arxiv_id (in case same paper in multiple categories)
+    # Cross-listed papers collect categories in an insertion-ordered dict, converted once at the end
     by_id: dict[str, dict[str, Any]] = {}
-    for p in all_papers:
-        aid = p["arxiv_id"]
-        if aid not in by_id:
-            by_id[aid] = p
-        else:
-            by_id[aid]["categories"] = list(set(by_id[aid]["categories"] + p["categories"]))
+    merged_categories: dict[str, dict[str, None]] = {}
+    for papers in per_category:
+        for p in papers:
+            aid = p["arxiv_id"]
+            if aid not in by_id:
+                by_id[aid] = p
+            else:
+                if aid not in merged_categories:
+                    merged_categories[aid] = dict.fromkeys(by_id[aid]["categories"])
+                merged_categories[aid].update(dict.fromkeys(p["categories"]))
+    for aid, cats in merged_categories.items():
+        by_id[aid]["categories"] = list(cats)
 
     out = list(by_id.values())
     logger.info("Total unique papers fetched: %d", len(out))
@@ -6,14 +6,17 @@ Returns a unified list of blog post dicts for the pipeline.
 import hashlib
 import logging
 import re
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
+from urllib.parse import urljoin, urlparse
 
 import feedparser
 import requests
 from bs4 import BeautifulSoup
 
+from .ratelimit import TokenBucket
+
 logger = logging.getLogger(__name__)
 
 # Default request headers
@@ -25,6 +28,10 @@ _HEADERS = {
 # Timeout for HTTP requests (seconds)
 _REQUEST_TIMEOUT = 30
 
+# One keep-alive session for all sources (several sources share a host, e.g. RSS + index page)
+_SESSION = requests.Session()
+_SESSION.headers.update(_HEADERS)
+
 
 def _make_id(url: str) -> str:
     """Generate a stable short ID from a URL."""
@@ -49,7 +56,7 @@ def _clean_html(raw_html: str) -> str:
         return ""
     soup = BeautifulSoup(raw_html, "html.parser")
     text = soup.get_text(separator=" ", strip=True)
-    return re.sub(r"\s+", " ", text).strip()
+    return " ".join(text.split())
 
 
 # Pattern to strip prefixed category + date from titles like:
@@ -83,7 +90,7 @@ def fetch_rss(
       id, title, url, summary, published, source, source_type
     """
     try:
-        resp = requests.get(feed_url, headers=_HEADERS, timeout=_REQUEST_TIMEOUT)
+        resp = _SESSION.get(feed_url, timeout=_REQUEST_TIMEOUT)
         resp.raise_for_status()
     except Exception as e:
         logger.warning("RSS fetch failed for %s (%s): %s", source_name, feed_url, e)
@@ -149,7 +156,7 @@ def fetch_html_blog(
     Returns a list of blog post dicts (minimal: id, title, url, source).
     """
     try:
-        resp = requests.get(index_url, headers=_HEADERS, timeout=_REQUEST_TIMEOUT)
+        resp = _SESSION.get(index_url, timeout=_REQUEST_TIMEOUT)
         resp.raise_for_status()
     except Exception as e:
         logger.warning("HTML fetch failed for %s (%s): %s", source_name, index_url, e)
@@ -166,7 +173,6 @@ def fetch_html_blog(
 
         # Resolve relative URLs
         if href.startswith("/"):
-            from urllib.parse import urljoin
             href = urljoin(index_url, href)
 
         if href in seen_urls:
@@ -204,10 +210,41 @@ def fetch_html_blog(
     return posts
 
 
+def _fetch_source(
+    source: dict[str, Any],
+    days_back: int,
+    limiter: TokenBucket | None,
+) -> list[dict[str, Any]]:
+    """Fetch one configured source (rss or html); [] on a bad config entry."""
+    name = source.get("name", "Unknown")
+    stype = source.get("type", "rss")
+    url = source.get("url", "")
+    max_entries = int(source.get("max_entries", 20))
+
+    if not url:
+        logger.warning("Blog source %s has no URL, skipping", name)
+        return []
+    if stype not in ("rss", "html"):
+        logger.warning("Unknown blog source type %s for %s", stype, name)
+        return []
+
+    if limiter is not None:
+        limiter.acquire()
+
+    if stype == "rss":
+        return fetch_rss(name, url, days_back=days_back, max_entries=max_entries)
+    selector = source.get("article_selector", "article a, .post a, .blog-post a")
+    return fetch_html_blog(
+        name, url, article_selector=selector,
+        days_back=days_back, max_entries=max_entries,
+    )
+
+
 def fetch_all_blogs(
     blog_sources: list[dict[str, Any]],
     days_back: int = 3,
     delay_between_sources: float = 2.0,
+    max_workers: int = 4,
 ) -> list[dict[str, Any]]:
     """
     Fetch blog posts from all configured sources.
@@ -218,36 +255,33 @@ def fetch_all_blogs(
       url: str
       article_selector: str (optional, for html type)
       max_entries: int (optional, default 20)
+
+    Sources are fetched on up to max_workers threads; delay_between_sources still
+    spaces requests to the same host. Posts keep source order, deduplicated by URL.
     """
+    # delay_between_sources paces requests per host: sources on different sites don't wait
+    host_limiters: dict[str, TokenBucket] = {}
+    if delay_between_sources > 0:
+        for source in blog_sources:
+            host = urlparse(source.get("url", "")).netloc
+            if host not in host_limiters:
+                host_limiters[host] = TokenBucket.per_interval(delay_between_sources)
+
+    def _one(source: dict[str, Any]) -> list[dict[str, Any]]:
+        limiter = host_limiters.get(urlparse(source.get("url", "")).netloc)
+        return _fetch_source(source, days_back, limiter)
+
+    workers = max(1, min(max_workers, len(blog_sources)))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            per_source = list(executor.map(_one, blog_sources))
+    else:
+        per_source = [_one(source) for source in blog_sources]
+
     all_posts: list[dict[str, Any]] = []
     seen_urls: set[str] = set()
-
-    for i, source in enumerate(blog_sources):
-        name = source.get("name", "Unknown")
-        stype = source.get("type", "rss")
-        url = source.get("url", "")
-        max_entries = int(source.get("max_entries", 20))
-
-        if not url:
-            logger.warning("Blog source %s has no URL, skipping", name)
-            continue
-
-        if i > 0:
-            time.sleep(delay_between_sources)
-
-        if stype == "rss":
-            posts = fetch_rss(name, url, days_back=days_back, max_entries=max_entries)
-        elif stype == "html":
-            selector = source.get("article_selector", "article a, .post a, .blog-post a")
-            posts = fetch_html_blog(
-                name, url, article_selector=selector,
-                days_back=days_back, max_entries=max_entries,
-            )
-        else:
-            logger.warning("Unknown blog source type %s for %s", stype, name)
-            continue
-
-        # Deduplicate by URL across sources
+    # Deduplicate by URL across sources
+    for posts in per_source:
         for post in posts:
             if post["url"] not in seen_urls:
                 all_posts.append(post)
@@ -3,6 +3,7 @@ CLI entry point: run pipeline with config and topics paths.
 """
 
 import argparse
+import gc
 import logging
 import sys
 from pathlib import Path
@@ -28,6 +29,11 @@ def main() -> int:
         default=Path("topics.yaml"),
         help="Path to topics.yaml",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the LLM reply cache for this run (always call the model)",
+    )
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose logging")
     args = parser.parse_args()
 
@@ -35,8 +41,14 @@ def main() -> int:
 
     from .pipeline import run_pipeline
 
+    # The run is short-lived and allocates mostly transient dicts/strings (feed entries,
+    # LLM replies); collect the young generation far less often, and keep the objects
+    # created by imports out of every later full collection.
+    gc.set_threshold(50_000, 10, 10)
+    gc.freeze()
+
     try:
-        run_pipeline(args.config, args.topics)
+        run_pipeline(args.config, args.topics, use_cache=not args.no_cache)
         return 0
     except FileNotFoundError as e:
         logging.getLogger(__name__).error("%s", e)
@@ -2,27 +2,42 @@
 Load and validate config from YAML. Supports env overrides for secrets.
 """
 
+import copy
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 import yaml
 
+# libyaml C parser when available (much faster than the pure-Python SafeLoader)
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 # Env keys for overrides
 ENV_MODEL_API_KEY = "OPENAI_API_KEY"
 ENV_EMAIL_PASSWORD = "ARXIV_DIGEST_SMTP_PASSWORD"
 
+# arXiv API limit on entries per request (arxiv_client._MAX_RESULTS_PER_REQUEST)
+_ARXIV_MAX_RESULTS = 2000
 
-def load_config(path: str | Path) -> dict[str, Any]:
-    """Load config from YAML file. Apply env overrides for api_key and smtp_password."""
-    path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Config file not found: {path}")
+_REQUIRED_SECTION_ORDER = ("arxiv", "model", "thresholds", "storage", "email")
+_REQUIRED_SECTIONS = frozenset(_REQUIRED_SECTION_ORDER)
 
-    with open(path, encoding="utf-8") as f:
-        raw = yaml.safe_load(f)
-    if not raw:
-        raise ValueError("Config file is empty")
+
+def load_config(path: str | Path | IO) -> dict[str, Any]:
+    """Load config from YAML file. Apply env overrides for api_key and smtp_password.
+    The parsed file is cached and invalidated when its mtime or size changes; env overrides
+    are applied to a fresh copy on every call. An open file-like object is parsed directly, uncached.
+    """
+    if hasattr(path, "read"):
+        raw = _parse_config(path.read())
+    else:
+        path = Path(path)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Config file not found: {path}") from None
+        raw = copy.deepcopy(_parse_config_cached(str(path.resolve()), st.st_mtime_ns, st.st_size))
 
     # Apply env overrides
     if "model" in raw and os.environ.get(ENV_MODEL_API_KEY):
@@ -36,18 +51,37 @@ def load_config(path: str | Path) -> dict[str, Any]:
     return raw
 
 
+@lru_cache(maxsize=8)
+def _parse_config_cached(path: str, mtime_ns: int, size: int) -> dict[str, Any]:
+    """Parse the YAML file; mtime_ns and size are only part of the cache key."""
+    # Bytes go to libyaml as-is (it detects UTF-8/BOM) instead of being decoded in Python first
+    with open(path, "rb") as f:
+        return _parse_config(f.read())
+
+
+def _parse_config(data: str | bytes) -> dict[str, Any]:
+    raw = yaml.load(data, Loader=_YAML_LOADER)
+    if not raw:
+        raise ValueError("Config file is empty")
+    return raw
+
+
 def validate_config(c: dict[str, Any]) -> None:
     """Validate required sections and types. Raises ValueError on failure."""
-    required_sections = ("arxiv", "model", "thresholds", "storage", "email")
-    for key in required_sections:
-        if key not in c:
-            raise ValueError(f"config missing required section: {key}")
+    missing = _REQUIRED_SECTIONS - c.keys()
+    if missing:
+        # Report every missing section at once, in the order they appear in config.yaml
+        names = ", ".join(k for k in _REQUIRED_SECTION_ORDER if k in missing)
+        raise ValueError(f"config missing required section(s): {names}")
 
     arxiv_c = c["arxiv"]
     if not isinstance(arxiv_c.get("categories"), list) or not arxiv_c["categories"]:
         raise ValueError("config.arxiv.categories must be a non-empty list")
     if not isinstance(arxiv_c.get("max_results_per_category"), int):
         raise ValueError("config.arxiv.max_results_per_category must be an int")
+    # arxiv_client fetches each category in one API request, which the API caps
+    if not 1 <= arxiv_c["max_results_per_category"] <= _ARXIV_MAX_RESULTS:
+        raise ValueError(f"config.arxiv.max_results_per_category must be in [1,{_ARXIV_MAX_RESULTS}]")
     if arxiv_c.get("days_back") is not None and not isinstance(arxiv_c["days_back"], int):
         raise ValueError("config.arxiv.days_back must be an int or omitted")
 
@@ -59,6 +93,14 @@ def validate_config(c: dict[str, Any]) -> None:
         raise ValueError("config.model.temperature must be numeric")
     if model_c.get("timeout_s") is not None and not isinstance(model_c["timeout_s"], int):
         raise ValueError("config.model.timeout_s must be an int")
+    if model_c.get("context_tokens") is not None and (
+        not isinstance(model_c["context_tokens"], int) or model_c["context_tokens"] <= 0
+    ):
+        raise ValueError("config.model.context_tokens must be a positive int")
+    if model_c.get("max_retries") is not None and (
+        not isinstance(model_c["max_retries"], int) or model_c["max_retries"] < 1
+    ):
+        raise ValueError("config.model.max_retries must be an int >= 1")
 
     th = c["thresholds"]
     if "relevance" not in th or not isinstance(th["relevance"], (int, float)):
@@ -1,15 +1,22 @@
 """
 SQLite persistence for paper processing state. Idempotent and transaction-safe.
-Uses WAL mode for concurrent write support.
+Uses WAL mode for concurrent write support. Connections are opened once per
+thread and database file, then reused across calls. Every db_path argument may also
+be an open sqlite3.Connection (e.g. an in-memory DB in tests), which is used as-is.
 """
 
+import functools
 import logging
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+from . import fastjson
+
 logger = logging.getLogger(__name__)
 
 # Status enum values
@@ -34,17 +41,38 @@ IN_PROGRESS_STATUSES = frozenset(
 )
 
 
+# A database file, or an already open connection to use directly
+DBPath = str | Path | sqlite3.Connection
+
+# Shared SQL text: sqlite3 caches prepared statements per connection keyed on the exact
+# string, so hot queries are built once here instead of per call.
+_SQL_UPSERT_PAPER = """INSERT INTO papers (arxiv_id, title, categories, status, created_at, updated_at, retry_count)
+   VALUES (?, ?, ?, ?, ?, ?, 0)
+   ON CONFLICT(arxiv_id) DO UPDATE SET
+       title = excluded.title,
+       categories = excluded.categories,
+       updated_at = excluded.updated_at"""
+_SQL_GET_STATUS = "SELECT status FROM papers WHERE arxiv_id = ?"
+_PROCESSED_PARAMS = tuple(PROCESSED_STATUSES)
+_PROCESSED_PH = ",".join("?" * len(_PROCESSED_PARAMS))
+# Bound-parameter chunk for IN (...) lookups; well under SQLite's limit (999 on older builds)
+_IN_CHUNK = 512
+
+
 def _utc_now() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 
-def ensure_db(db_path: str | Path) -> None:
+def ensure_db(db_path: DBPath) -> None:
     """Create DB file and papers table if they do not exist. Run migrations."""
-    path = Path(db_path)
-    path.parent.mkdir(parents=True, exist_ok=True)
+    is_conn = isinstance(db_path, sqlite3.Connection)
+    path = db_path if is_conn else Path(db_path)
+    if not is_conn:
+        path.parent.mkdir(parents=True, exist_ok=True)
     with _conn(path) as conn:
-        # Enable WAL mode for concurrent read/write access
-        conn.execute("PRAGMA journal_mode=WAL")
+        if not is_conn:
+            # Enable WAL mode for concurrent read/write access (a caller's connection keeps its mode)
+            conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("""
             CREATE TABLE IF NOT EXISTS papers (
                 arxiv_id TEXT PRIMARY KEY,
@@ -56,7 +84,8 @@ def ensure_db(db_path: str | Path) -> None:
                 stage1_json TEXT,
                 stage2_json TEXT,
                 error_message TEXT,
-                retry_count INTEGER DEFAULT 0
+                retry_count INTEGER DEFAULT 0,
+                topics_hash TEXT
             )
         """)
         conn.execute(
@@ -68,6 +97,12 @@ def ensure_db(db_path: str | Path) -> None:
             logger.info("Migration: added retry_count column")
         except sqlite3.OperationalError:
             pass  # Column already exists
+        # Migration: topics_hash records which topic set stage1_json was classified against
+        try:
+            conn.execute("ALTER TABLE papers ADD COLUMN topics_hash TEXT")
+            logger.info("Migration: added topics_hash column")
+        except sqlite3.OperationalError:
+            pass
 
         # Blog posts table (separate from papers — no PDF, no Stage1/2)
         conn.execute("""
@@ -86,22 +121,91 @@ def ensure_db(db_path: str | Path) -> None:
         conn.execute(
             "CREATE INDEX IF NOT EXISTS idx_blog_status ON blog_posts(status)"
         )
+
+        # LLM reply cache: sha256(model + messages) -> reply text that parsed OK
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
         conn.commit()
-    logger.info("Database ready at %s", path)
+    logger.info("Database ready at %s", "<connection>" if is_conn else path)
 
 
-@contextmanager
-def _conn(db_path: str | Path):
-    conn = sqlite3.connect(str(db_path), timeout=30)
+# Per-thread cache: db path -> (connection, (st_dev, st_ino) of the file it was opened on)
+_local = threading.local()
+
+
+def _open(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30)
     conn.row_factory = sqlite3.Row
+    # Safe with WAL: only a power loss can drop the last commits, never corrupt the DB
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # Per-connection, so set here rather than in ensure_db: 64 MiB page cache, 256 MiB mmap reads
+    conn.execute("PRAGMA cache_size=-64000")
+    if path != ":memory:":
+        conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+def _file_id(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+@contextmanager
+def _conn(db_path: DBPath):
+    """
+    Yield this thread's cached connection for db_path, opening it on first use.
+    The connection is reopened if the DB file was deleted or replaced since.
+    A connection passed as db_path is yielded itself (its row_factory set to sqlite3.Row).
+    Uncommitted changes are rolled back when the block exits.
+    """
+    if isinstance(db_path, sqlite3.Connection):
+        db_path.row_factory = sqlite3.Row
+        try:
+            yield db_path
+        finally:
+            if db_path.in_transaction:
+                db_path.rollback()
+        return
+    key = str(db_path)
+    cache: dict[str, tuple[sqlite3.Connection, tuple[int, int] | None]] | None = getattr(_local, "conns", None)
+    if cache is None:
+        cache = _local.conns = {}
+    file_id = _file_id(key)
+    entry = cache.get(key)
+    if entry is None or file_id is None or entry[1] != file_id:
+        if entry is not None:
+            entry[0].close()
+        conn = _open(key)
+        cache[key] = (conn, _file_id(key))
+    else:
+        conn = entry[0]
     try:
         yield conn
     finally:
+        if conn.in_transaction:
+            conn.rollback()
+
+
+def close_connections() -> None:
+    """Close the calling thread's cached connections."""
+    cache = getattr(_local, "conns", None) or {}
+    for conn, _ in cache.values():
         conn.close()
+    cache.clear()
 
 
 def upsert_paper_metadata(
-    db_path: str | Path,
+    db_path: DBPath,
     arxiv_id: str,
     title: str,
     categories: str,
@@ -110,80 +214,94 @@ def upsert_paper_metadata(
     """Insert or update paper row. If row exists, update title/categories/updated_at only."""
     now = _utc_now()
     with _conn(db_path) as conn:
-        cur = conn.execute(
-            "SELECT status FROM papers WHERE arxiv_id = ?", (arxiv_id,)
+        conn.execute(
+            _SQL_UPSERT_PAPER,
+            (arxiv_id, title, categories, status, now, now),
         )
-        row = cur.fetchone()
-        if row is None:
-            conn.execute(
-                """INSERT INTO papers (arxiv_id, title, categories, status, created_at, updated_at, retry_count)
-                   VALUES (?, ?, ?, ?, ?, ?, 0)""",
-                (arxiv_id, title, categories, status, now, now),
-            )
-            logger.debug("Inserted paper %s status=%s", arxiv_id, status)
-        else:
-            conn.execute(
-                """UPDATE papers SET title = ?, categories = ?, updated_at = ?
-                   WHERE arxiv_id = ?""",
-                (title, categories, now, arxiv_id),
-            )
-            logger.debug("Updated metadata for paper %s", arxiv_id)
         conn.commit()
+    logger.debug("Upserted paper %s", arxiv_id)
+
+
+def upsert_many(
+    db_path: DBPath,
+    rows: list[tuple[str, str, str, str]],
+) -> None:
+    """Bulk upsert_paper_metadata for (arxiv_id, title, categories, status) rows in one transaction."""
+    if not rows:
+        return
+    now = _utc_now()
+    with _conn(db_path) as conn:
+        conn.executemany(
+            _SQL_UPSERT_PAPER,
+            [(aid, title, cats, status, now, now) for aid, title, cats, status in rows],
+        )
+        conn.commit()
+    logger.debug("Upserted %d papers", len(rows))
 
 
 def mark_status(
-    db_path: str | Path,
-    arxiv_id: str,
+    db_path: DBPath,
+    arxiv_id: str | list[str],
     status: str,
     stage1_json: str | None = None,
     stage2_json: str | None = None,
     error_message: str | None = None,
+    topics_hash: str | None = None,
 ) -> None:
-    """Set status and optional stage JSON / error. Uses transaction.
+    """Set status and optional stage JSON / error / topics hash. Uses transaction.
     When marking FAILED, increments retry_count automatically.
+    arxiv_id may be a list to update many papers in a single transaction.
     """
     now = _utc_now()
+    ids = [arxiv_id] if isinstance(arxiv_id, str) else list(arxiv_id)
+    if not ids:
+        return
+    # Only touch the columns actually provided (avoids rewriting large JSON blobs)
+    sets = ["status = ?", "updated_at = ?"]
+    params: list[Any] = [status, now]
+    for column, value in (
+        ("stage1_json", stage1_json),
+        ("stage2_json", stage2_json),
+        ("error_message", error_message),
+        ("topics_hash", topics_hash),
+    ):
+        if value is not None:
+            sets.append(f"{column} = ?")
+            params.append(value)
+    if status == FAILED:
+        sets.append("retry_count = retry_count + 1")
+    sql = f"UPDATE papers SET {', '.join(sets)} WHERE arxiv_id = ?"
     with _conn(db_path) as conn:
-        if status == FAILED:
-            conn.execute(
-                """UPDATE papers SET status = ?, updated_at = ?,
-                   stage1_json = COALESCE(?, stage1_json),
-                   stage2_json = COALESCE(?, stage2_json),
-                   error_message = COALESCE(?, error_message),
-                   retry_count = retry_count + 1
-                   WHERE arxiv_id = ?""",
-                (status, now, stage1_json, stage2_json, error_message, arxiv_id),
-            )
+        if len(ids) == 1:
+            cur = conn.execute(sql, (*params, ids[0]))
         else:
-            conn.execute(
-                """UPDATE papers SET status = ?, updated_at = ?,
-                   stage1_json = COALESCE(?, stage1_json),
-                   stage2_json = COALESCE(?, stage2_json),
-                   error_message = COALESCE(?, error_message)
-                   WHERE arxiv_id = ?""",
-                (status, now, stage1_json, stage2_json, error_message, arxiv_id),
-            )
-        if conn.total_changes == 0:
-            logger.warning("mark_status: no row updated for arxiv_id=%s", arxiv_id)
+            cur = conn.executemany(sql, [(*params, aid) for aid in ids])
+        if len(ids) == 1 and cur.rowcount == 0:
+            logger.warning("mark_status: no row updated for arxiv_id=%s", ids[0])
+        elif cur.rowcount < len(ids):
+            logger.warning("mark_status: %d of %d papers not found", len(ids) - cur.rowcount, len(ids))
         conn.commit()
-    logger.info("Paper %s -> %s", arxiv_id, status)
+    if len(ids) == 1:
+        logger.info("Paper %s -> %s", ids[0], status)
+    else:
+        logger.info("%d papers -> %s", len(ids), status)
 
 
-def get_status(db_path: str | Path, arxiv_id: str) -> str | None:
+def get_status(db_path: DBPath, arxiv_id: str) -> str | None:
     """Return current status for arxiv_id, or None if not found."""
     with _conn(db_path) as conn:
-        cur = conn.execute("SELECT status FROM papers WHERE arxiv_id = ?", (arxiv_id,))
+        cur = conn.execute(_SQL_GET_STATUS, (arxiv_id,))
         row = cur.fetchone()
     return row["status"] if row else None
 
 
-def is_processed(db_path: str | Path, arxiv_id: str) -> bool:
+def is_processed(db_path: DBPath, arxiv_id: str) -> bool:
     """True if paper should not be processed again (EMAILED, SKIPPED, or STAGE2_OK)."""
     s = get_status(db_path, arxiv_id)
     return s in PROCESSED_STATUSES
 
 
-def is_in_progress_or_processed(db_path: str | Path, arxiv_id: str) -> bool:
+def is_in_progress_or_processed(db_path: DBPath, arxiv_id: str) -> bool:
     """True if we should skip this paper entirely.
 
     Only truly-done papers are skipped:
@@ -214,7 +332,33 @@ def is_in_progress_or_processed(db_path: str | Path, arxiv_id: str) -> bool:
     return False
 
 
-def get_paper(db_path: str | Path, arxiv_id: str) -> dict[str, Any] | None:
+def filter_done_ids(db_path: DBPath, arxiv_ids: list[str]) -> set[str]:
+    """Bulk is_in_progress_or_processed: return the subset of arxiv_ids to skip entirely.
+
+    One indexed lookup per chunk of ids instead of one query per paper.
+    """
+    done: set[str] = set()
+    with _conn(db_path) as conn:
+        for i in range(0, len(arxiv_ids), _IN_CHUNK):
+            chunk = arxiv_ids[i : i + _IN_CHUNK]
+            # Pad to a power of two (repeating an id leaves IN unchanged) so only a
+            # handful of distinct statements exist and they stay in the statement cache
+            size = 1 << (len(chunk) - 1).bit_length()
+            chunk += chunk[:1] * (size - len(chunk))
+            cur = conn.execute(_filter_done_sql(size), (*chunk, *_PROCESSED_PARAMS, FAILED, MAX_RETRY_COUNT))
+            done.update(row["arxiv_id"] for row in cur.fetchall())
+    return done
+
+
+@functools.lru_cache(maxsize=None)
+def _filter_done_sql(n_ids: int) -> str:
+    return f"""SELECT arxiv_id FROM papers
+        WHERE arxiv_id IN ({",".join("?" * n_ids)})
+          AND (status IN ({_PROCESSED_PH})
+               OR (status = ? AND COALESCE(retry_count, 0) >= ?))"""
+
+
+def get_paper(db_path: DBPath, arxiv_id: str) -> dict[str, Any] | None:
     """Return full row as dict or None."""
     with _conn(db_path) as conn:
         cur = conn.execute("SELECT * FROM papers WHERE arxiv_id = ?", (arxiv_id,))
@@ -224,13 +368,12 @@ def get_paper(db_path: str | Path, arxiv_id: str) -> dict[str, Any] | None:
     return dict(row)
 
 
-def get_unemailed_summaries(db_path: str | Path) -> list[dict[str, Any]]:
+def get_unemailed_summaries(db_path: DBPath) -> list[dict[str, Any]]:
     """Return Stage-2 summaries for papers in STAGE2_OK state (finished but not yet emailed).
 
     This recovers papers whose Stage-2 succeeded but the digest email failed on a
     previous run, so they can be included in the next digest without re-running Stage 2.
     """
-    import json as _json
     with _conn(db_path) as conn:
         cur = conn.execute(
             "SELECT arxiv_id, stage2_json FROM papers WHERE status = ? AND stage2_json IS NOT NULL",
@@ -239,7 +382,7 @@ def get_unemailed_summaries(db_path: str | Path) -> list[dict[str, Any]]:
         results = []
         for row in cur.fetchall():
             try:
-                summary = _json.loads(row["stage2_json"])
+                summary = fastjson.loads(row["stage2_json"])
                 # Always use DB arxiv_id as authoritative paper_id
                 # (LLM may have generated wrong paper_id like "arXiv:..." or garbage)
                 summary["paper_id"] = row["arxiv_id"]
@@ -249,20 +392,18 @@ def get_unemailed_summaries(db_path: str | Path) -> list[dict[str, Any]]:
         return results
 
 
-def get_processed_titles(db_path: str | Path) -> set[str]:
+def get_processed_titles(db_path: DBPath) -> set[str]:
     """Return titles of papers in truly-done states (EMAILED, SKIPPED, STAGE2_OK) to detect
     cross-source duplicates. In-progress states (STAGE1_OK, STAGE1_RELEVANT, etc.) are excluded
     so stuck papers can be re-fetched and resume from checkpoint on the next run."""
-    statuses = tuple(PROCESSED_STATUSES)
-    placeholders = ",".join("?" * len(statuses))
     with _conn(db_path) as conn:
         cur = conn.execute(
-            f"SELECT title FROM papers WHERE status IN ({placeholders})", statuses
+            f"SELECT title FROM papers WHERE status IN ({_PROCESSED_PH})", _PROCESSED_PARAMS
         )
         return {row["title"] for row in cur.fetchall() if row["title"]}
 
 
-def get_run_stats(db_path: str | Path, since: str | None = None) -> dict[str, int]:
+def get_run_stats(db_path: DBPath, since: str | None = None) -> dict[str, int]:
     """Return counts grouped by status. Optionally filter by updated_at >= since."""
     with _conn(db_path) as conn:
         if since:
@@ -279,7 +420,7 @@ def get_run_stats(db_path: str | Path, since: str | None = None) -> dict[str, in
 # Blog posts
 # ──────────────────────────────────────────────────────────────────────────────
 
-def is_blog_post_seen(db_path: str | Path, url: str) -> bool:
+def is_blog_post_seen(db_path: DBPath, url: str) -> bool:
     """True if a blog post with this URL already exists in DB (any status)."""
     with _conn(db_path) as conn:
         cur = conn.execute("SELECT 1 FROM blog_posts WHERE url = ?", (url,))
@@ -287,7 +428,7 @@ def is_blog_post_seen(db_path: str | Path, url: str) -> bool:
 
 
 def upsert_blog_post(
-    db_path: str | Path,
+    db_path: DBPath,
     post_id: str,
     title: str,
     url: str,
@@ -308,7 +449,7 @@ def upsert_blog_post(
         conn.commit()
 
 
-def mark_blog_status(db_path: str | Path, post_id: str, status: str) -> None:
+def mark_blog_status(db_path: DBPath, post_id: str, status: str) -> None:
     """Update blog post status."""
     now = _utc_now()
     with _conn(db_path) as conn:
@@ -319,10 +460,41 @@ def mark_blog_status(db_path: str | Path, post_id: str, status: str) -> None:
         conn.commit()
 
 
-def get_unemailed_blog_posts(db_path: str | Path) -> list[dict[str, Any]]:
+def get_unemailed_blog_posts(db_path: DBPath) -> list[dict[str, Any]]:
     """Return blog posts in NEW status (not yet emailed)."""
     with _conn(db_path) as conn:
         cur = conn.execute(
             "SELECT * FROM blog_posts WHERE status = ?", (NEW,)
         )
         return [dict(row) for row in cur.fetchall()]
+
+
+def get_cached_response(db_path: DBPath, key: str, since: str | None = None) -> str | None:
+    """Return the cached LLM reply for key, or None (also None if older than since)."""
+    with _conn(db_path) as conn:
+        if since:
+            cur = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?", (key, since)
+            )
+        else:
+            cur = conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,))
+        row = cur.fetchone()
+        return row["response"] if row else None
+
+
+def put_cached_response(db_path: DBPath, key: str, model: str, response: str) -> None:
+    """Store (or refresh) an LLM reply in the cache."""
+    with _conn(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at) VALUES (?, ?, ?, ?)",
+            (key, model, response, _utc_now()),
+        )
+        conn.commit()
+
+
+def prune_cached_responses(db_path: DBPath, before: str) -> int:
+    """Delete cache entries created before the given timestamp. Returns rows removed."""
+    with _conn(db_path) as conn:
+        cur = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (before,))
+        conn.commit()
+        return cur.rowcount
@@ -4,15 +4,16 @@ Supports both plain-text (single paper) and HTML batch digest formats.
 """
 
 import html
-import json
 import logging
 import smtplib
 import ssl
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import time
+from email.message import EmailMessage
 from pathlib import Path
 from typing import Any
 
+from . import fastjson
+
 logger = logging.getLogger(__name__)
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -88,6 +89,12 @@ def _paper_link(paper_id: str) -> str:
     return f"https://arxiv.org/pdf/{paper_id}"
 
 
+def _bullet_list_html(items: list) -> str:
+    if not items:
+        return "<p class='section-body'><em>not reported</em></p>"
+    return "<ul class='bullet'>" + "".join([f"<li>{_h(item)}</li>" for item in items]) + "</ul>"
+
+
 def _build_paper_html(idx: int, summary: dict[str, Any]) -> str:
     paper_id = summary.get("paper_id", "")
     title = summary.get("title", "(No title)")
@@ -111,12 +118,6 @@ def _build_paper_html(idx: int, summary: dict[str, Any]) -> str:
         for t in relevant_topics
     )
 
-    def bullet_list(items: list) -> str:
-        if not items:
-            return "<p class='section-body'><em>not reported</em></p>"
-        lis = "".join(f"<li>{_h(item)}</li>" for item in items)
-        return f"<ul class='bullet'>{lis}</ul>"
-
     link = _paper_link(paper_id)
     return f"""
 <div class="paper" id="p{idx}">
@@ -133,15 +134,15 @@ def _build_paper_html(idx: int, summary: dict[str, Any]) -> str:
   <div class="section-title">动机</div>
   <p class="section-body">{_h(summary.get("motivation", ""))}</p>
   <div class="section-title">关键挑战</div>
-  {bullet_list(summary.get("key_challenges", []))}
+  {_bullet_list_html(summary.get("key_challenges", []))}
   <div class="section-title">方法</div>
   <p class="section-body">{_h(summary.get("approach", ""))}</p>
   <div class="section-title">假设与局限</div>
-  {bullet_list(summary.get("assumptions_limitations", []))}
+  {_bullet_list_html(summary.get("assumptions_limitations", []))}
   <div class="section-title">实验结果</div>
-  {bullet_list(summary.get("evidence_results", []))}
+  {_bullet_list_html(summary.get("evidence_results", []))}
   <div class="section-title">要点总结</div>
-  {bullet_list(summary.get("takeaways", []))}
+  {_bullet_list_html(summary.get("takeaways", []))}
   <a class="arxiv-link" href="{link}">→ 查看原文</a>
 </div>
 """
@@ -241,12 +242,15 @@ def format_html_digest(
     if stats:
         total = stats.get("total", "?")
         kw_skipped = stats.get("skipped_keyword", 0)
+        dup_skipped = stats.get("skipped_duplicate", 0)
         stage2_ok = stats.get("stage2_ok", n)
         failed = stats.get("stage2_failed", 0) + stats.get("stage1_failed", 0)
         abstract_only = stats.get("abstract_only", 0)
         parts = [f"共 <b>{total}</b> 篇候选 → <b>{n}</b> 篇相关"]
         if kw_skipped:
             parts.append(f"关键词预过滤 {kw_skipped} 篇")
+        if dup_skipped:
+            parts.append(f"重复去除 {dup_skipped} 篇")
         if abstract_only:
             parts.append(f"摘要直通 {abstract_only} 篇")
         if failed:
@@ -354,60 +358,155 @@ def format_html_digest(
 # Plain-text format (kept for backward compatibility / fallback)
 # ──────────────────────────────────────────────────────────────────────────────
 
+def _text_section(title: str, body: Any) -> str:
+    return f"--- {title} ---\n{body}"
+
+
+def _text_list_section(title: str, items: list[Any]) -> str:
+    return "\n".join([f"--- {title} ---", *(f"  - {item}" for item in items)])
+
+
 def format_email_body(
     summary: dict[str, Any],
     pdf_path: str | Path | None = None,
     include_json: bool = False,
 ) -> str:
     """Plain text body: sections + optional JSON at bottom."""
-    lines = [
-        f"Title: {summary.get('title', '')}",
-        f"Paper ID: {summary.get('paper_id', '')}",
-        f"Categories: {summary.get('categories', [])}",
+    sections = [
+        f"Title: {summary.get('title', '')}\n"
+        f"Paper ID: {summary.get('paper_id', '')}\n"
+        f"Categories: {summary.get('categories', [])}\n"
         f"Published: {summary.get('published', '')}",
-        "",
-        "--- Problem ---",
-        summary.get("problem", ""),
-        "",
-        "--- Motivation ---",
-        summary.get("motivation", ""),
-        "",
-        "--- Key challenges ---",
+        _text_section("Problem", summary.get("problem", "")),
+        _text_section("Motivation", summary.get("motivation", "")),
+        _text_list_section("Key challenges", summary.get("key_challenges", [])),
+        _text_section("Approach", summary.get("approach", "")),
+        _text_list_section("Assumptions / Limitations", summary.get("assumptions_limitations", [])),
+        _text_list_section("Evidence / Results", summary.get("evidence_results", [])),
+        _text_list_section("Takeaways", summary.get("takeaways", [])),
     ]
-    for c in summary.get("key_challenges", []):
-        lines.append(f"  - {c}")
-    lines.extend([
-        "",
-        "--- Approach ---",
-        summary.get("approach", ""),
-        "",
-        "--- Assumptions / Limitations ---",
-    ])
-    for a in summary.get("assumptions_limitations", []):
-        lines.append(f"  - {a}")
-    lines.extend([
-        "",
-        "--- Evidence / Results ---",
-    ])
-    for e in summary.get("evidence_results", []):
-        lines.append(f"  - {e}")
-    lines.extend([
-        "",
-        "--- Takeaways ---",
-    ])
-    for t in summary.get("takeaways", []):
-        lines.append(f"  - {t}")
     if pdf_path:
-        lines.extend(["", "--- PDF ---", str(pdf_path)])
+        sections.append(_text_section("PDF", pdf_path))
     if include_json:
-        lines.extend(["", "--- JSON ---", json.dumps(summary, ensure_ascii=False, indent=2)])
-    return "\n".join(lines)
+        sections.append(_text_section("JSON", fastjson.dumps(summary, indent=True)))
+    # Blank line between sections
+    return "\n\n".join(sections)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # SMTP sender
 # ──────────────────────────────────────────────────────────────────────────────
 
+def _build_message(
+    from_addr: str, to_addr: str, subject: str, body: str, is_html: bool,
+) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = from_addr
+    msg["To"] = to_addr
+    # base64 as before with MIMEText: safe for servers without 8BITMIME and for long HTML lines
+    msg.set_content(body, subtype="html" if is_html else "plain", charset="utf-8", cte="base64")
+    return msg
+
+
+def _smtp_connect(
+    smtp_host: str, smtp_port: int, smtp_user: str, smtp_password: str, use_tls: bool,
+) -> smtplib.SMTP:
+    """Open (and log in to) an SMTP connection. Caller must quit() it."""
+    context = ssl.create_default_context()
+    # 465 = implicit SSL (SMTP_SSL); 587 = explicit TLS (SMTP + STARTTLS)
+    if smtp_port == 465:
+        server: smtplib.SMTP = smtplib.SMTP_SSL(smtp_host, smtp_port, context=context)
+    else:
+        server = smtplib.SMTP(smtp_host, smtp_port)
+    try:
+        if smtp_port != 465 and use_tls:
+            server.starttls(context=context)
+        if smtp_user and smtp_password:
+            server.login(smtp_user, smtp_password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+# Reused connections idle longer than this are probed with NOOP before the next message
+_SMTP_IDLE_CHECK_S = 30.0
+
+
+def _smtp_alive(server: smtplib.SMTP) -> bool:
+    """NOOP round-trip; False if the server has dropped the connection."""
+    try:
+        return server.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def _smtp_close(server: smtplib.SMTP) -> None:
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+
+def send_digest_emails(
+    smtp_host: str,
+    smtp_port: int,
+    smtp_user: str,
+    smtp_password: str,
+    from_addr: str,
+    to_addr: str,
+    use_tls: bool,
+    messages: list[tuple[str, str]],
+    is_html: bool = False,
+) -> list[Exception | None]:
+    """
+    Send several (subject, body) emails over a single SMTP connection (one TLS handshake
+    and login). A connection left idle for a while is checked with NOOP before reuse;
+    if the server drops it mid-send, reconnects once and retries that message.
+    Returns one entry per message: None if sent, else the exception. Does not raise.
+    """
+    results: list[Exception | None] = []
+    server: smtplib.SMTP | None = None
+    last_used = 0.0
+    try:
+        for subject, body in messages:
+            msg = _build_message(from_addr, to_addr, subject, body, is_html)
+            error: Exception | None = None
+            for attempt in range(2):
+                try:
+                    if server is not None and time.monotonic() - last_used > _SMTP_IDLE_CHECK_S:
+                        if not _smtp_alive(server):
+                            logger.info("SMTP connection went stale; reconnecting")
+                            server.close()
+                            server = None
+                    if server is None:
+                        server = _smtp_connect(smtp_host, smtp_port, smtp_user, smtp_password, use_tls)
+                    # send_message serializes straight to bytes (no intermediate as_string() copy)
+                    server.send_message(msg, from_addr, [to_addr])
+                    last_used = time.monotonic()
+                    error = None
+                    logger.info("Email sent to %s: %s", to_addr, subject[:80])
+                    break
+                except smtplib.SMTPServerDisconnected as e:
+                    error = e
+                    server = None
+                    if attempt == 0:
+                        logger.warning("SMTP connection dropped (%s); reconnecting", e)
+                except Exception as e:
+                    error = e
+                    break
+            results.append(error)
+            if error is not None and server is None:
+                # Could not (re)connect: do not keep hammering the server for the rest
+                results.extend([error] * (len(messages) - len(results)))
+                break
+    finally:
+        if server is not None:
+            _smtp_close(server)
+    return results
+
+
 def send_digest_email(
     smtp_host: str,
     smtp_port: int,
@@ -421,29 +520,9 @@ def send_digest_email(
     is_html: bool = False,
 ) -> None:
     """Send a digest email. Set is_html=True for HTML content. Raises on failure."""
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = from_addr
-    msg["To"] = to_addr
-    content_type = "html" if is_html else "plain"
-    msg.attach(MIMEText(body, content_type, "utf-8"))
-
-    context = ssl.create_default_context()
-    # 465 = implicit SSL (SMTP_SSL); 587 = explicit TLS (SMTP + STARTTLS)
-    if smtp_port == 465:
-        with smtplib.SMTP_SSL(smtp_host, smtp_port, context=context) as server:
-            if smtp_user and smtp_password:
-                server.login(smtp_user, smtp_password)
-            server.sendmail(from_addr, [to_addr], msg.as_string())
-    elif use_tls:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls(context=context)
-            if smtp_user and smtp_password:
-                server.login(smtp_user, smtp_password)
-            server.sendmail(from_addr, [to_addr], msg.as_string())
-    else:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            if smtp_user and smtp_password:
-                server.login(smtp_user, smtp_password)
-            server.sendmail(from_addr, [to_addr], msg.as_string())
-    logger.info("Email sent to %s: %s", to_addr, subject[:80])
+    (error,) = send_digest_emails(
+        smtp_host, smtp_port, smtp_user, smtp_password, from_addr, to_addr, use_tls,
+        [(subject, body)], is_html=is_html,
+    )
+    if error is not None:
+        raise error
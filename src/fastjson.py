@@ -0,0 +1,39 @@
+"""
+JSON helpers backed by orjson when it is installed (optional), else the stdlib json module.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+
+def loads(s: str | bytes) -> Any:
+    """
+    Parse JSON. Input orjson rejects (invalid JSON, NaN, huge ints, ...) is re-parsed by the
+    stdlib, so failures always raise json.JSONDecodeError with the stdlib's messages, which
+    model_client's repair heuristics match on.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Serialize to a str like json.dumps(obj, ensure_ascii=False[, indent=2]).
+    Compact output has no spaces after separators when orjson is used.
+    """
+    if orjson is not None:
+        try:
+            option = orjson.OPT_INDENT_2 if indent else 0
+            return orjson.dumps(obj, option=option).decode("utf-8")
+        except TypeError:
+            pass  # e.g. non-str dict keys or ints beyond 64 bits: let the stdlib handle it
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
@@ -0,0 +1,57 @@
+"""
+Persistent exact-match cache for LLM replies, stored in the papers DB.
+
+Keyed by sha256(model + temperature + messages). Callers only store replies that parsed,
+so a cache hit never replays a broken answer and retries still reach the server.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model_name: str, temperature: float, messages: list[dict[str, str]]) -> str:
+    """
+    Stable hash of the model name, sampling temperature and the full message list.
+    Contents are fed to the hash one by one (length-prefixed) rather than serialized
+    into one JSON string first: Stage-2 messages carry up to ~120k chars of paper text.
+    """
+    h = hashlib.sha256(f"{model_name}\x00{float(temperature)!r}".encode("utf-8"))
+    for m in messages:
+        content = m.get("content") or ""
+        h.update(f"\x00{m.get('role', '')}\x00{len(content)}\x00".encode("utf-8"))
+        h.update(content.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """
+    get()/put() wrapper around the llm_cache table with a TTL.
+    ttl_s <= 0 disables expiry (entries live until the DB is cleared).
+    """
+
+    def __init__(self, db_path: db.DBPath, ttl_s: float = 7 * 86400) -> None:
+        self.db_path = db_path
+        self.ttl_s = ttl_s
+        if ttl_s > 0:
+            removed = db.prune_cached_responses(self.db_path, self._cutoff())
+            if removed:
+                logger.info("LLM cache: pruned %d expired entries", removed)
+
+    def _cutoff(self) -> str:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_s)
+        return cutoff.strftime("%Y-%m-%d %H:%M:%S")
+
+    def get(self, model_name: str, temperature: float, messages: list[dict[str, str]]) -> str | None:
+        since = self._cutoff() if self.ttl_s > 0 else None
+        return db.get_cached_response(self.db_path, cache_key(model_name, temperature, messages), since)
+
+    def put(
+        self, model_name: str, temperature: float, messages: list[dict[str, str]], response: str,
+    ) -> None:
+        key = cache_key(model_name, temperature, messages)
+        db.put_cached_response(self.db_path, key, model_name, response)
@@ -5,69 +5,102 @@ OpenAI-compatible API client for chat completions. Retries with exponential back
 import ast
 import json
 import logging
+import random
 import re
 import time
-from typing import Any
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
 
-from openai import OpenAI
+from . import fastjson
+from .llm_cache import ResponseCache
+from .ratelimit import LLMRateLimiter
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
 
-def _strip_think_tags(s: str) -> str:
-    """Remove <think>...</think> block if present (Qwen etc. output reasoning in think tags)."""
-    lower = s.lstrip()
-    if lower.startswith("<think>"):
-        close_tag = "</" + "think>"
-        end = s.find(close_tag)
-        if end != -1:
-            s = s[end + len(close_tag) :].lstrip()
-        else:
-            s = s[7:].lstrip()
-    return s
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</" + "think>"
+_REASONING_PREFIXES = ("thinking process:", "thinking:", "analysis:", "reasoning:", "process:")
 
 
-def _strip_leading_reasoning(s: str) -> str:
-    """Drop leading reasoning text (e.g. 'Thinking Process:...') before first real JSON start ({ or [).
-    Skip lone { that is part of text like 'Start with `{`' (brace followed by backtick)."""
-    s = s.strip()
-    for prefix in ("Thinking Process:", "Thinking:", "Analysis:", "Reasoning:", "Process:"):
-        if s.lower().startswith(prefix.lower()):
-            s = s[len(prefix) :].lstrip()
-            break
-    # Find first { that looks like start of JSON: { then optional space then " or '
-    idx_brace = -1
-    for i, c in enumerate(s):
-        if c == "{":
-            rest = s[i + 1 :].lstrip()
-            # Skip { that is inside "Start with `{`" (rest starts with backtick)
-            if rest.startswith("`"):
-                continue
-            idx_brace = i
+def _skip_ws(s: str, i: int) -> int:
+    """Index of the first non-whitespace character at or after i (len(s) if none)."""
+    n = len(s)
+    while i < n and s[i].isspace():
+        i += 1
+    return i
+
+
+def _skip_think_tags(s: str, i: int = 0) -> int:
+    """Offset just past a leading <think>...</think> block (and the whitespace after it); i if none."""
+    j = _skip_ws(s, i)
+    if not s.startswith(_THINK_OPEN, j):
+        return i
+    end = s.find(_THINK_CLOSE, j)
+    return _skip_ws(s, end + len(_THINK_CLOSE) if end != -1 else j + len(_THINK_OPEN))
+
+
+def _skip_leading_reasoning(s: str, i: int = 0) -> int:
+    """Offset of the first real JSON start ({ or [) at or after i, past a reasoning label such as
+    'Thinking Process:'. Skips a lone { that is part of text like 'Start with `{`' (brace followed
+    by backtick). Returns the offset after the label when there is no JSON start at all."""
+    i = _skip_ws(s, i)
+    for prefix in _REASONING_PREFIXES:
+        if s[i : i + len(prefix)].lower() == prefix:
+            i = _skip_ws(s, i + len(prefix))
             break
-    idx_bracket = s.find("[")
+    idx_brace = s.find("{", i)
+    while idx_brace != -1 and s.startswith("`", _skip_ws(s, idx_brace + 1)):
+        idx_brace = s.find("{", idx_brace + 1)
+    idx_bracket = s.find("[", i)
     if idx_brace == -1 and idx_bracket == -1:
-        return s
+        return i
     if idx_brace >= 0 and (idx_bracket == -1 or idx_brace <= idx_bracket):
-        return s[idx_brace:].strip()
-    return s[idx_bracket:].strip()
+        return idx_brace
+    return idx_bracket
+
+
+def _strip_think_tags(s: str) -> str:
+    """Remove <think>...</think> block if present (Qwen etc. output reasoning in think tags)."""
+    return s[_skip_think_tags(s):]
+
+
+def _strip_leading_reasoning(s: str) -> str:
+    """Drop leading reasoning text (e.g. 'Thinking Process:...') before first real JSON start ({ or [)."""
+    return s[_skip_leading_reasoning(s):].strip()
+
+
+# Repair patterns, compiled once (they run on every reply that fails strict parsing)
+_SINGLE_QUOTED_KEY = re.compile(r"'([^']*)'\s*:")
+# Only fix known Stage1 keys so we don't break string values that contain " \" "
+_MISSING_COLON = re.compile(
+    r'"(paper_id|topic_id|relevance|reason|decision|overall_relevance|topics)"\s+"'
+)
+_BACKTICK_STRING = re.compile(r"`([^`]*)`")
+_STAGE1_PAPER_ID_KEY = re.compile(r'["\']paper_id["\']\s*:')
+_STAGE1_TOPICS_KEY = re.compile(r'["\']topics["\']\s*:')
 
 
 def _fix_single_quoted_keys(s: str) -> str:
     """Convert Python-style 'key': to JSON "key": so json.loads accepts it."""
-    return re.sub(r"'([^']*)'\s*:", r'"\1":', s)
+    if "'" not in s:
+        return s
+    return _SINGLE_QUOTED_KEY.sub(r'"\1":', s)
 
 
 def _fix_missing_colon_between_quoted(s: str) -> str:
     """Insert missing colon when model outputs \"key\" \"value\" instead of \"key\": \"value\"."""
-    # Only fix known Stage1 keys so we don't break string values that contain " \" "
-    keys = r"paper_id|topic_id|relevance|reason|decision|overall_relevance|topics"
-    return re.sub(r'"(' + keys + r')"\s+"', r'"\1": "', s)
+    return _MISSING_COLON.sub(r'"\1": "', s)
 
 
 def _replace_backtick_strings(s: str) -> str:
     """Replace `identifier` with "identifier" so JSON/ast can parse (model often outputs `llm-opt` etc)."""
-    return re.sub(r"`([^`]*)`", r'"\1"', s)
+    if "`" not in s:
+        return s
+    return _BACKTICK_STRING.sub(r'"\1"', s)
 
 
 def _escape_control_in_double_quoted_strings(s: str) -> str:
@@ -124,35 +157,38 @@ def _try_close_truncated_json(s: str) -> str:
     return s
 
 
+# Trailing comma before } or ], handled in one pass
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
 def _try_parse_json_or_python_dict(s: str) -> dict[str, Any] | list[Any]:
     """Try json.loads; on failure try ast.literal_eval (handles single-quoted keys/values) and control-char escape."""
     s = _replace_backtick_strings(s)
     try:
-        return json.loads(s)
+        return fastjson.loads(s)
     except json.JSONDecodeError as e:
         err_str = str(e).lower()
         if "control character" in err_str:
             s = _escape_control_in_double_quoted_strings(s)
             try:
-                return json.loads(s)
+                return fastjson.loads(s)
             except json.JSONDecodeError:
                 pass
         if "unterminated string" in err_str:
             try:
                 closed = _try_close_truncated_json(s)
-                return json.loads(closed)
+                return fastjson.loads(closed)
             except json.JSONDecodeError:
                 pass
         if "expecting" in err_str and "delimiter" in err_str and ":" in err_str:
             try:
                 fixed = _fix_missing_colon_between_quoted(s)
                 if fixed != s:
-                    return json.loads(fixed)
+                    return fastjson.loads(fixed)
             except json.JSONDecodeError:
                 pass
     # Remove trailing commas so ast.literal_eval accepts
-    s_clean = re.sub(r",\s*}", "}", s)
-    s_clean = re.sub(r",\s*]", "]", s_clean)
+    s_clean = _TRAILING_COMMA.sub(r"\1", s)
     try:
         out = ast.literal_eval(s_clean)
         if isinstance(out, (dict, list)):
@@ -160,7 +196,29 @@ def _try_parse_json_or_python_dict(s: str) -> dict[str, Any] | list[Any]:
     except (ValueError, SyntaxError):
         pass
     s = _fix_single_quoted_keys(s)
-    return json.loads(s)
+    return fastjson.loads(s)
+
+
+def _find_matching_close(s: str, start: int, open_ch: str, close_ch: str) -> int:
+    """Index of the close_ch that balances the open_ch at s[start], or -1. Jumps between
+    brackets with str.find instead of stepping through every character (strings not tracked).
+    """
+    depth = 0
+    nxt_open = start
+    p = start
+    while True:
+        nxt_close = s.find(close_ch, p)
+        if nxt_close == -1:
+            return -1
+        if nxt_open != -1 and nxt_open < nxt_close:
+            depth += 1
+            p = nxt_open + 1
+            nxt_open = s.find(open_ch, p)
+            continue
+        depth -= 1
+        if depth == 0:
+            return nxt_close
+        p = nxt_close + 1
 
 
 def _extract_first_json_object(s: str) -> str:
@@ -168,53 +226,55 @@ def _extract_first_json_object(s: str) -> str:
     start = s.find("{")
     if start == -1:
         raise ValueError("No '{' found")
-    depth = 0
-    for i in range(start, len(s)):
-        if s[i] == "{":
-            depth += 1
-        elif s[i] == "}":
-            depth -= 1
-            if depth == 0:
-                return s[start : i + 1]
+    close = _find_matching_close(s, start, "{", "}")
+    if close != -1:
+        return s[start : close + 1]
     last_brace = s.rfind("}", start)
     if last_brace > start:
         return s[start : last_brace + 1]
     raise ValueError("No matching '}' for JSON object")
 
 
-def _extract_json_object(s: str) -> str:
-    """Find JSON object: skip prompt example (contains "<arxiv_id>"). Prefer one that contains "topics" (real schema); else last without placeholder."""
+# Stdlib decoder for raw_decode: parses one value starting at an offset and reports where it ends
+_DECODER = json.JSONDecoder()
+
+
+def _extract_json_object(s: str, pos: int = 0) -> tuple[str, dict[str, Any] | None]:
+    """Find JSON object: skip prompt example (contains "<arxiv_id>"). Prefer one that contains "topics" (real schema); else last without placeholder.
+
+    Returns (candidate, parsed). A candidate that is already strict JSON is decoded by the C
+    scanner, which also finds its end (braces inside strings included), and returned parsed;
+    otherwise its end is found by brace counting and parsed is None, for the repair path.
+    """
     skip_marker = "<arxiv_id>"
-    pos = 0
-    best: str | None = None
+    best: tuple[str, dict[str, Any] | None] | None = None
     while True:
         start = s.find("{", pos)
         if start == -1:
             if best is not None:
                 return best
             raise ValueError("No '{' found in model output")
-        depth = 0
-        end = -1
-        for i in range(start, len(s)):
-            if s[i] == "{":
-                depth += 1
-            elif s[i] == "}":
-                depth -= 1
-                if depth == 0:
-                    end = i + 1
-                    break
-        if end == -1:
-            last_brace = s.rfind("}", start)
-            if last_brace > start:
-                end = last_brace + 1
-            else:
-                end = len(s)
+        parsed: dict[str, Any] | None = None
+        try:
+            obj, end = _DECODER.raw_decode(s, start)
+            if isinstance(obj, dict):
+                parsed = obj
+        except json.JSONDecodeError:
+            end = _find_matching_close(s, start, "{", "}") + 1
+            if end == 0:
+                last_brace = s.rfind("}", start)
+                if last_brace > start:
+                    end = last_brace + 1
+                else:
+                    end = len(s)
         candidate = s[start:end]
+        if end == len(s):
+            candidate = candidate.rstrip()
         if skip_marker not in candidate:
             # Prefer object that has both paper_id and topics keys (Stage1 schema)
-            if re.search(r'["\']paper_id["\']\s*:', candidate) and re.search(r'["\']topics["\']\s*:', candidate):
-                return candidate
-            best = candidate
+            if _STAGE1_PAPER_ID_KEY.search(candidate) and _STAGE1_TOPICS_KEY.search(candidate):
+                return candidate, parsed
+            best = (candidate, parsed)
         pos = end
         if end >= len(s):
             break
@@ -223,72 +283,225 @@ def _extract_json_object(s: str) -> str:
     raise ValueError("No '{' found in model output")
 
 
-def _normalize_json_raw(raw: str) -> str:
-    """Strip think tags, leading reasoning text, markdown fences, then extract JSON for json.loads."""
-    if not raw or not raw.strip():
+def _normalize_json_raw(raw: str) -> tuple[str, dict[str, Any] | None]:
+    """Skip think tags and leading reasoning text, then extract JSON for json.loads.
+    Returns (json_text, parsed) as _extract_json_object does. Works on offsets into raw, so
+    no intermediate copies are made; a markdown fence before the object is skipped with the
+    reasoning text, a closing fence is left after the object's end.
+    """
+    if not raw or raw.isspace():
         raise ValueError("Model returned empty or whitespace-only content")
-    s = raw.strip()
-    s = _strip_think_tags(s)
-    s = _strip_leading_reasoning(s)
-    s = s.strip()
-    if not s:
+    i = _skip_leading_reasoning(raw, _skip_think_tags(raw))
+    if i >= len(raw):
         raise ValueError("Model returned only think/reasoning, no JSON")
-    if s.startswith("```"):
-        lines = s.split("\n")
-        if lines[0].startswith("```"):
-            lines = lines[1:]
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        s = "\n".join(lines).strip()
     # Always extract via _extract_json_object so we skip prompt example {"paper_id": "<arxiv_id>", ...}
-    s = _extract_json_object(s)
-    return s
+    return _extract_json_object(raw, i)
 
 
-def _extract_json_array(s: str) -> str:
-    """Find first [ and matching ] to extract a JSON array."""
-    start = s.find("[")
+def _extract_json_array(s: str, pos: int = 0) -> str:
+    """Find first [ at or after pos and matching ] to extract a JSON array."""
+    start = s.find("[", pos)
     if start == -1:
         raise ValueError("No '[' found in model output")
-    depth = 0
-    for i in range(start, len(s)):
-        if s[i] == "[":
-            depth += 1
-        elif s[i] == "]":
-            depth -= 1
-            if depth == 0:
-                return s[start : i + 1]
+    close = _find_matching_close(s, start, "[", "]")
+    if close != -1:
+        return s[start : close + 1]
     raise ValueError("No matching ']' for JSON array")
 
 
-def _normalize_json_raw_array(raw: str) -> str:
-    """Strip think tags, leading reasoning text, markdown fences, then extract a JSON array."""
-    if not raw or not raw.strip():
+def _normalize_json_raw_array(raw: str) -> tuple[str, list[Any] | None]:
+    """Skip think tags and leading reasoning text, then extract a JSON array.
+    Returns (json_text, parsed): parsed is the decoded list when the array is strict JSON
+    (text after it, such as a closing markdown fence, is ignored), else None for the repair path.
+    """
+    if not raw or raw.isspace():
         raise ValueError("Model returned empty content")
-    s = raw.strip()
-    s = _strip_think_tags(s)
-    s = _strip_leading_reasoning(s)
-    s = s.strip()
-    if not s:
+    i = _skip_leading_reasoning(raw, _skip_think_tags(raw))
+    if i >= len(raw):
         raise ValueError("Model returned only think/reasoning")
-    if s.startswith("```"):
-        lines = s.split("\n")
-        if lines[0].startswith("```"):
-            lines = lines[1:]
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        s = "\n".join(lines).strip()
-    if not s.startswith("["):
-        s = _extract_json_array(s)
-    return s
+    starts_with_bracket = raw.startswith("[", i)
+    if not starts_with_bracket:
+        i = raw.find("[", i)
+        if i == -1:
+            raise ValueError("No '[' found in model output")
+    try:
+        obj, end = _DECODER.raw_decode(raw, i)
+        if isinstance(obj, list):
+            return raw[i:end], obj
+    except json.JSONDecodeError:
+        pass
+    if starts_with_bracket:
+        return raw[i:].strip(), None
+    return _extract_json_array(raw, i), None
 
 
 # 后台程序重启 LLM 的等待时间（秒），在所有重试耗尽后等待一次
 SERVER_RESTART_WAIT_S = 600
 
+# Upper bound for one backoff sleep between retries (seconds)
+_MAX_BACKOFF_S = 30.0
+
+# HTTP statuses worth retrying; any other 4xx (bad request, auth, unknown model) is permanent
+_RETRYABLE_STATUS = frozenset({408, 409, 429})
+
+
+# While waiting for a restart, probe the server this often (GET /v1/models, no tokens used)
+_RESTART_POLL_S = 15.0
+
+
+def _wait_for_server(client: "OpenAI", max_wait_s: float) -> bool:
+    """Poll until the server lists its models again or max_wait_s passes. True if it answered."""
+    deadline = time.monotonic() + max_wait_s
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(_RESTART_POLL_S, remaining))
+        try:
+            client.models.list()
+            return True
+        except Exception as e:
+            logger.debug("LLM server not back yet: %s", e)
+
+
+class CachedReply(str):
+    """A reply replayed from the ResponseCache; callers should not store it again."""
+
+
+class _EmptyCompletionError(ValueError):
+    """Server answered without any choices (seen while vLLM is warming up)."""
+
+
+def _is_retryable(err: Exception) -> bool:
+    """
+    Connection errors, timeouts, empty completions, 429 and 5xx are transient.
+    Other HTTP errors are permanent, and anything else is a bug on our side: raise it at once.
+    httpx transport errors count as connection errors: the SDK wraps them on request, but not
+    while a stream is being read (e.g. ReadTimeout or RemoteProtocolError mid-reply).
+    """
+    # Deferred: the SDK (~0.5 s to import) is only needed once a call has actually been made
+    import httpx
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(err, APIStatusError):
+        return err.status_code in _RETRYABLE_STATUS or err.status_code >= 500
+    return isinstance(err, (APIConnectionError, httpx.TransportError, _EmptyCompletionError))
+
+
+class _JsonEndScanner:
+    """
+    Watches a streamed reply and reports when its first complete top-level JSON value has
+    arrived, so the rest of the generation can be cancelled. A leading <think> block is
+    skipped; a value starts at { followed by a quote or }, or at [ followed by {, a quote or ].
+    Braces inside double-quoted strings are ignored, and the prompt's example object
+    ("<arxiv_id>" placeholder) does not count as the answer.
+    """
+
+    def __init__(self) -> None:
+        self.buf = ""
+        self.pos = 0
+        self.started = False  # past whitespace and any <think> block
+        self.start = -1  # offset of the value being scanned, -1 while searching
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        """Append a streamed chunk. True once a complete top-level JSON value has been seen."""
+        self.buf += text
+        buf, n = self.buf, len(self.buf)
+        if not self.started:
+            j = _skip_ws(buf, 0)
+            if n - j < len(_THINK_OPEN) and _THINK_OPEN.startswith(buf[j:]):
+                return False  # could still become <think>
+            if buf.startswith(_THINK_OPEN, j):
+                end = buf.find(_THINK_CLOSE, j)
+                if end == -1:
+                    return False
+                self.pos = end + len(_THINK_CLOSE)
+            self.started = True
+        i = self.pos
+        while i < n:
+            c = buf[i]
+            if self.start == -1:
+                if c in "{[":
+                    k = _skip_ws(buf, i + 1)
+                    if k >= n:
+                        break  # need the next character to decide
+                    if buf[k] in ('"\'}' if c == "{" else '{"\']'):
+                        self.start, self.depth = i, 0
+                        continue  # rescan this character as part of the value
+                i += 1
+                continue
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                self.in_string = True
+            elif c in "{[":
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    if "<arxiv_id>" not in buf[self.start : i + 1]:
+                        self.pos = i + 1
+                        return True
+                    self.start = -1
+            i += 1
+        self.pos = i
+        return False
+
+
+def _create_completion(client: "OpenAI", kwargs: dict[str, Any], stop_at_json_end: bool) -> str:
+    """One completion request; returns the stripped content. Raises _EmptyCompletionError."""
+    if not stop_at_json_end:
+        r = client.chat.completions.create(**kwargs)
+        if r.choices and len(r.choices) > 0:
+            msg = r.choices[0].message
+            # vLLM with --reasoning-parser: message.reasoning = thinking, message.content = final answer only
+            if getattr(msg, "reasoning", None):
+                logger.debug("Response has reasoning + content; using content only for parsing")
+            return (msg.content or "").strip()
+        raise _EmptyCompletionError("Empty completion")
+
+    stream = client.chat.completions.create(**kwargs, stream=True)
+    scanner = _JsonEndScanner()
+    parts: list[str] = []
+    got_choice = False
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            got_choice = True
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                if scanner.feed(delta):
+                    # Closing the stream drops the connection, and vLLM aborts the request
+                    logger.debug("JSON reply complete after %d chars; cancelling the rest", len(scanner.buf))
+                    break
+    finally:
+        stream.close()
+    if not got_choice:
+        raise _EmptyCompletionError("Empty completion")
+    return "".join(parts).strip()
+
+
+# Rough English-text ratio used for rate limiting and context budgeting (no tokenizer needed)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(messages: list[dict[str, str]]) -> int:
+    """Rough prompt size in tokens (~4 chars per token for English text, plus role overhead)."""
+    return sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN + 8 * len(messages)
+
 
 def chat_completion(
-    client: OpenAI,
+    client: "OpenAI",
     model_name: str,
     messages: list[dict[str, str]],
     temperature: float = 0,
@@ -298,15 +511,36 @@ def chat_completion(
     base_delay: float = 2.0,
     server_restart_wait_s: int = SERVER_RESTART_WAIT_S,
     extra_body: dict[str, Any] | None = None,
+    cache: ResponseCache | None = None,
+    deadline_s: float | None = None,
+    limiter: LLMRateLimiter | None = None,
+    response_format: dict[str, Any] | None = None,
+    stop_at_json_end: bool = False,
 ) -> str:
     """
     Call /chat/completions. Returns content string. Raises on final failure.
 
     extra_body: passed to the API (e.g. vLLM chat_template_kwargs).
+    cache: if given, a stored reply for (model_name, messages, temperature) is returned without
+    calling the API, as a CachedReply. Storing is left to the caller, once the reply has
+    parsed; re-storing a CachedReply would only refresh its TTL.
+    Retries back off exponentially with full jitter (capped at 30s); non-retryable API
+    errors (4xx other than 408/409/429) are raised at once. deadline_s bounds the total
+    time spent, including the server-restart wait: a retry that would overrun it is skipped.
+    limiter: shared RPM/TPM governor; every attempt (not cache hits) waits for it first.
+    response_format: e.g. {"type": "json_object"} to have the server constrain output to JSON.
+    stop_at_json_end: stream the reply and cancel generation once the first complete JSON
+    object/array has arrived, instead of paying for any text the model adds after it.
     Returns only message.content (final answer). When vLLM is started with
     --reasoning-parser qwen3, thinking is in message.reasoning and content
     is the final answer only; without the parser, content may contain both.
     """
+    if cache is not None:
+        cached = cache.get(model_name, temperature, messages)
+        if cached is not None:
+            logger.debug("LLM cache hit (%s)", model_name)
+            return CachedReply(cached)
+
     kwargs: dict[str, Any] = {
         "model": model_name,
         "messages": messages,
@@ -316,22 +550,32 @@ def chat_completion(
     }
     if extra_body:
         kwargs["extra_body"] = extra_body
+    if response_format:
+        kwargs["response_format"] = response_format
 
+    estimated_tokens = estimate_tokens(messages) + max_tokens if limiter is not None else 0
+    deadline = time.monotonic() + deadline_s if deadline_s else None
     last_err = None
     for attempt in range(max_retries):
         try:
-            r = client.chat.completions.create(**kwargs)
-            if r.choices and len(r.choices) > 0:
-                msg = r.choices[0].message
-                # vLLM with --reasoning-parser: message.reasoning = thinking, message.content = final answer only
-                if getattr(msg, "reasoning", None):
-                    logger.debug("Response has reasoning + content; using content only for parsing")
-                return (msg.content or "").strip()
-            raise ValueError("Empty completion")
+            if limiter is not None:
+                limiter.acquire(estimated_tokens)
+            return _create_completion(client, kwargs, stop_at_json_end)
         except Exception as e:
             last_err = e
+            if limiter is not None and getattr(e, "status_code", None) == 429:
+                limiter.drain()
+            if not _is_retryable(e):
+                logger.warning("Model API call failed with non-retryable error: %s", e)
+                raise
             if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
+                delay = random.uniform(0, min(base_delay * (2 ** attempt), _MAX_BACKOFF_S))
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    logger.warning(
+                        "Model API call failed (attempt %d/%d): %s; deadline reached, not retrying",
+                        attempt + 1, max_retries, e,
+                    )
+                    break
                 logger.warning(
                     "Model API call failed (attempt %d/%d): %s; retry in %.1fs",
                     attempt + 1, max_retries, e, delay,
@@ -344,17 +588,19 @@ def chat_completion(
                 )
 
     # All retries exhausted — optionally wait for server restart then try once more
-    if server_restart_wait_s > 0:
+    if server_restart_wait_s > 0 and (
+        deadline is None or time.monotonic() + server_restart_wait_s <= deadline
+    ):
         logger.warning(
-            "All %d retries exhausted; waiting %ds for potential LLM server restart",
+            "All %d retries exhausted; waiting up to %ds for potential LLM server restart",
             max_retries, server_restart_wait_s,
         )
-        time.sleep(server_restart_wait_s)
+        if _wait_for_server(client, server_restart_wait_s):
+            logger.info("LLM server is answering again; retrying")
         try:
-            r = client.chat.completions.create(**kwargs)
-            if r.choices and len(r.choices) > 0:
-                msg = r.choices[0].message
-                return (msg.content or "").strip()
+            if limiter is not None:
+                limiter.acquire(estimated_tokens)
+            return _create_completion(client, kwargs, stop_at_json_end)
         except Exception as e:
             last_err = e
             logger.warning("Final attempt after server restart wait also failed: %s", e)
@@ -362,6 +608,17 @@ def chat_completion(
     raise last_err or RuntimeError("Model call failed")
 
 
+def _clamp01(value: Any) -> float:
+    """value as a float clamped to [0, 1]; 0.0 when it is not a number (or is NaN)."""
+    try:
+        r = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if r >= 1.0:
+        return 1.0
+    return r if r > 0.0 else 0.0  # NaN fails both comparisons and maps to 0.0
+
+
 def _validate_stage1_data(data: dict[str, Any], paper_id: str) -> dict[str, Any]:
     """
     Validate and normalize Stage1 dict: paper_id, topics (list of dicts), relevance clamp, decision.
@@ -377,23 +634,22 @@ def _validate_stage1_data(data: dict[str, Any], paper_id: str) -> dict[str, Any]
     topics_raw = data.get("topics")
     if not isinstance(topics_raw, list):
         raise ValueError("Missing or invalid 'topics' array")
+    # data is freshly parsed and owned by the caller, so topic dicts are normalized in place
     topics: list[dict[str, Any]] = []
     for t in topics_raw:
         if isinstance(t, dict):
             # Accept topic_id from id/topic alias; coerce relevance from string
             tid = t.get("topic_id") or t.get("id") or t.get("topic")
-            if tid is not None:
-                t = dict(t)
-                t["topic_id"] = str(tid)
-            else:
-                t = dict(t)
-                t["topic_id"] = str(t.get("topic_id", ""))
+            t["topic_id"] = str(tid) if tid is not None else str(t.get("topic_id", ""))
+            r = t.get("relevance")
+            if r is not None:
+                t["relevance"] = _clamp01(r)
             topics.append(t)
         elif isinstance(t, (list, tuple)) and len(t) >= 2:
             try:
                 topics.append({
                     "topic_id": str(t[0]),
-                    "relevance": max(0.0, min(1.0, float(t[1]))),
+                    "relevance": _clamp01(float(t[1])),
                     "reason": str(t[2]) if len(t) > 2 else "",
                 })
             except (TypeError, ValueError):
@@ -401,18 +657,8 @@ def _validate_stage1_data(data: dict[str, Any], paper_id: str) -> dict[str, Any]
     if not topics:
         raise ValueError("Missing or invalid 'topics' array (no valid topic objects)")
     data["topics"] = topics
-    for t in topics:
-        r = t.get("relevance")
-        if r is not None:
-            try:
-                t["relevance"] = max(0.0, min(1.0, float(r)))
-            except (TypeError, ValueError):
-                t["relevance"] = 0.0
     if "overall_relevance" in data and data["overall_relevance"] is not None:
-        try:
-            data["overall_relevance"] = max(0.0, min(1.0, float(data["overall_relevance"])))
-        except (TypeError, ValueError):
-            data["overall_relevance"] = 0.0
+        data["overall_relevance"] = _clamp01(data["overall_relevance"])
     if data.get("decision") not in ("keep", "drop"):
         data["decision"] = "drop"
     return data
@@ -424,10 +670,12 @@ def parse_stage1_json(raw: str, paper_id: str) -> dict[str, Any]:
     Raises ValueError on parse/schema failure.
     """
     try:
-        s = _normalize_json_raw(raw)
+        s, data = _normalize_json_raw(raw)
     except ValueError as e:
         logger.debug("Stage1 raw (first 400 chars): %r", (raw or "")[:400])
         raise ValueError(f"Invalid JSON: {e}") from e
+    if data is not None:
+        return _validate_stage1_data(data, paper_id)
     try:
         data = _try_parse_json_or_python_dict(s)
     except (json.JSONDecodeError, ValueError) as e:
@@ -473,7 +721,7 @@ def try_parse_stage1_aggressive(raw: str, paper_id: str) -> tuple[dict[str, Any]
             s = "\n".join(lines).strip()
         s = _extract_first_json_object(s)
         s = _fix_single_quoted_keys(s)
-        data = json.loads(s)
+        data = fastjson.loads(s)
         return _validate_stage1_data(data, paper_id), None
     except Exception as e:
         last_err = e
@@ -510,10 +758,7 @@ def _validate_stage2_data(data: dict[str, Any], paper_id: str) -> dict[str, Any]
     if "topics" in data and isinstance(data["topics"], list):
         for t in data["topics"]:
             if isinstance(t, dict) and "relevance" in t:
-                try:
-                    t["relevance"] = max(0.0, min(1.0, float(t["relevance"])))
-                except (TypeError, ValueError):
-                    t["relevance"] = 0.0
+                t["relevance"] = _clamp01(t["relevance"])
     for key in ("problem", "motivation", "approach", "title", "categories", "published"):
         if data.get(key) is None:
             data[key] = "" if key != "categories" else []
@@ -525,10 +770,12 @@ def _validate_stage2_data(data: dict[str, Any], paper_id: str) -> dict[str, Any]
 def parse_stage2_json(raw: str, paper_id: str) -> dict[str, Any]:
     """Parse Stage-2 summary JSON. Validate types and clamp relevance."""
     try:
-        s = _normalize_json_raw(raw)
+        s, data = _normalize_json_raw(raw)
     except ValueError as e:
         logger.debug("Stage2 raw (first 400 chars): %r", (raw or "")[:400])
         raise ValueError(f"Invalid JSON: {e}") from e
+    if data is not None:
+        return _validate_stage2_data(data, paper_id)
     try:
         data = _try_parse_json_or_python_dict(s)
     except (json.JSONDecodeError, ValueError) as e:
@@ -563,6 +810,39 @@ def try_parse_stage2_aggressive(raw: str, paper_id: str) -> tuple[dict[str, Any]
     return None, last_err
 
 
+@lru_cache(maxsize=8)
+def _topics_desc_cached(topics_key: tuple[tuple[Any, Any, Any], ...]) -> str:
+    return "\n".join(
+        f"- id: {tid}, name: {name}, description: {description}"
+        for tid, name, description in topics_key
+    )
+
+
+def _topics_desc(topics_config: list[dict]) -> str:
+    """Topic list block of the Stage-1 prompts. Topics are the same for every paper in a run,
+    so the formatted block is built once per distinct (id, name, description) list."""
+    return _topics_desc_cached(tuple((t["id"], t["name"], t["description"]) for t in topics_config))
+
+
+STAGE1_BATCH_SYSTEM_PROMPT = (
+    "You are a batch classifier. For each paper, assign each topic a relevance "
+    "score in [0, 1] with a short reason (<=25 words). "
+    "Your entire reply must be exactly one valid JSON array: no 'Thinking Process', "
+    "no <think>, no reasoning, no markdown. Use double quotes for all keys and strings. "
+    "Start your response with [."
+)
+
+STAGE1_BATCH_OUTPUT_SPEC = (
+    "Output a JSON array with exactly one object per paper, in the same order as the papers below:\n"
+    "[{\"paper_id\": \"<id>\", \"topics\": [{\"topic_id\": \"...\", "
+    "\"relevance\": 0.0-1.0, \"reason\": \"...\"}, ...], "
+    "\"overall_relevance\": 0.0-1.0, \"decision\": \"keep\" or \"drop\"}, ...]"
+)
+
+# Shared by every batch prompt; treat as read-only
+_STAGE1_BATCH_SYSTEM_MSG = {"role": "system", "content": STAGE1_BATCH_SYSTEM_PROMPT}
+
+
 def build_stage1_batch_prompt(
     topics_config: list[dict],
     papers: list[dict[str, Any]],
@@ -570,10 +850,7 @@ def build_stage1_batch_prompt(
     """Build a single prompt that classifies a batch of papers in one LLM call.
     More efficient than calling build_stage1_prompt N times.
     """
-    topics_desc = "\n".join(
-        f"- id: {t['id']}, name: {t['name']}, description: {t['description']}"
-        for t in topics_config
-    )
+    topics_desc = _topics_desc(topics_config)
     papers_blob = "\n\n".join(
         f"Paper {i + 1} (id: \"{p['arxiv_id']}\"):\n"
         f"Title: {p.get('title', '')}\n"
@@ -582,23 +859,13 @@ def build_stage1_batch_prompt(
         for i, p in enumerate(papers)
     )
     n = len(papers)
-    system = (
-        "You are a batch classifier. For each paper, assign each topic a relevance "
-        "score in [0, 1] with a short reason (<=25 words). "
-        "Your entire reply must be exactly one valid JSON array: no 'Thinking Process', "
-        "no <think>, no reasoning, no markdown. Use double quotes for all keys and strings. "
-        "Start your response with [."
-    )
+    # Paper count and papers come last so the topics + format prefix is shared by all batches
     user = (
-        f"Topics:\n{topics_desc}\n\n"
-        f"Papers to classify ({n} total):\n{papers_blob}\n\n"
-        f"Output a JSON array with exactly {n} objects in the same order as above:\n"
-        "[{\"paper_id\": \"<id>\", \"topics\": [{\"topic_id\": \"...\", "
-        "\"relevance\": 0.0-1.0, \"reason\": \"...\"}, ...], "
-        "\"overall_relevance\": 0.0-1.0, \"decision\": \"keep\" or \"drop\"}, ...]"
+        f"Topics:\n{topics_desc}\n\n{STAGE1_BATCH_OUTPUT_SPEC}\n\n"
+        f"Papers to classify ({n} total):\n{papers_blob}"
     )
     return [
-        {"role": "system", "content": system},
+        _STAGE1_BATCH_SYSTEM_MSG,
         {"role": "user", "content": user},
     ]
 
@@ -612,11 +879,12 @@ def parse_stage1_batch_json(
     Matches results to input papers by paper_id field first, then by position.
     Raises ValueError if JSON is unparseable (caller should fall back to individual calls).
     """
-    s = _normalize_json_raw_array(raw)
-    try:
-        data = _try_parse_json_or_python_dict(s)
-    except (json.JSONDecodeError, ValueError):
-        raise ValueError("Invalid JSON: unparseable batch array") from None
+    s, data = _normalize_json_raw_array(raw)
+    if data is None:
+        try:
+            data = _try_parse_json_or_python_dict(s)
+        except (json.JSONDecodeError, ValueError):
+            raise ValueError("Invalid JSON: unparseable batch array") from None
     if not isinstance(data, list):
         raise ValueError(f"Expected JSON array, got {type(data).__name__}")
 
@@ -657,78 +925,96 @@ def _clamp_stage1_item(item: dict[str, Any]) -> None:
     """In-place: clamp relevance scores and normalise decision field."""
     for t in item.get("topics", []):
         if isinstance(t, dict) and "relevance" in t:
-            try:
-                t["relevance"] = max(0.0, min(1.0, float(t["relevance"])))
-            except (TypeError, ValueError):
-                t["relevance"] = 0.0
+            t["relevance"] = _clamp01(t["relevance"])
     if "overall_relevance" in item and item["overall_relevance"] is not None:
-        try:
-            item["overall_relevance"] = max(0.0, min(1.0, float(item["overall_relevance"])))
-        except (TypeError, ValueError):
-            item["overall_relevance"] = 0.0
+        item["overall_relevance"] = _clamp01(item["overall_relevance"])
     if item.get("decision") not in ("keep", "drop"):
         item["decision"] = "drop"
 
 
+# Prompts are laid out invariant-first (system, topics, output format) with the paper
+# last, so every request in a run shares one long prefix that the server's prefix
+# cache (vLLM --enable-prefix-caching) can reuse instead of re-running prefill.
+STAGE1_SYSTEM_PROMPT = (
+    "You are a classifier. For each paper, assign each topic a relevance score in [0, 1] "
+    "and give a short reason (<=40 words). Your entire reply must be exactly one valid JSON object: "
+    "no 'Thinking Process', no <think>, no reasoning, no markdown, no text before or after. "
+    "Use double quotes for all keys and strings. Start your response with {."
+)
+
+STAGE1_OUTPUT_SPEC = (
+    "Output JSON: {\"paper_id\": \"<arxiv_id>\", \"topics\": [{\"topic_id\": \"...\", \"relevance\": 0.0-1.0, \"reason\": \"...\"}, ...], "
+    "\"overall_relevance\": 0.0-1.0, \"decision\": \"keep\" or \"drop\"}. "
+    "decision must be \"keep\" if any topic relevance >= 0.8 else \"drop\"."
+)
+
+STAGE2_SYSTEM_PROMPT = (
+    "You produce a structured summary in JSON only. Be concise and faithful. "
+    "All text values (problem, motivation, key_challenges, approach, "
+    "assumptions_limitations, evidence_results, takeaways) MUST be written in 简体中文. "
+    "If evidence is missing, say '未明确报告'. Output ONLY valid JSON, no markdown.\n\n"
+    "Output JSON with: paper_id, title, categories, published, topics (from stage1), "
+    "problem, motivation, key_challenges (array), approach, assumptions_limitations (array), "
+    "evidence_results (array), takeaways (exactly 3 bullets). "
+    "All descriptive text fields must be in 简体中文."
+)
+
+# System messages are shared by every prompt built in the process; treat them as read-only
+_STAGE1_SYSTEM_MSG = {"role": "system", "content": STAGE1_SYSTEM_PROMPT}
+_STAGE2_SYSTEM_MSG = {"role": "system", "content": STAGE2_SYSTEM_PROMPT}
+
+
 def build_stage1_prompt(topics_config: list[dict], paper: dict[str, Any]) -> list[dict[str, str]]:
     """Build messages for Stage-1 classification + relevance."""
-    topics_desc = "\n".join(
-        f"- id: {t['id']}, name: {t['name']}, description: {t['description']}"
-        for t in topics_config
-    )
+    topics_desc = _topics_desc(topics_config)
     paper_blob = (
         f"Title: {paper['title']}\n"
         f"Categories: {', '.join(paper.get('categories', []))}\n"
         f"Published: {paper.get('published', '')}\n"
         f"Abstract: {paper.get('abstract', '')}"
     )
-    system = (
-        "You are a classifier. For each paper, assign each topic a relevance score in [0, 1] "
-        "and give a short reason (<=40 words). Your entire reply must be exactly one valid JSON object: "
-        "no 'Thinking Process', no <think>, no reasoning, no markdown, no text before or after. "
-        "Use double quotes for all keys and strings. Start your response with {."
-    )
-    user = (
-        f"Topics:\n{topics_desc}\n\nPaper:\n{paper_blob}\n\n"
-        "Output JSON: {\"paper_id\": \"<arxiv_id>\", \"topics\": [{\"topic_id\": \"...\", \"relevance\": 0.0-1.0, \"reason\": \"...\"}, ...], "
-        "\"overall_relevance\": 0.0-1.0, \"decision\": \"keep\" or \"drop\"}. "
-        "decision must be \"keep\" if any topic relevance >= 0.8 else \"drop\"."
-    )
+    user = f"Topics:\n{topics_desc}\n\n{STAGE1_OUTPUT_SPEC}\n\nPaper:\n{paper_blob}"
     return [
-        {"role": "system", "content": system},
+        _STAGE1_SYSTEM_MSG,
         {"role": "user", "content": user},
     ]
 
 
+def build_json_repair_prompt(raw: str, max_chars: int) -> list[dict[str, str]]:
+    """Messages asking a model to re-emit a reply that failed to parse as plain valid JSON."""
+    return [{
+        "role": "user",
+        "content": "Return only valid JSON, no markdown, no thinking. Previous reply had errors.\n\n"
+        + (raw[:max_chars] if raw else ""),
+    }]
+
+
+def format_stage1_topics(stage1_topics: list[dict]) -> str:
+    """The Stage-1 topics as they appear in the Stage-2 prompt (compact ASCII JSON)."""
+    return json.dumps(stage1_topics)
+
+
 def build_stage2_prompt(
     paper_metadata: dict[str, Any],
     full_text: str,
-    stage1_topics: list[dict],
+    stage1_topics: list[dict] | str,
 ) -> list[dict[str, str]]:
     """Build messages for Stage-2 structured summary.
+    stage1_topics may be passed already formatted by format_stage1_topics(), so a caller
+    that builds the prompt more than once for a paper serializes the topics only once.
     Truncation is handled upstream by pdf_utils.extract_key_sections(); no further
     truncation is done here so the smart section-aware cut is preserved.
     """
+    if not isinstance(stage1_topics, str):
+        stage1_topics = format_stage1_topics(stage1_topics)
     meta = (
         f"Title: {paper_metadata.get('title', '')}\n"
         f"Categories: {paper_metadata.get('categories', [])}\n"
         f"Published: {paper_metadata.get('published', '')}\n"
-        f"Stage-1 topics: {json.dumps(stage1_topics)}"
-    )
-    system = (
-        "You produce a structured summary in JSON only. Be concise and faithful. "
-        "All text values (problem, motivation, key_challenges, approach, "
-        "assumptions_limitations, evidence_results, takeaways) MUST be written in 简体中文. "
-        "If evidence is missing, say '未明确报告'. Output ONLY valid JSON, no markdown."
-    )
-    user = (
-        f"Paper metadata:\n{meta}\n\nFull text (extract):\n{full_text}\n\n"
-        "Output JSON with: paper_id, title, categories, published, topics (from stage1), "
-        "problem, motivation, key_challenges (array), approach, assumptions_limitations (array), "
-        "evidence_results (array), takeaways (exactly 3 bullets). "
-        "All descriptive text fields must be in 简体中文."
+        f"Stage-1 topics: {stage1_topics}"
     )
+    user = f"Paper metadata:\n{meta}\n\nFull text (extract):\n{full_text}"
     return [
-        {"role": "system", "content": system},
+        _STAGE2_SYSTEM_MSG,
         {"role": "user", "content": user},
     ]
@@ -3,21 +3,45 @@ PDF download and text extraction using PyMuPDF (fitz). Optional OCR off by defau
 Includes smart section extraction to prioritize paper body over references.
 """
 
+import hashlib
 import logging
+import multiprocessing
+import os
 import re
+import shutil
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Any, Callable
 from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
-# Optional OCR: only used if text extraction yields empty and use_ocr=True
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None  # type: ignore
+
+def _import_fitz() -> Any:
+    """
+    Import PyMuPDF on first use rather than at module load (~130 ms): runs where every
+    paper takes the abstract-only path, and the download-only code, never need it.
+    """
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        raise RuntimeError("PyMuPDF (fitz) is not installed. pip install pymupdf") from None
+    return fitz
+
+
+# Shared session: keep-alive connections are reused across PDFs (same host for arXiv),
+# saving a TCP+TLS handshake per download. Pool sized for concurrent prefetch.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# Copy the response body to disk in 1 MiB blocks: a 10 MB PDF takes ~10 read/write pairs
+_COPY_BUFFER_BYTES = 1024 * 1024
 
 
 def download_pdf(
@@ -29,18 +53,31 @@ def download_pdf(
 ) -> Path:
     """
     Download PDF from url to save_path. Creates parent dirs. Returns path.
-    Raises on final failure.
+    Writes to a temporary ".part" file and renames on success, so save_path only
+    exists once the download is complete. Raises on final failure.
     """
     path = Path(save_path)
     path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".part")
     last_err = None
     for attempt in range(max_retries):
         try:
-            r = requests.get(url, timeout=timeout_s, stream=True)
-            r.raise_for_status()
-            with open(path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            # Context manager releases the pooled connection even if the body read fails
+            with _SESSION.get(url, timeout=timeout_s, stream=True) as r:
+                r.raise_for_status()
+                # Content-Length is the encoded size; only comparable without Content-Encoding
+                expected = None
+                if not r.headers.get("Content-Encoding"):
+                    expected = int(r.headers.get("Content-Length") or 0) or None
+                r.raw.decode_content = True
+                with open(tmp_path, "wb") as f:
+                    # Copy loop runs in C with large blocks instead of per-chunk Python iteration
+                    shutil.copyfileobj(r.raw, f, _COPY_BUFFER_BYTES)
+            if expected is not None and tmp_path.stat().st_size != expected:
+                raise OSError(
+                    f"Truncated PDF download: {tmp_path.stat().st_size} of {expected} bytes"
+                )
+            os.replace(tmp_path, path)
             logger.info("Downloaded PDF to %s", path)
             return path
         except Exception as e:
@@ -52,14 +89,69 @@ def download_pdf(
             )
             if attempt < max_retries - 1:
                 time.sleep(delay)
+    try:
+        tmp_path.unlink()
+    except OSError:
+        pass
     raise last_err or RuntimeError("PDF download failed")
 
 
+def download_pdfs(
+    jobs: list[tuple[str, str | Path]],
+    max_workers: int = 4,
+    max_per_host: int = 2,
+    on_done: Callable[[Path, Exception | None], None] | None = None,
+    **download_kwargs: Any,
+) -> dict[Path, Exception | None]:
+    """
+    Download several PDFs concurrently. jobs is a list of (url, save_path).
+    At most max_per_host downloads run against the same host at once (arXiv throttles
+    aggressive clients). Extra keyword arguments are passed to download_pdf.
+    on_done(save_path, error) is called in the calling thread as each download finishes,
+    so work on one PDF can start while the others are still downloading.
+    Returns {save_path: None on success, else the exception}; never raises per job.
+    """
+    host_slots: dict[str, threading.BoundedSemaphore] = {}
+    for url, _ in jobs:
+        host = urlparse(url).netloc
+        if host not in host_slots:
+            host_slots[host] = threading.BoundedSemaphore(max(1, max_per_host))
+
+    def _one(url: str, save_path: Path) -> Exception | None:
+        with host_slots[urlparse(url).netloc]:
+            try:
+                download_pdf(url, save_path, **download_kwargs)
+                return None
+            except Exception as e:
+                return e
+
+    results: dict[Path, Exception | None] = {}
+    if not jobs:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        futures = {executor.submit(_one, url, Path(p)): Path(p) for url, p in jobs}
+        for future in as_completed(futures):
+            path, err = futures[future], future.result()
+            results[path] = err
+            if on_done is not None:
+                on_done(path, err)
+    n_failed = sum(1 for e in results.values() if e is not None)
+    logger.info("Prefetched %d/%d PDFs (%d failed)", len(results) - n_failed, len(results), n_failed)
+    return results
+
+
 # Regex patterns for section headers to strip (references, acknowledgements, appendix)
 _STRIP_SECTION_PATTERNS = re.compile(
     r'\n\s*(?:\d+\.?\s+)?(?:References|Bibliography|Acknowledgements?|Acknowledgments?)\s*\n',
     re.IGNORECASE,
 )
+# Truncation points move back/forward to a newline at most this many chars away (else cut mid-line)
+_SNAP_WINDOW = 2048
+# Section headers that anchor the kept tail when a long text is truncated
+_CONCLUSION_PATTERN = re.compile(
+    r'\n\s*(?:\d+\.?\s+)?(?:Conclusion|Conclusions|Discussion|Summary)\s*\n',
+    re.IGNORECASE,
+)
 
 
 def extract_key_sections(text: str, max_chars: int = 120000) -> str:
@@ -90,57 +182,107 @@ def extract_key_sections(text: str, max_chars: int = 120000) -> str:
     tail_chars = max_chars - head_chars
 
     # Try to find a Conclusion section near the end to anchor the tail
-    conclusion_pattern = re.compile(
-        r'\n\s*(?:\d+\.?\s+)?(?:Conclusion|Conclusions|Discussion|Summary)\s*\n',
-        re.IGNORECASE,
-    )
     # Search only in the last 30% of the text to avoid false positives
     search_start = max(head_chars, len(text) - len(text) // 3)
-    tail_match = conclusion_pattern.search(text, search_start)
+    tail_match = _CONCLUSION_PATTERN.search(text, search_start)
+    # Cuts snap to a line boundary when one is close, so no half line is sent to the model;
+    # the snap gives up at most a quarter of either part
+    tail_snap = min(_SNAP_WINDOW, tail_chars // 4)
     if tail_match:
-        tail_text = text[tail_match.start():][:tail_chars]
+        tail_start = tail_match.start()
+        tail_end = min(len(text), tail_start + tail_chars)
+        if tail_end < len(text):
+            nl = text.rfind("\n", tail_end - tail_snap, tail_end)
+            if nl != -1:
+                tail_end = nl
     else:
-        tail_text = text[-tail_chars:]
+        tail_start, tail_end = len(text) - tail_chars, len(text)
+        nl = text.find("\n", tail_start, tail_start + tail_snap)
+        if nl != -1:
+            tail_start = nl + 1
+    tail_text = text[tail_start:tail_end]
+    head_end = text.rfind("\n", head_chars - min(_SNAP_WINDOW, head_chars // 4), head_chars)
+    if head_end == -1:
+        head_end = head_chars
 
-    truncated = text[:head_chars] + "\n\n[...中间内容已省略...]\n\n" + tail_text
+    truncated = text[:head_end] + "\n\n[...中间内容已省略...]\n\n" + tail_text
     logger.debug(
         "Smart truncation: %d -> %d chars (head=%d, tail=%d)",
-        len(text), len(truncated), head_chars, len(tail_text),
+        len(text), len(truncated), head_end, len(tail_text),
     )
     return truncated
 
 
-def extract_text_fitz(pdf_path: str | Path, use_ocr: bool = False) -> str:
+def _page_text_parts(page: Any) -> list[str]:
+    """Stripped text of one page; falls back to "dict" spans when plain "text" is empty."""
+    # No sort=True: content-stream order is already reading order for typical
+    # (LaTeX) papers, and MuPDF's geometric sort dominates extraction time
+    text = page.get_text("text").strip()
+    if text:
+        return [text]
+    # Fallback: build from dict blocks (sometimes yields text when "text" is empty)
+    parts = []
+    try:
+        d = page.get_text("dict")
+        for block in d.get("blocks", []):
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    t = (span.get("text") or "").strip()
+                    if t:
+                        parts.append(t)
+    except Exception:
+        pass
+    return parts
+
+
+def extract_text_fitz(
+    pdf_path: str | Path,
+    use_ocr: bool = False,
+    max_chars: int | None = None,
+) -> str:
     """
     Extract text from PDF using PyMuPDF. Returns concatenated page text.
     Tries "text" first; if empty, falls back to building from "dict" blocks.
+
+    max_chars: stop reading pages once the text is longer than this and already
+    contains a References/Acknowledgements header. extract_key_sections cuts
+    everything from that header on, so its result is the same as for the full text.
     """
-    if fitz is None:
-        raise RuntimeError("PyMuPDF (fitz) is not installed. pip install pymupdf")
+    fitz = _import_fitz()
     path = Path(pdf_path)
     if not path.exists():
         raise FileNotFoundError(f"PDF not found: {path}")
     doc = fitz.open(path)
     try:
-        parts = []
-        for page in doc:
-            text = page.get_text("text", sort=True)
-            if text and text.strip():
-                parts.append(text.strip())
-            elif not text or not text.strip():
-                # Fallback: build from dict blocks (sometimes yields text when "text" is empty)
-                try:
-                    d = page.get_text("dict", sort=True)
-                    for block in d.get("blocks", []):
-                        for line in block.get("lines", []):
-                            for span in line.get("spans", []):
-                                t = (span.get("text") or "").strip()
-                                if t:
-                                    parts.append(t)
-                except Exception:
-                    pass
-        out = "\n\n".join(parts) if parts else ""
-        n = len(out.strip())
+        parts: list[str] = []
+        total = 0
+        scanned = False  # text up to the previous page has been searched for the header
+        for page_no, page in enumerate(doc, start=1):
+            page_parts = _page_text_parts(page)
+            if not page_parts:
+                continue
+            # Length of "\n\n".join(parts): one separator between consecutive parts
+            total += sum(len(t) for t in page_parts) + 2 * (len(page_parts) - (0 if parts else 1))
+            n_before = len(parts)
+            parts.extend(page_parts)
+            if max_chars is None or total <= max_chars:
+                continue
+            if not scanned:
+                window = "\n\n".join(parts)
+                scanned = True
+            else:
+                # Only a match that ends in the new text can be new. It starts at a newline, and
+                # can start at the last one before the new page, so rescan from there only.
+                last = parts[n_before - 1]
+                nl = last.rfind("\n")
+                tail = last[nl:] if nl != -1 else ("\n" if n_before > 1 else "") + last
+                window = tail + "\n\n" + "\n\n".join(page_parts)
+            if _STRIP_SECTION_PATTERNS.search(window):
+                logger.debug("Stopped reading %s after page %d/%d", path.name, page_no, doc.page_count)
+                break
+        # Parts are already stripped, so the joined text needs no further strip
+        out = "\n\n".join(parts)
+        n = len(out)
         logger.info("PDF text extracted: %s -> %d chars", path.name, n)
         if n == 0 and use_ocr:
             logger.warning("No text extracted from %s; OCR requested but not implemented", path)
@@ -153,10 +295,38 @@ def extract_text(
     pdf_path: str | Path,
     use_ocr: bool = False,
     max_chars: int = 120000,
+    cache_dir: str | Path | None = None,
 ) -> str:
     """
     Best-effort text extraction with smart section filtering.
     Removes references section and applies smart truncation to max_chars.
+
+    cache_dir: keep the result there, keyed by the PDF's sha256 and max_chars, so a file
+    already extracted once (a paper retried on a later run, one PDF under two ids) is
+    read back instead of parsed again.
     """
-    raw = extract_text_fitz(pdf_path, use_ocr=use_ocr)
-    return extract_key_sections(raw, max_chars=max_chars)
+    cache_path = None
+    if cache_dir is not None:
+        with open(pdf_path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+        cache_path = Path(cache_dir) / f"{digest}-{max_chars}.txt"
+        try:
+            text = cache_path.read_bytes().decode("utf-8")
+            logger.debug("PDF text cache hit for %s", Path(pdf_path).name)
+            return text
+        except FileNotFoundError:
+            pass
+    raw = extract_text_fitz(pdf_path, use_ocr=use_ocr, max_chars=max_chars)
+    text = extract_key_sections(raw, max_chars=max_chars)
+    if cache_path is not None:
+        # Write-then-rename: concurrent extraction workers never read a partial entry
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.part")
+        tmp_path.write_bytes(text.encode("utf-8"))
+        os.replace(tmp_path, cache_path)
+    return text
+
+
+def extraction_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Process pool for extract_text jobs; spawned, not forked, since callers are threaded."""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
@@ -7,26 +7,35 @@ Pipeline phases:
   2. Cross-source dedup (ID + normalized title); filter already-done papers via DB
   3. Keyword pre-filter: skip Stage-1 LLM for papers with no topic keyword in abstract
   4. Batched + parallel Stage-1 classification; resume from DB checkpoint if available
-  5. Sequential Stage-2 summarization (abstract-only fast path for high-relevance papers)
+  5. Stage-2 summarization on a bounded thread pool (abstract-only fast path for high-relevance papers)
   6. Single topic-grouped HTML digest email (recovers any STAGE2_OK from prior failed runs)
   7. Log run statistics
 """
 
-import json
+import hashlib
 import logging
 import re
+import threading
 import unicodedata
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from openai import OpenAI
+try:
+    import ahocorasick  # optional: pyahocorasick, single-pass multi-keyword matching
+except ImportError:
+    ahocorasick = None  # type: ignore
 
-from . import arxiv_client, blog_client, db, emailer, model_client, pdf_utils
+from . import arxiv_client, db, emailer, fastjson, model_client, pdf_utils
 from .config import load_config
+from .llm_cache import ResponseCache
+from .ratelimit import LLMRateLimiter
 from .topics import load_topics
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,11 +43,31 @@ logger = logging.getLogger(__name__)
 # Title normalisation for cross-source deduplication
 # ──────────────────────────────────────────────────────────────────────────────
 
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
 def _normalize_title(title: str) -> str:
     """Lowercase, strip accents, remove punctuation, collapse whitespace."""
-    t = unicodedata.normalize("NFKD", title.lower())
-    t = re.sub(r"[^\w\s]", "", t)
-    return re.sub(r"\s+", " ", t).strip()
+    t = _PUNCTUATION.sub("", unicodedata.normalize("NFKD", title.lower()))
+    # split()/join collapses and trims whitespace without a second regex pass
+    return " ".join(t.split())
+
+
+def _topics_hash(topics_list: list[dict[str, Any]]) -> str:
+    """Digest of the topic text Stage 1 is prompted with; stored next to stage1_json."""
+    desc = model_client._topics_desc(topics_list)
+    return hashlib.blake2b(desc.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _content_fingerprint(paper: dict[str, Any]) -> bytes:
+    """Digest of normalized title + abstract; equal for one paper listed under two IDs."""
+    abstract = " ".join((paper.get("abstract") or "").split())
+    key = f"{_normalize_title(paper['title'])}|{abstract}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+# Characters not allowed in failure-dump filenames (ids like "semantic_scholar:abc/1")
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w\-.]")
 
 
 def _save_failure_raw(
@@ -48,7 +77,7 @@ def _save_failure_raw(
     try:
         logs_dir = db_path.resolve().parent.parent / "logs" / f"{stage}_failures"
         logs_dir.mkdir(parents=True, exist_ok=True)
-        safe_id = re.sub(r"[^\w\-.]", "_", arxiv_id)
+        safe_id = _UNSAFE_FILENAME_CHARS.sub("_", arxiv_id)
         raw_path = logs_dir / f"{safe_id}.raw.txt"
         meta_path = logs_dir / f"{safe_id}.meta.txt"
         raw_path.write_text(raw or "(empty)", encoding="utf-8")
@@ -63,12 +92,31 @@ def _save_failure_raw(
         return Path()
 
 
+def _make_llm_client(model_cfg: dict[str, Any]) -> "OpenAI":
+    """OpenAI-compatible client for the configured server; imports the SDK on first use."""
+    from openai import OpenAI
+
+    return OpenAI(
+        base_url=model_cfg["base_url"],
+        api_key=model_cfg.get("api_key") or "dummy",
+        timeout=model_cfg.get("timeout_s", 60),
+        max_retries=0,  # chat_completion owns retries/backoff; SDK retries would multiply them
+    )
+
+
+def _max_relevance(stage1: dict[str, Any]) -> float:
+    """Highest topic relevance in a Stage-1 result (0 when there are no topics)."""
+    return max((t.get("relevance", 0) for t in stage1.get("topics") or []), default=0)
+
+
 def _log_stage1_scores(
     db_path: Path,
     stage1_results: dict[str, dict[str, Any]],
+    max_relevances: dict[str, float],
     threshold: float,
 ) -> None:
-    """Append Stage1 scores to logs/stage1_scores.log (JSONL) for threshold tuning."""
+    """Append Stage1 scores to logs/stage1_scores.log (JSONL) for threshold tuning.
+    max_relevances holds _max_relevance() of each result, computed once by the caller."""
     if not stage1_results:
         return
     try:
@@ -78,7 +126,7 @@ def _log_stage1_scores(
         with open(log_file, "a", encoding="utf-8") as f:
             for arxiv_id, stage1 in stage1_results.items():
                 topics = stage1.get("topics") or []
-                max_rel = max((t.get("relevance", 0) for t in topics), default=0)
+                max_rel = max_relevances[arxiv_id]
                 rec = {
                     "paper_id": arxiv_id,
                     "max_relevance": round(max_rel, 4),
@@ -89,7 +137,7 @@ def _log_stage1_scores(
                         for t in topics
                     ],
                 }
-                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                f.write(fastjson.dumps(rec) + "\n")
         logger.info("Stage1 scores written to %s (%d papers)", log_file, len(stage1_results))
     except OSError as e:
         logger.warning("Could not write stage1_scores.log: %s", e)
@@ -100,17 +148,41 @@ def _log_stage1_scores(
 # ──────────────────────────────────────────────────────────────────────────────
 
 def _build_keyword_set(topics_config: list[dict]) -> frozenset[str]:
-    """Collect all topic keywords, lower-cased, into a single set."""
+    """
+    Collect all topic keywords, lower-cased, into a single set.
+    Keywords containing a shorter keyword (e.g. "kv cache compression" vs "kv cache")
+    are dropped: they can never decide a match, and non-matching papers scan every keyword.
+    """
     kws: set[str] = set()
     for topic in topics_config:
         for kw in topic.get("keywords", []):
             kws.add(kw.lower())
-    return frozenset(kws)
+    return frozenset(kw for kw in kws if not any(other != kw and other in kw for other in kws))
+
+
+def _build_keyword_automaton(keyword_set: frozenset[str]) -> Any:
+    """Aho-Corasick automaton over keyword_set, or None when pyahocorasick is not installed."""
+    if ahocorasick is None or not keyword_set or "" in keyword_set:
+        return None
+    automaton = ahocorasick.Automaton()
+    for kw in keyword_set:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
 
 
-def _has_keyword_match(paper: dict[str, Any], keyword_set: frozenset[str]) -> bool:
-    """Return True if title + abstract contain at least one topic keyword."""
+def _has_keyword_match(
+    paper: dict[str, Any],
+    keyword_set: frozenset[str],
+    automaton: Any = None,
+) -> bool:
+    """
+    Return True if title + abstract contain at least one topic keyword.
+    With an automaton the text is scanned once for all keywords; otherwise once per keyword.
+    """
     text = f"{paper.get('title', '')} {paper.get('abstract', '')}".lower()
+    if automaton is not None:
+        return next(automaton.iter(text), None) is not None
     return any(kw in text for kw in keyword_set)
 
 
@@ -124,9 +196,18 @@ def _get_full_text(
     save_text: bool,
     text_dir: Path,
     db_path: Path,
+    prefetch_error: Exception | None = None,
+    extracted: Future[str] | None = None,
+    max_text_chars: int = 120000,
+    text_cache_dir: Path | None = None,
 ) -> str | None:
     """
     Download PDF, extract text, then DELETE the PDF to free disk space.
+    A PDF already present in pdf_dir (prefetched) is used as-is; prefetch_error is the
+    failure from a prefetch attempt, in which case the download is not retried.
+    extracted is a pending background extraction of that PDF, if one was started.
+    Extracted text is cut to max_text_chars by pdf_utils.extract_text, which reuses a result
+    from text_cache_dir for a PDF it has already extracted.
     Falls back to abstract on any failure.
     Returns None if no usable text is available.
     """
@@ -143,7 +224,10 @@ def _get_full_text(
 
     pdf_path = pdf_dir / f"{arxiv_id}.pdf"
     try:
-        pdf_utils.download_pdf(paper["pdf_url"], pdf_path, timeout_s=90)
+        if prefetch_error is not None:
+            raise prefetch_error
+        if not pdf_path.exists():
+            pdf_utils.download_pdf(paper["pdf_url"], pdf_path, timeout_s=90)
     except Exception as e:
         logger.warning("PDF download failed for %s (%s); falling back to abstract", arxiv_id, e)
         full_text = (paper.get("abstract") or "").strip() or "(No abstract)"
@@ -156,7 +240,9 @@ def _get_full_text(
     db.mark_status(db_path, arxiv_id, db.PDF_DOWNLOADED)
 
     try:
-        full_text = pdf_utils.extract_text(pdf_path)
+        full_text = extracted.result() if extracted is not None else pdf_utils.extract_text(
+            pdf_path, max_chars=max_text_chars, cache_dir=text_cache_dir,
+        )
     except Exception as e:
         logger.warning("Text extraction failed for %s (%s); falling back to abstract", arxiv_id, e)
         full_text = (paper.get("abstract") or "").strip() or "(No abstract)"
@@ -174,10 +260,12 @@ def _get_full_text(
             logger.debug("Could not delete PDF %s: %s", pdf_path, e)
 
     if save_text:
-        (text_dir / f"{arxiv_id}.txt").write_text(full_text, encoding="utf-8")
+        # Encode once and write the bytes directly, skipping the text-mode wrapper
+        (text_dir / f"{arxiv_id}.txt").write_bytes(full_text.encode("utf-8"))
 
-    n_chars = len(full_text.strip())
-    if full_text.strip().startswith("[Extraction failed:") or n_chars < 100:
+    stripped = full_text.strip()
+    n_chars = len(stripped)
+    if n_chars < 100 or stripped.startswith("[Extraction failed:"):
         fallback = (paper.get("abstract") or "").strip() or "(No abstract)"
         if len(fallback) >= 50:
             logger.warning("PDF text ineffective for %s (%d chars); using abstract", arxiv_id, n_chars)
@@ -194,11 +282,24 @@ def _get_full_text(
 # Main pipeline
 # ──────────────────────────────────────────────────────────────────────────────
 
-def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str, int]:
+def run_pipeline(
+    config_path: str | Path,
+    topics_path: str | Path,
+    use_cache: bool = True,
+) -> dict[str, int]:
     """
     Load config and topics, ensure DB/storage dirs, fetch papers, then process.
+    use_cache=False bypasses the LLM reply cache (no lookups, no writes) for this run.
     Returns a stats dict with counts for the run.
     """
+    try:
+        return _run_pipeline(config_path, topics_path, use_cache)
+    finally:
+        # Worker threads' connections close with their threads; this one would outlive the run
+        db.close_connections()
+
+
+def _run_pipeline(config_path: str | Path, topics_path: str | Path, use_cache: bool) -> dict[str, int]:
     run_start = datetime.now(timezone.utc)
     config = load_config(config_path)
     topics_list = load_topics(topics_path)
@@ -208,38 +309,74 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
     pdf_dir = Path(storage["pdf_dir"])
     text_dir = Path(storage["text_dir"])
     save_text = storage["save_text"]
+    download_workers = int(storage.get("download_workers", 1))
+    # arXiv serves every PDF from one host, so this caps the effective download parallelism
+    download_per_host = int(storage.get("download_per_host", 2))
+    extract_workers = int(storage.get("extract_workers", 1))
+    # Extracted text keyed by PDF content hash, so a re-downloaded PDF is not parsed again (unset = off)
+    text_cache_dir = Path(storage["text_cache_dir"]) if storage.get("text_cache_dir") else None
     pdf_dir.mkdir(parents=True, exist_ok=True)
     if save_text:
         text_dir.mkdir(parents=True, exist_ok=True)
     db.ensure_db(db_path)
 
     model_cfg = config["model"]
-    client = OpenAI(
-        base_url=model_cfg["base_url"],
-        api_key=model_cfg.get("api_key") or "dummy",
-        timeout=model_cfg.get("timeout_s", 60),
-    )
     model_name = model_cfg["model_name"]
     stage1_model_name = model_cfg.get("stage1_model_name") or model_name
+    # Model that re-emits an unparseable reply as valid JSON (unset = the stage's own model)
+    repair_model_name = model_cfg.get("repair_model_name")
     stage1_workers = int(model_cfg.get("stage1_workers", 1))
+    # Stage-2 papers are independent: run several summaries concurrently against the server
+    stage2_workers = int(model_cfg.get("stage2_workers", 1))
     # Batch multiple papers into one Stage-1 LLM call (reduces API call count)
     stage1_batch_size = int(model_cfg.get("stage1_batch_size", 1))
     temperature = model_cfg.get("temperature", 0)
     timeout_s = model_cfg.get("timeout_s", 120)
+    llm_max_retries = int(model_cfg.get("max_retries", 3))
     # vLLM 在启用 --reasoning-parser 时会把 thinking 放在 message.reasoning、最终答案放在 message.content；我们只用 content 解析
     # 仅当显式关闭 thinking 时才传 extra_body（默认不传，保留推理）
     enable_thinking = model_cfg.get("enable_thinking", True)
     llm_extra_body = None if enable_thinking else {"chat_template_kwargs": {"enable_thinking": False}}
+    # Server-side JSON-constrained decoding for single-object replies (batch replies are arrays)
+    json_format = {"type": "json_object"} if model_cfg.get("json_mode") else None
+    # Stream replies and cancel generation once the JSON answer is complete (drops trailing chatter)
+    stream_early_stop = bool(model_cfg.get("stream_early_stop", False))
     stage1_max_tokens = int(model_cfg.get("stage1_max_tokens", 8192))
     stage2_max_tokens = int(model_cfg.get("stage2_max_tokens", 8192))
+    # Server context length (vLLM --max-model-len); Stage-2 paper text is cut to fit it with the output
+    context_tokens = model_cfg.get("context_tokens")
+    # Longest PDF text handed to Stage 2; extraction stops reading and cuts there (head + conclusion)
+    max_text_chars = int(model_cfg.get("max_text_chars", 120000))
+    # Optional wall-clock budget per LLM call including retries (None = retries bounded by count only)
+    call_deadline_s = model_cfg.get("call_deadline_s")
+    # Client-side RPM/TPM governor shared by all Stage-1/Stage-2 threads (unset = no limit)
+    rpm, tpm = model_cfg.get("requests_per_minute"), model_cfg.get("tokens_per_minute")
+    llm_limiter = LLMRateLimiter(rpm, tpm) if rpm or tpm else None
+    # Replies that parsed are cached by (model, temperature, messages) so reruns skip the server
+    cache_ttl_days = float(model_cfg.get("cache_ttl_days", 7))
+    llm_cache = (
+        ResponseCache(db_path, ttl_s=cache_ttl_days * 86400) if use_cache and cache_ttl_days > 0 else None
+    )
+
+    def _cache_result(
+        cache_model: str, messages: list[dict[str, str]], result: dict[str, Any], raw: str,
+    ) -> None:
+        # A replayed reply is already stored; putting it again would reset its TTL on every hit
+        if llm_cache is not None and not isinstance(raw, model_client.CachedReply):
+            llm_cache.put(cache_model, temperature, messages, fastjson.dumps(result))
 
     threshold_cfg = config["thresholds"]
     threshold = threshold_cfg["relevance"]
     # Abstract-only fast path: skip PDF when abstract is rich + relevance is very high
     abstract_only_threshold = float(threshold_cfg.get("abstract_only_relevance", 0.92))
     abstract_min_length = int(threshold_cfg.get("abstract_min_length", 500))
+    # Borderline papers (relevance below this, still >= threshold) are also summarized from
+    # the abstract, skipping their PDF work (unset = off)
+    borderline_below = threshold_cfg.get("abstract_only_below")
+    abstract_only_below = float(borderline_below) if borderline_below is not None else None
 
     keyword_set = _build_keyword_set(topics_list)
+    keyword_automaton = _build_keyword_automaton(keyword_set)
     logger.debug("Keyword pre-filter: %d unique keywords across %d topics",
                  len(keyword_set), len(topics_list))
 
@@ -249,13 +386,8 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
         categories=arxiv_cfg["categories"],
         max_results_per_category=arxiv_cfg["max_results_per_category"],
         days_back=arxiv_cfg.get("days_back", 1),
+        max_workers=int(arxiv_cfg.get("fetch_workers", 1)),
     ))
-    seen_ids: set[str] = {p["arxiv_id"] for p in papers}
-    seen_titles: set[str] = {_normalize_title(p["title"]) for p in papers}
-    # Seed seen_titles with already-processed papers from DB to avoid cross-day, cross-source dups
-    # (e.g. paper emailed yesterday via arXiv ID, returns today via Semantic Scholar with a different ID)
-    for t in db.get_processed_titles(db_path):
-        seen_titles.add(_normalize_title(t))
 
     # Semantic Scholar API (no browser, no captcha)
     ss_cfg = config.get("semantic_scholar") or {}
@@ -270,7 +402,18 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
                 max_retries_429=ss_cfg.get("max_retries_429", 3),
                 api_key=ss_cfg.get("api_key"),
                 user_agent=ss_cfg.get("user_agent"),
+                max_workers=int(ss_cfg.get("fetch_workers", 1)),
+                burst=int(ss_cfg.get("burst", 1)),
             )
+            # Title sets are only needed to dedup these results, so the DB's processed titles
+            # (one per paper ever seen, growing every day) are read and normalized only here
+            seen_ids: set[str] = {p["arxiv_id"] for p in papers}
+            seen_titles: set[str] = set()
+            if ss_papers:
+                seen_titles = {_normalize_title(p["title"]) for p in papers}
+                # Seed with already-processed papers to avoid cross-day, cross-source dups (e.g. paper
+                # emailed yesterday via arXiv ID, returns today via Semantic Scholar with a different ID)
+                seen_titles.update(_normalize_title(t) for t in db.get_processed_titles(db_path))
             added = 0
             for p in ss_papers:
                 norm = _normalize_title(p["title"])
@@ -290,6 +433,7 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
         "total": total_fetched,
         "skipped_existing": 0,
         "skipped_keyword": 0,
+        "skipped_duplicate": 0,
         "stage1_run": 0,
         "stage1_failed": 0,
         "skipped_irrelevant": 0,
@@ -302,83 +446,98 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
 
     # ── Phase 1: Filter already-done + keyword pre-filter ─────────────────────
     new_papers: list[dict[str, Any]] = []
+    keyword_skipped_ids: list[str] = []
+    # Same title + abstract under another ID (re-submission, cross-listing): classify once
+    duplicate_ids: list[str] = []
+    seen_content: set[bytes] = set()
+    upsert_rows: list[tuple[str, str, str, str]] = []
+    done_ids = db.filter_done_ids(db_path, [p["arxiv_id"] for p in papers])
     for paper in papers:
         arxiv_id = paper["arxiv_id"]
 
-        if db.is_in_progress_or_processed(db_path, arxiv_id):
+        if arxiv_id in done_ids:
             stats["skipped_existing"] += 1
             continue
 
-        if not _has_keyword_match(paper, keyword_set):
-            db.upsert_paper_metadata(
-                db_path, arxiv_id, paper["title"],
-                ",".join(paper.get("categories", [])), status=db.NEW,
-            )
-            db.mark_status(db_path, arxiv_id, db.SKIPPED)
+        upsert_rows.append((arxiv_id, paper["title"], ",".join(paper.get("categories", [])), db.NEW))
+        if not _has_keyword_match(paper, keyword_set, keyword_automaton):
+            keyword_skipped_ids.append(arxiv_id)
             stats["skipped_keyword"] += 1
             continue
 
-        db.upsert_paper_metadata(
-            db_path, arxiv_id, paper["title"],
-            ",".join(paper.get("categories", [])), status=db.NEW,
-        )
+        fingerprint = _content_fingerprint(paper)
+        if fingerprint in seen_content:
+            duplicate_ids.append(arxiv_id)
+            stats["skipped_duplicate"] += 1
+            continue
+        seen_content.add(fingerprint)
+
         new_papers.append(paper)
 
+    # One transaction for all metadata rows instead of one per paper
+    db.upsert_many(db_path, upsert_rows)
+    db.mark_status(db_path, keyword_skipped_ids + duplicate_ids, db.SKIPPED)
+
     logger.info(
-        "%d new papers for Stage 1 (keyword pre-filter: %d skipped)",
-        len(new_papers), stats["skipped_keyword"],
+        "%d new papers for Stage 1 (keyword pre-filter: %d skipped, duplicates: %d)",
+        len(new_papers), stats["skipped_keyword"], stats["skipped_duplicate"],
     )
     stats["stage1_run"] = len(new_papers)
+    # Importing the OpenAI SDK takes ~0.5 s; a run with nothing new to classify never loads it
+    client = _make_llm_client(model_cfg) if new_papers else None
 
     # ── Phase 2: Batched + parallel Stage-1 classification ───────────────────
     stage1_restart_wait = 30 if stage1_workers > 1 else model_client.SERVER_RESTART_WAIT_S
     stage1_results: dict[str, dict] = {}
+    topics_hash = _topics_hash(topics_list)
+
+    def _stage1_checkpoint(arxiv_id: str) -> dict | None:
+        """Stage-1 result saved by an interrupted run, if it was made against the current topics."""
+        existing = db.get_paper(db_path, arxiv_id)
+        if not existing or not existing.get("stage1_json") or existing["status"] not in (
+            db.STAGE1_OK, db.STAGE1_RELEVANT, db.PDF_DOWNLOADED, db.TEXT_EXTRACTED,
+        ):
+            return None
+        # Rows from before topics_hash existed have no hash and are trusted as before
+        saved_hash = existing.get("topics_hash")
+        if saved_hash is not None and saved_hash != topics_hash:
+            logger.info("Stage1 checkpoint for %s was made with other topics; reclassifying", arxiv_id)
+            return None
+        logger.debug("Stage1 checkpoint recovered: %s", arxiv_id)
+        return fastjson.loads(existing["stage1_json"])
 
     def _run_stage1_single(paper: dict[str, Any]) -> tuple[str, dict | None]:
         """Classify a single paper; checkpoint-resumes from DB. Retries up to 3 times on parse failure."""
         arxiv_id = paper["arxiv_id"]
         try:
-            existing = db.get_paper(db_path, arxiv_id)
-            if existing and existing.get("stage1_json") and existing["status"] in (
-                db.STAGE1_OK, db.STAGE1_RELEVANT, db.PDF_DOWNLOADED, db.TEXT_EXTRACTED,
-            ):
-                stage1 = json.loads(existing["stage1_json"])
-                logger.debug("Stage1 checkpoint recovered: %s", arxiv_id)
+            stage1 = _stage1_checkpoint(arxiv_id)
+            if stage1 is not None:
                 return arxiv_id, stage1
 
             messages = model_client.build_stage1_prompt(topics_list, paper)
             last_error: Exception | None = None
+            raw = ""
             for attempt in range(3):
                 try:
-                    if attempt == 0:
-                        raw = model_client.chat_completion(
-                            client, stage1_model_name, messages,
-                            temperature=temperature, max_tokens=stage1_max_tokens, timeout_s=timeout_s,
-                            server_restart_wait_s=stage1_restart_wait,
-                            extra_body=llm_extra_body,
-                        )
-                    elif attempt == 1:
-                        # Repair: ask model to fix previous invalid output
-                        repair = [{"role": "user", "content":
-                                   "Return only valid JSON, no markdown, no thinking. Previous reply had errors.\n\n"
-                                   + (raw[:8000] if raw else "")}]
-                        raw = model_client.chat_completion(
-                            client, stage1_model_name, repair,
-                            temperature=0, max_tokens=stage1_max_tokens, timeout_s=timeout_s,
-                            server_restart_wait_s=stage1_restart_wait,
-                            extra_body=llm_extra_body,
-                        )
+                    if attempt == 1:
+                        # Repair: ask the repair model to fix the previous invalid output
+                        call_model = repair_model_name or stage1_model_name
+                        call_messages = model_client.build_json_repair_prompt(raw, 8000)
                     else:
-                        # Retry from scratch with original prompt
-                        raw = model_client.chat_completion(
-                            client, stage1_model_name, messages,
-                            temperature=0, max_tokens=stage1_max_tokens, timeout_s=timeout_s,
-                            server_restart_wait_s=stage1_restart_wait,
-                            extra_body=llm_extra_body,
-                        )
+                        # First try, then a retry from scratch with the original prompt
+                        call_model, call_messages = stage1_model_name, messages
+                    raw = model_client.chat_completion(
+                        client, call_model, call_messages,
+                        temperature=temperature if attempt == 0 else 0, max_tokens=stage1_max_tokens,
+                        timeout_s=timeout_s, max_retries=llm_max_retries, server_restart_wait_s=stage1_restart_wait,
+                        extra_body=llm_extra_body, cache=llm_cache if attempt == 0 else None,
+                        deadline_s=call_deadline_s, limiter=llm_limiter, response_format=json_format,
+                        stop_at_json_end=stream_early_stop,
+                    )
                     stage1 = model_client.parse_stage1_json(raw, arxiv_id)
+                    _cache_result(stage1_model_name, messages, stage1, raw)
                     db.mark_status(db_path, arxiv_id, db.STAGE1_OK,
-                                   stage1_json=json.dumps(stage1, ensure_ascii=False))
+                                   stage1_json=fastjson.dumps(stage1), topics_hash=topics_hash)
                     return arxiv_id, stage1
                 except ValueError as e:
                     last_error = e
@@ -387,8 +546,9 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
                     stage1, _ = model_client.try_parse_stage1_aggressive(raw, arxiv_id)
                     if stage1 is not None:
                         logger.info("Stage1 recovered for %s via aggressive parse (attempt %d)", arxiv_id, attempt + 1)
+                        _cache_result(stage1_model_name, messages, stage1, raw)
                         db.mark_status(db_path, arxiv_id, db.STAGE1_OK,
-                                       stage1_json=json.dumps(stage1, ensure_ascii=False))
+                                       stage1_json=fastjson.dumps(stage1), topics_hash=topics_hash)
                         return arxiv_id, stage1
                     if attempt < 2:
                         logger.info("Stage1 parse failed for %s (attempt %d/3), retrying LLM: %s", arxiv_id, attempt + 1, e)
@@ -402,8 +562,8 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
 
     def _run_stage1_batch(batch: list[dict[str, Any]]) -> list[tuple[str, dict | None]]:
         """
-        Classify a batch of papers in a single LLM call.
-        Falls back to individual calls if batch parsing fails or some papers are unmatched.
+        Classify a batch of papers in a single LLM call (checkpointed papers are skipped).
+        See _classify_batch for how failed or partial replies are retried.
         """
         # Separate checkpoint-recoverable papers from those needing LLM
         results: list[tuple[str, dict | None]] = []
@@ -411,12 +571,8 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
 
         for paper in batch:
             arxiv_id = paper["arxiv_id"]
-            existing = db.get_paper(db_path, arxiv_id)
-            if existing and existing.get("stage1_json") and existing["status"] in (
-                db.STAGE1_OK, db.STAGE1_RELEVANT, db.PDF_DOWNLOADED, db.TEXT_EXTRACTED,
-            ):
-                stage1 = json.loads(existing["stage1_json"])
-                logger.debug("Stage1 checkpoint recovered: %s", arxiv_id)
+            stage1 = _stage1_checkpoint(arxiv_id)
+            if stage1 is not None:
                 results.append((arxiv_id, stage1))
             else:
                 need_llm.append(paper)
@@ -430,48 +586,72 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
                 results.append(_run_stage1_single(paper))
             return results
 
-        # Try batch LLM call for papers needing classification
+        results.extend(_classify_batch(need_llm))
+        return results
+
+    def _classify_batch(papers: list[dict[str, Any]], allow_split: bool = True) -> list[tuple[str, dict | None]]:
+        """
+        One batch LLM call for papers. Papers the reply did not cover are re-batched;
+        a failed call is retried once as two half-size batches before going per-paper.
+        """
+        if len(papers) == 1:
+            return [_run_stage1_single(papers[0])]
         try:
-            messages = model_client.build_stage1_batch_prompt(topics_list, need_llm)
+            messages = model_client.build_stage1_batch_prompt(topics_list, papers)
             # Batch: per-paper room, cap to avoid OOM (e.g. 8192 * batch_size capped at 32k)
-            batch_max = min(stage1_max_tokens * len(need_llm), 32768)
+            batch_max = min(stage1_max_tokens * len(papers), 32768)
             raw = model_client.chat_completion(
                 client, stage1_model_name, messages,
                 temperature=temperature, max_tokens=batch_max,
                 timeout_s=timeout_s * 2,  # batches need more time
+                max_retries=llm_max_retries,
                 server_restart_wait_s=stage1_restart_wait,
-                extra_body=llm_extra_body,
+                extra_body=llm_extra_body, cache=llm_cache, deadline_s=call_deadline_s,
+                limiter=llm_limiter, stop_at_json_end=stream_early_stop,
             )
-            batch_results = model_client.parse_stage1_batch_json(raw, need_llm)
-            matched_ids = {aid for aid, _ in batch_results}
-
-            # Save results to DB
-            for arxiv_id, stage1 in batch_results:
-                if stage1 is not None:
-                    db.mark_status(db_path, arxiv_id, db.STAGE1_OK,
-                                   stage1_json=json.dumps(stage1, ensure_ascii=False))
-                    results.append((arxiv_id, stage1))
-                else:
-                    results.append((arxiv_id, None))
-
-            # Fall back to individual calls for unmatched papers
-            unmatched = [p for p in need_llm if p["arxiv_id"] not in matched_ids]
-            if unmatched:
+            batch_results = model_client.parse_stage1_batch_json(raw, papers)
+            if not batch_results:
+                raise ValueError("batch reply matched no papers")
+        except Exception as e:
+            if allow_split and len(papers) >= 4:
+                mid = len(papers) // 2
                 logger.warning(
-                    "Batch Stage1: %d/%d unmatched; falling back individually",
-                    len(unmatched), len(need_llm),
+                    "Batch Stage1 failed (%s); retrying as batches of %d and %d",
+                    e, mid, len(papers) - mid,
                 )
-                for paper in unmatched:
-                    results.append(_run_stage1_single(paper))
-
-        except Exception as e:
+                return _classify_batch(papers[:mid], False) + _classify_batch(papers[mid:], False)
             logger.warning(
                 "Batch Stage1 failed (%s); falling back to %d individual calls",
-                e, len(need_llm),
+                e, len(papers),
             )
-            for paper in need_llm:
-                results.append(_run_stage1_single(paper))
-
+            return [_run_stage1_single(paper) for paper in papers]
+
+        matched_ids = {aid for aid, _ in batch_results}
+        # Only a reply that covered every paper is worth replaying
+        if (
+            llm_cache is not None
+            and not isinstance(raw, model_client.CachedReply)
+            and len(matched_ids) == len(papers)
+            and all(s1 is not None for _, s1 in batch_results)
+        ):
+            llm_cache.put(stage1_model_name, temperature, messages, raw)
+
+        # Save results to DB
+        results: list[tuple[str, dict | None]] = []
+        for arxiv_id, stage1 in batch_results:
+            if stage1 is not None:
+                db.mark_status(db_path, arxiv_id, db.STAGE1_OK,
+                               stage1_json=fastjson.dumps(stage1), topics_hash=topics_hash)
+            results.append((arxiv_id, stage1))
+
+        # Re-batch papers the reply left out (one extra call instead of one per paper)
+        unmatched = [p for p in papers if p["arxiv_id"] not in matched_ids]
+        if unmatched:
+            logger.warning(
+                "Batch Stage1: %d/%d unmatched; re-batching them",
+                len(unmatched), len(papers),
+            )
+            results.extend(_classify_batch(unmatched, False))
         return results
 
     # Group into batches
@@ -488,15 +668,16 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
         )
 
     completed_count = 0
+    # Worker threads bump the counter concurrently; += on a closure variable is not atomic
+    progress_lock = threading.Lock()
 
     def _run_batch_with_logging(batch: list[dict[str, Any]]) -> list[tuple[str, dict | None]]:
         results = _run_stage1_batch(batch)
         nonlocal completed_count
-        completed_count += len(batch)
-        logger.info(
-            "Stage1 progress: %d/%d papers classified",
-            completed_count, len(new_papers),
-        )
+        with progress_lock:
+            completed_count += len(batch)
+            done = completed_count
+        logger.info("Stage1 progress: %d/%d papers classified", done, len(new_papers))
         return results
 
     if stage1_workers > 1 and len(batches) > 1:
@@ -521,120 +702,211 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
         len(stage1_results), stats["stage1_failed"],
     )
 
+    # Each paper's best topic score drives both the score log and the relevance filter
+    max_relevances = {aid: _max_relevance(s1) for aid, s1 in stage1_results.items()}
     # Record Stage1 scores for threshold tuning (e.g. after model change)
-    _log_stage1_scores(db_path, stage1_results, threshold)
+    _log_stage1_scores(db_path, stage1_results, max_relevances, threshold)
 
     # ── Phase 3: Stage-2 for relevant papers ─────────────────────────────────
     digest_summaries: list[dict[str, Any]] = []
 
+    # Relevance filter (cheap, main thread); collects the papers that need Stage 2
+    stage2_queue: list[tuple[dict[str, Any], dict[str, Any], float]] = []
+    irrelevant_ids: list[str] = []
     for paper in new_papers:
-        arxiv_id = paper["arxiv_id"]
-        stage1 = stage1_results.get(arxiv_id)
+        stage1 = stage1_results.get(paper["arxiv_id"])
         if stage1 is None:
             continue
-
-        max_relevance = max(
-            (t.get("relevance", 0) for t in stage1.get("topics", [])),
-            default=0,
-        )
+        max_relevance = max_relevances[paper["arxiv_id"]]
         if max_relevance < threshold:
-            db.mark_status(db_path, arxiv_id, db.SKIPPED)
-            stats["skipped_irrelevant"] += 1
+            irrelevant_ids.append(paper["arxiv_id"])
             continue
+        stage2_queue.append((paper, stage1, max_relevance))
+    db.mark_status(db_path, irrelevant_ids, db.SKIPPED)
+    db.mark_status(db_path, [p["arxiv_id"] for p, _, _ in stage2_queue], db.STAGE1_RELEVANT)
+    stats["skipped_irrelevant"] += len(irrelevant_ids)
+    stats["relevant"] += len(stage2_queue)
+
+    def _is_abstract_only(paper: dict[str, Any], max_relevance: float) -> bool:
+        """Abstract-only fast path: skip PDF when abstract is rich and relevance is very high
+        (or, with abstract_only_below set, only borderline)."""
+        if max_relevance < abstract_only_threshold and (
+            abstract_only_below is None or max_relevance >= abstract_only_below
+        ):
+            return False
+        return len((paper.get("abstract") or "").strip()) >= abstract_min_length
+
+    # Prefetch PDFs for relevant papers concurrently; Stage 2 then runs on local files
+    prefetch_errors: dict[str, Exception | None] = {}
+    prefetched_texts: dict[str, Future[str]] = {}
+    extract_pool = None
+    if download_workers > 1:
+        jobs: list[tuple[str, Path]] = []
+        job_ids: dict[Path, str] = {}
+        for paper, _, max_relevance in stage2_queue:
+            if not paper.get("pdf_url") or _is_abstract_only(paper, max_relevance):
+                continue
+            pdf_path = pdf_dir / f"{paper['arxiv_id']}.pdf"
+            jobs.append((paper["pdf_url"], pdf_path))
+            job_ids[pdf_path] = paper["arxiv_id"]
+        if jobs:
+            logger.info(
+                "Prefetching %d PDFs (workers=%d, per host=%d)", len(jobs), download_workers, download_per_host,
+            )
+            if download_per_host < download_workers:
+                logger.info(
+                    "storage.download_per_host=%d limits downloads from a single host below download_workers=%d",
+                    download_per_host, download_workers,
+                )
+            if extract_workers > 1:
+                # Each PDF is handed to extraction as soon as its download finishes, so
+                # extraction overlaps the remaining downloads and then Stage 2; each paper
+                # waits only for its own text. Downloads start in queue order, so the
+                # first Stage-2 papers are usually ready first.
+                extract_pool = pdf_utils.extraction_pool(min(extract_workers, len(jobs)))
+
+            def _extract_when_downloaded(path: Path, err: Exception | None) -> None:
+                if err is None and extract_pool is not None:
+                    prefetched_texts[job_ids[path]] = extract_pool.submit(
+                        pdf_utils.extract_text, path, max_chars=max_text_chars, cache_dir=text_cache_dir,
+                    )
 
-        stats["relevant"] += 1
-        db.mark_status(db_path, arxiv_id, db.STAGE1_RELEVANT)
+            downloaded = pdf_utils.download_pdfs(
+                jobs, max_workers=download_workers, max_per_host=download_per_host,
+                timeout_s=90, on_done=_extract_when_downloaded,
+            )
+            prefetch_errors = {job_ids[path]: err for path, err in downloaded.items()}
 
+    def _run_stage2(
+        paper: dict[str, Any], stage1: dict[str, Any], max_relevance: float,
+    ) -> tuple[dict[str, Any] | None, bool]:
+        """Get text and summarize one paper. Returns (stage2 or None on failure, used_abstract_only)."""
+        arxiv_id = paper["arxiv_id"]
+        abstract_only = False
         try:
-            # Abstract-only fast path: skip PDF when abstract is rich + relevance is very high
-            abstract = (paper.get("abstract") or "").strip()
-            if max_relevance >= abstract_only_threshold and len(abstract) >= abstract_min_length:
-                full_text = abstract
+            if _is_abstract_only(paper, max_relevance):
+                abstract_only = True
+                full_text = (paper.get("abstract") or "").strip()
                 db.mark_status(db_path, arxiv_id, db.TEXT_EXTRACTED)
-                stats["abstract_only"] += 1
                 logger.debug(
                     "Abstract-only fast path for %s (relevance=%.2f, abstract=%d chars)",
-                    arxiv_id, max_relevance, len(abstract),
+                    arxiv_id, max_relevance, len(full_text),
                 )
             else:
-                full_text = _get_full_text(paper, pdf_dir, save_text, text_dir, db_path)
+                full_text = _get_full_text(
+                    paper, pdf_dir, save_text, text_dir, db_path,
+                    prefetch_error=prefetch_errors.get(arxiv_id),
+                    extracted=prefetched_texts.get(arxiv_id),
+                    max_text_chars=max_text_chars, text_cache_dir=text_cache_dir,
+                )
                 if full_text is None:
-                    stats["stage2_failed"] += 1
-                    continue
+                    return None, abstract_only
 
             # Stage 2: up to 3 attempts (original -> repair -> retry from scratch)
-            messages_s2 = model_client.build_stage2_prompt(
-                paper, full_text, stage1.get("topics", []),
-            )
+            stage1_topics = model_client.format_stage1_topics(stage1.get("topics", []))
+            messages_s2 = model_client.build_stage2_prompt(paper, full_text, stage1_topics)
+            if context_tokens:
+                over = model_client.estimate_tokens(messages_s2) + stage2_max_tokens - int(context_tokens)
+                if over > 0:
+                    # Same head + conclusion cut as extraction, just tighter, instead of a server 400
+                    budget = max(2000, len(full_text) - over * model_client.CHARS_PER_TOKEN)
+                    logger.info(
+                        "Stage2 text for %s cut %d -> %d chars to fit context_tokens=%s",
+                        arxiv_id, len(full_text), budget, context_tokens,
+                    )
+                    full_text = pdf_utils.extract_key_sections(full_text, budget)
+                    messages_s2 = model_client.build_stage2_prompt(paper, full_text, stage1_topics)
             last_s2_error: Exception | None = None
             raw_s2 = ""
             for attempt in range(3):
                 try:
-                    if attempt == 0:
-                        raw_s2 = model_client.chat_completion(
-                            client, model_name, messages_s2,
-                            temperature=temperature, max_tokens=stage2_max_tokens, timeout_s=timeout_s,
-                            extra_body=llm_extra_body,
-                        )
-                    elif attempt == 1:
-                        repair_msg = [{"role": "user", "content":
-                                       "Return only valid JSON, no markdown, no thinking. Previous reply had errors.\n\n"
-                                       + raw_s2[:12000]}]
-                        raw_s2 = model_client.chat_completion(
-                            client, model_name, repair_msg,
-                            temperature=0, max_tokens=stage2_max_tokens, timeout_s=timeout_s,
-                            extra_body=llm_extra_body,
-                        )
+                    if attempt == 1:
+                        call_model = repair_model_name or model_name
+                        call_messages = model_client.build_json_repair_prompt(raw_s2, 12000)
                     else:
-                        raw_s2 = model_client.chat_completion(
-                            client, model_name, messages_s2,
-                            temperature=0, max_tokens=stage2_max_tokens, timeout_s=timeout_s,
-                            extra_body=llm_extra_body,
-                        )
-                    stage2 = model_client.parse_stage2_json(raw_s2, arxiv_id)
-                    db.mark_status(
-                        db_path, arxiv_id, db.STAGE2_OK,
-                        stage2_json=json.dumps(stage2, ensure_ascii=False),
+                        call_model, call_messages = model_name, messages_s2
+                    raw_s2 = model_client.chat_completion(
+                        client, call_model, call_messages,
+                        temperature=temperature if attempt == 0 else 0, max_tokens=stage2_max_tokens,
+                        timeout_s=timeout_s, max_retries=llm_max_retries, extra_body=llm_extra_body,
+                        cache=llm_cache if attempt == 0 else None, deadline_s=call_deadline_s,
+                        limiter=llm_limiter, response_format=json_format, stop_at_json_end=stream_early_stop,
                     )
-                    digest_summaries.append(stage2)
-                    stats["stage2_ok"] += 1
-                    logger.info("Stage2 done: %s", arxiv_id)
-                    break
+                    stage2 = model_client.parse_stage2_json(raw_s2, arxiv_id)
                 except ValueError as e:
                     last_s2_error = e
                     _save_failure_raw(db_path, "stage2", arxiv_id, raw_s2, str(e), attempt + 1)
                     stage2, _ = model_client.try_parse_stage2_aggressive(raw_s2, arxiv_id)
-                    if stage2 is not None:
-                        logger.info("Stage2 recovered for %s via aggressive parse (attempt %d)", arxiv_id, attempt + 1)
-                        db.mark_status(
-                            db_path, arxiv_id, db.STAGE2_OK,
-                            stage2_json=json.dumps(stage2, ensure_ascii=False),
-                        )
-                        digest_summaries.append(stage2)
-                        stats["stage2_ok"] += 1
-                        logger.info("Stage2 done: %s", arxiv_id)
-                        break
-                    if attempt < 2:
-                        logger.info("Stage2 parse failed for %s (attempt %d/3), retrying LLM: %s", arxiv_id, attempt + 1, e)
-                if attempt == 2:
-                    raise (last_s2_error or RuntimeError("Stage2 parse failed"))
+                    if stage2 is None:
+                        if attempt < 2:
+                            logger.info("Stage2 parse failed for %s (attempt %d/3), retrying LLM: %s", arxiv_id, attempt + 1, e)
+                        continue
+                    logger.info("Stage2 recovered for %s via aggressive parse (attempt %d)", arxiv_id, attempt + 1)
+                _cache_result(model_name, messages_s2, stage2, raw_s2)
+                db.mark_status(
+                    db_path, arxiv_id, db.STAGE2_OK,
+                    stage2_json=fastjson.dumps(stage2),
+                )
+                logger.info("Stage2 done: %s", arxiv_id)
+                return stage2, abstract_only
+            raise (last_s2_error or RuntimeError("Stage2 parse failed"))
 
         except Exception as e:
             logger.exception("Stage2 error for %s: %s", arxiv_id, e)
             db.mark_status(db_path, arxiv_id, db.FAILED, error_message=str(e))
+            return None, abstract_only
+
+    try:
+        if stage2_workers > 1 and len(stage2_queue) > 1:
+            logger.info("Stage 2: %d papers (workers=%d)", len(stage2_queue), stage2_workers)
+            with ThreadPoolExecutor(max_workers=stage2_workers) as executor:
+                # map() keeps digest order identical to the sequential path
+                stage2_outcomes = list(executor.map(lambda item: _run_stage2(*item), stage2_queue))
+        elif download_workers <= 1 and len(stage2_queue) > 1:
+            # No bulk prefetch: download the next paper's PDF while this one is in Stage 2
+            stage2_outcomes = []
+            with ThreadPoolExecutor(max_workers=1) as lookahead:
+                pending: tuple[str, Future[Path]] | None = None
+                for i, item in enumerate(stage2_queue):
+                    if pending is not None:
+                        pending_id, future = pending
+                        prefetch_errors[pending_id] = future.exception()
+                        pending = None
+                    if i + 1 < len(stage2_queue):
+                        nxt, _, nxt_relevance = stage2_queue[i + 1]
+                        if nxt.get("pdf_url") and not _is_abstract_only(nxt, nxt_relevance):
+                            pending = nxt["arxiv_id"], lookahead.submit(
+                                pdf_utils.download_pdf, nxt["pdf_url"], pdf_dir / f"{nxt['arxiv_id']}.pdf", timeout_s=90,
+                            )
+                    stage2_outcomes.append(_run_stage2(*item))
+        else:
+            stage2_outcomes = [_run_stage2(*item) for item in stage2_queue]
+    finally:
+        if extract_pool is not None:
+            extract_pool.shutdown(cancel_futures=True)
+
+    for stage2, abstract_only in stage2_outcomes:
+        stats["abstract_only"] += int(abstract_only)
+        if stage2 is None:
             stats["stage2_failed"] += 1
+            continue
+        digest_summaries.append(stage2)
+        stats["stage2_ok"] += 1
 
     # ── Phase 3b: Fetch blog posts (no LLM, direct to digest) ─────────────────
     blog_posts_for_digest: list[dict[str, Any]] = []
     blogs_cfg = config.get("blogs") or {}
     if blogs_cfg.get("enabled") and blogs_cfg.get("sources"):
         try:
+            # Imported here (bs4 + feedparser) so runs without blogs skip the cost
+            from . import blog_client
             blog_days_back = int(blogs_cfg.get("days_back", 3))
             delay = float(blogs_cfg.get("delay_between_sources", 2.0))
             all_blog_posts = blog_client.fetch_all_blogs(
                 blogs_cfg["sources"],
                 days_back=blog_days_back,
                 delay_between_sources=delay,
+                max_workers=int(blogs_cfg.get("fetch_workers", 4)),
             )
             new_blog_count = 0
             for post in all_blog_posts:
@@ -679,6 +951,7 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
             for i in range(0, total, max_per_email)
         ] if digest_summaries else [[]]
         num_emails = len(chunks)
+        outgoing: list[tuple[str, str]] = []
         for idx, chunk in enumerate(chunks):
             n = len(chunk)
             # Build subject line reflecting both papers and blogs
@@ -700,31 +973,41 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
                 topics_config=topics_list,
                 blog_posts=chunk_blogs,
             )
-            try:
-                emailer.send_digest_email(
-                    smtp_host=email_cfg["smtp_host"],
-                    smtp_port=email_cfg["smtp_port"],
-                    smtp_user=email_cfg.get("smtp_user", ""),
-                    smtp_password=email_cfg.get("smtp_password", ""),
-                    from_addr=email_cfg["from_addr"],
-                    to_addr=email_cfg["to_addr"],
-                    use_tls=email_cfg["use_tls"],
-                    subject=subject,
-                    body=html_body,
-                    is_html=True,
+            outgoing.append((subject, html_body))
+
+        # All chunks go out over one SMTP connection
+        send_errors = emailer.send_digest_emails(
+            smtp_host=email_cfg["smtp_host"],
+            smtp_port=email_cfg["smtp_port"],
+            smtp_user=email_cfg.get("smtp_user", ""),
+            smtp_password=email_cfg.get("smtp_password", ""),
+            from_addr=email_cfg["from_addr"],
+            to_addr=email_cfg["to_addr"],
+            use_tls=email_cfg["use_tls"],
+            messages=outgoing,
+            is_html=True,
+        )
+        for idx, (chunk, error) in enumerate(zip(chunks, send_errors)):
+            n = len(chunk)
+            chunk_blogs = blog_posts_for_digest if idx == 0 else None
+            if error is not None:
+                logger.error(
+                    "Digest email failed (chunk %d/%d): %s", idx + 1, num_emails, error,
+                    exc_info=error,
                 )
-                for summary in chunk:
-                    db.mark_status(db_path, summary["paper_id"], db.EMAILED)
+                continue
+            try:
+                db.mark_status(db_path, [summary["paper_id"] for summary in chunk], db.EMAILED)
                 # Mark blog posts as emailed
                 if chunk_blogs:
                     for post in chunk_blogs:
                         db.mark_blog_status(db_path, post["id"], db.EMAILED)
-                stats["emailed"] += n
-                stats["blogs_emailed"] = stats.get("blogs_emailed", 0) + len(chunk_blogs or [])
-                logger.info("Digest email sent: %d papers + %d blogs (part %d/%d) -> %s",
-                            n, len(chunk_blogs or []), idx + 1, num_emails, email_cfg["to_addr"])
             except Exception as e:
-                logger.exception("Digest email failed (chunk %d/%d): %s", idx + 1, num_emails, e)
+                logger.exception("Marking emailed papers failed (chunk %d/%d): %s", idx + 1, num_emails, e)
+            stats["emailed"] += n
+            stats["blogs_emailed"] = stats.get("blogs_emailed", 0) + len(chunk_blogs or [])
+            logger.info("Digest email sent: %d papers + %d blogs (part %d/%d) -> %s",
+                        n, len(chunk_blogs or []), idx + 1, num_emails, email_cfg["to_addr"])
     else:
         logger.info("No relevant papers or blogs found; no email sent")
 
@@ -732,10 +1015,10 @@ def run_pipeline(config_path: str | Path, topics_path: str | Path) -> dict[str,
     elapsed = (datetime.now(timezone.utc) - run_start).total_seconds()
     logger.info(
         "Pipeline finished in %.0fs | fetched=%d skipped_existing=%d skipped_keyword=%d "
-        "stage1_run=%d stage1_failed=%d relevant=%d abstract_only=%d "
+        "skipped_duplicate=%d stage1_run=%d stage1_failed=%d relevant=%d abstract_only=%d "
         "stage2_ok=%d stage2_failed=%d emailed=%d blogs=%d",
         elapsed,
-        stats["total"], stats["skipped_existing"], stats["skipped_keyword"],
+        stats["total"], stats["skipped_existing"], stats["skipped_keyword"], stats["skipped_duplicate"],
         stats["stage1_run"], stats["stage1_failed"], stats["relevant"], stats["abstract_only"],
         stats["stage2_ok"], stats["stage2_failed"], stats["emailed"],
         stats.get("blogs_emailed", 0),
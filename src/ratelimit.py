@@ -0,0 +1,76 @@
+"""
+Thread-safe token-bucket rate limiters shared by the HTTP and LLM clients.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Allow `rate` acquisitions per second on average, with bursts of up to `capacity`.
+    acquire() reserves a token under the lock and sleeps outside it, so concurrent
+    callers are spaced out in arrival order instead of all waking at once.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_interval(cls, interval_s: float, capacity: float = 1.0) -> "TokenBucket":
+        """Bucket allowing one acquisition every interval_s seconds."""
+        return cls(rate=1.0 / interval_s, capacity=capacity)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; return the number of seconds waited."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def drain(self) -> None:
+        """Empty the bucket (e.g. after an HTTP 429) so the next caller waits a full interval."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class LLMRateLimiter:
+    """
+    Client-side requests-per-minute / tokens-per-minute governor for LLM calls.
+    Either limit may be None (unlimited). The token bucket holds one minute's budget,
+    so a request larger than tpm simply waits until the debt is paid back.
+    """
+
+    def __init__(self, rpm: float | None = None, tpm: float | None = None) -> None:
+        self._requests = TokenBucket(rate=rpm / 60.0) if rpm else None
+        self._tokens = TokenBucket(rate=tpm / 60.0, capacity=tpm) if tpm else None
+
+    def acquire(self, estimated_tokens: int = 0) -> float:
+        """Block until one request (and estimated_tokens) fits; return seconds waited."""
+        waited = 0.0
+        if self._requests is not None:
+            waited += self._requests.acquire()
+        if self._tokens is not None and estimated_tokens > 0:
+            waited += self._tokens.acquire(estimated_tokens)
+        return waited
+
+    def drain(self) -> None:
+        """Back off after a 429: the next request waits a full interval."""
+        if self._requests is not None:
+            self._requests.drain()
@@ -20,7 +20,8 @@ DEFAULT_MAX_PER_QUERY = 10
 
 
 def _paper_id(title: str, authors: str, year: str) -> str:
-    h = hashlib.sha256(f"{title}|{authors}|{year}".encode()).hexdigest()[:14]
+    # Non-cryptographic use: blake2b sized to the 14 hex chars kept, instead of a truncated sha256
+    h = hashlib.blake2b(f"{title}|{authors}|{year}".encode(), digest_size=7).hexdigest()
     return f"scholar:{h}"
 
 
@@ -33,9 +34,13 @@ def fetch_papers(
     max_per_query: int = DEFAULT_MAX_PER_QUERY,
     max_retries: int = 1,
     delay_between_queries: float = 3.0,
+    fetch_abstract: bool = False,
 ) -> list[dict[str, Any]]:
     """
     Search Google Scholar for each query; take first page per query.
+    Results are used as the search page returns them; scholarly.fill() (one extra request
+    per result, and a common captcha trigger) only runs for a result without a title, or,
+    with fetch_abstract, for one without an abstract.
     Raises ScholarError (or re-raises underlying error) on captcha / driver missing / failure
     so the pipeline fails visibly and you can fix the environment.
     """
@@ -47,7 +52,9 @@ def fetch_papers(
     seen_ids: set[str] = set()
     all_papers: list[dict[str, Any]] = []
 
-    for q in queries:
+    for qi, q in enumerate(queries):
+        if qi > 0:
+            time.sleep(delay_between_queries)
         for attempt in range(max_retries):
             try:
                 gen = scholarly.search_pubs(q)
@@ -56,8 +63,11 @@ def fetch_papers(
                     if count >= max_per_query:
                         break
                     try:
-                        filled = scholarly.fill(pub) if not getattr(pub, "bib", None) else pub
-                        bib = getattr(filled, "bib", None) or {}
+                        filled = pub
+                        bib = getattr(pub, "bib", None) or {}
+                        if not bib.get("title") or (fetch_abstract and not bib.get("abstract")):
+                            filled = scholarly.fill(pub)
+                            bib = getattr(filled, "bib", None) or {}
                         title = (bib.get("title") or "").strip()
                         if not title:
                             continue
@@ -104,7 +114,6 @@ def fetch_papers(
                         "Google Scholar request failed. Common causes: (1) Captcha — install Chrome or Firefox + Geckodriver; "
                         "(2) Rate limit — increase delay_between_queries. Original error: %s" % e
                     ) from e
-        time.sleep(delay_between_queries)
 
     logger.info("Scholar total papers fetched: %d", len(all_papers))
     return all_papers
@@ -6,9 +6,14 @@ Handles 429 rate limit with retry and backoff.
 
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from . import fastjson
+from .ratelimit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +30,115 @@ DEFAULT_BACKOFF_BASE_S = 60
 # User-Agent 可提高无 key 时的配额（官方建议带项目/联系方式）
 DEFAULT_USER_AGENT = "arxiv-digest/1.0 (mailto:user@example.com)"
 
+# Shared session: every query goes to the same host, so keep-alive connections save a
+# TCP+TLS handshake per request. Pool sized for concurrent queries (fetch_workers).
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+
+def _search_query(
+    q: str,
+    params: dict[str, Any],
+    headers: dict[str, str],
+    timeout_s: int,
+    max_retries_429: int,
+    backoff_base_s: float,
+    limiter: TokenBucket | None,
+) -> dict[str, Any] | None:
+    """One search request with 429 retry/backoff; returns the decoded response or None on failure."""
+    for attempt in range(max_retries_429 + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            r = _SESSION.get(BASE_URL, params=params, headers=headers or None, timeout=timeout_s)
+            if r.status_code == 429:
+                wait_s = backoff_base_s * (2 ** attempt)
+                retry_after = r.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    wait_s = max(wait_s, int(retry_after))
+                logger.warning(
+                    "Semantic Scholar 429 for %r; waiting %.0fs then retry (%s/%s)",
+                    q, wait_s, attempt + 1, max_retries_429 + 1,
+                )
+                if limiter is not None:
+                    limiter.drain()
+                time.sleep(wait_s)
+                continue
+            r.raise_for_status()
+            # Parse the raw bytes (orjson when available) instead of r.json(): skips
+            # requests' charset detection and text decode of a 100-result payload
+            return fastjson.loads(r.content)
+        except requests.RequestException as e:
+            if attempt < max_retries_429 and getattr(e, "response", None) and getattr(e.response, "status_code", None) == 429:
+                wait_s = backoff_base_s * (2 ** attempt)
+                logger.warning("Semantic Scholar 429 for %r; waiting %.0fs then retry", q, wait_s)
+                if limiter is not None:
+                    limiter.drain()
+                time.sleep(wait_s)
+                continue
+            logger.warning("Semantic Scholar request failed for %r: %s", q, e)
+            break
+        except (ValueError, KeyError) as e:
+            logger.warning("Semantic Scholar response parse failed for %r: %s", q, e)
+            break
+    return None
+
+
+def _collect_items(q: str, data: dict[str, Any], seen_ids: set[str], all_papers: list[dict[str, Any]]) -> None:
+    """Append one query's results to all_papers in pipeline shape, skipping ids already seen."""
+    items = data.get("data") or []
+    for item in items:
+        paper_id = item.get("paperId")
+        if not paper_id:
+            continue
+        pid = f"semantic_scholar:{paper_id}"
+        if pid in seen_ids:
+            continue
+        seen_ids.add(pid)
+
+        title = (item.get("title") or "").strip()
+        if not title:
+            continue
+
+        authors_list = item.get("authors") or []
+        if isinstance(authors_list, list):
+            authors = [a.get("name") or "" for a in authors_list if isinstance(a, dict)]
+        else:
+            authors = []
+        year = item.get("year")
+        year_str = str(year) if year is not None else ""
+        published = f"{year_str}-01-01" if year_str else ""
+
+        abstract = (item.get("abstract") or "").strip() or "(No abstract)"
+
+        pdf_url = ""
+        oa = item.get("openAccessPdf")
+        if isinstance(oa, dict) and oa.get("url"):
+            pdf_url = (oa.get("url") or "").strip()
+
+        citation_count = item.get("citationCount")
+        if citation_count is not None and not isinstance(citation_count, int):
+            try:
+                citation_count = int(citation_count)
+            except (TypeError, ValueError):
+                citation_count = 0
+        elif citation_count is None:
+            citation_count = 0
+
+        all_papers.append({
+            "arxiv_id": pid,
+            "title": title,
+            "authors": authors,
+            "categories": [],
+            "published": published,
+            "abstract": abstract,
+            "pdf_url": pdf_url,
+            "source": "semantic_scholar",
+            "citation_count": citation_count,
+        })
+
+    logger.info("Semantic Scholar query %r: %d papers", q, len(items))
+
 
 def fetch_papers(
     queries: list[str],
@@ -36,12 +150,19 @@ def fetch_papers(
     backoff_base_s: float = DEFAULT_BACKOFF_BASE_S,
     api_key: str | None = None,
     user_agent: str | None = None,
+    max_workers: int = 1,
+    burst: int = 1,
 ) -> list[dict[str, Any]]:
     """
     Search Semantic Scholar for each query. API returns results in relevance order.
     If top_k_by_relevance is set: take first N by relevance, then sort by citationCount desc for processing order.
+    Later queries could only add papers past the first N, so they are not sent once N are collected.
     Returns list of dicts compatible with pipeline.
     On 429: retries with exponential backoff (and optional Retry-After).
+    Request starts (retries included) share one token bucket allowing a request every
+    delay_between_queries seconds on average; up to burst requests may go out back to back
+    before the spacing applies, and a 429 empties the bucket. With max_workers > 1, queries
+    run concurrently in waves so one query's latency overlaps the wait before the next.
 
     429 规避：无 API key 时全局限流约 100 次/5 分钟（共享）；带 key 后限流大幅放宽。
     建议：1) 申请 key 填 api_key  2) 无 key 时拉大 delay_between_queries 或减少 queries/limit。
@@ -56,105 +177,47 @@ def fetch_papers(
     if user_agent:
         headers["User-Agent"] = user_agent
 
-    for qi, q in enumerate(queries):
-        if qi > 0:
-            time.sleep(delay_between_queries)
-
-        params = {
-            "query": q,
-            "limit": min(fetch_limit, 100),
-            "fields": FIELDS,
-        }
-        data = None
-        for attempt in range(max_retries_429 + 1):
-            try:
-                r = requests.get(BASE_URL, params=params, headers=headers or None, timeout=timeout_s)
-                if r.status_code == 429:
-                    wait_s = backoff_base_s * (2 ** attempt)
-                    retry_after = r.headers.get("Retry-After")
-                    if retry_after and retry_after.isdigit():
-                        wait_s = max(wait_s, int(retry_after))
-                    logger.warning(
-                        "Semantic Scholar 429 for %r; waiting %.0fs then retry (%s/%s)",
-                        q, wait_s, attempt + 1, max_retries_429 + 1,
-                    )
-                    time.sleep(wait_s)
-                    continue
-                r.raise_for_status()
-                data = r.json()
-                break
-            except requests.RequestException as e:
-                if attempt < max_retries_429 and getattr(e, "response", None) and getattr(e.response, "status_code", None) == 429:
-                    wait_s = backoff_base_s * (2 ** attempt)
-                    logger.warning("Semantic Scholar 429 for %r; waiting %.0fs then retry", q, wait_s)
-                    time.sleep(wait_s)
-                    continue
-                logger.warning("Semantic Scholar request failed for %r: %s", q, e)
-                break
-            except (ValueError, KeyError) as e:
-                logger.warning("Semantic Scholar response parse failed for %r: %s", q, e)
+    top_k = top_k_by_relevance if top_k_by_relevance is not None and top_k_by_relevance > 0 else None
+    params_base = {"limit": min(fetch_limit, 100), "fields": FIELDS}
+    # Query starts (retries included) share one bucket: one request per delay_between_queries
+    limiter = (
+        TokenBucket.per_interval(delay_between_queries, capacity=max(1, burst))
+        if delay_between_queries > 0 else None
+    )
+    workers = max(1, min(max_workers, len(queries)))
+
+    def _search(q: str) -> dict[str, Any] | None:
+        return _search_query(
+            q, {**params_base, "query": q}, headers, timeout_s, max_retries_429, backoff_base_s, limiter,
+        )
+
+    # Queries run in waves of `workers`; results are merged in query order, so the top-K
+    # early stop and the output match the sequential path
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for wave_start in range(0, len(queries), workers):
+            if top_k is not None and len(all_papers) >= top_k:
+                logger.info(
+                    "Semantic Scholar: top %d already filled; skipping %d remaining queries",
+                    top_k, len(queries) - wave_start,
+                )
                 break
-
-        if data is None:
-            continue
-
-        items = data.get("data") or []
-        for item in items:
-            paper_id = item.get("paperId")
-            if not paper_id:
-                continue
-            pid = f"semantic_scholar:{paper_id}"
-            if pid in seen_ids:
-                continue
-            seen_ids.add(pid)
-
-            title = (item.get("title") or "").strip()
-            if not title:
-                continue
-
-            authors_list = item.get("authors") or []
-            if isinstance(authors_list, list):
-                authors = [a.get("name") or "" for a in authors_list if isinstance(a, dict)]
+            wave = queries[wave_start : wave_start + workers]
+            if executor is None:
+                results = [_search(q) for q in wave]
             else:
-                authors = []
-            year = item.get("year")
-            year_str = str(year) if year is not None else ""
-            published = f"{year_str}-01-01" if year_str else ""
-
-            abstract = (item.get("abstract") or "").strip() or "(No abstract)"
-
-            pdf_url = ""
-            oa = item.get("openAccessPdf")
-            if isinstance(oa, dict) and oa.get("url"):
-                pdf_url = (oa.get("url") or "").strip()
-
-            citation_count = item.get("citationCount")
-            if citation_count is not None and not isinstance(citation_count, int):
-                try:
-                    citation_count = int(citation_count)
-                except (TypeError, ValueError):
-                    citation_count = 0
-            elif citation_count is None:
-                citation_count = 0
-
-            all_papers.append({
-                "arxiv_id": pid,
-                "title": title,
-                "authors": authors,
-                "categories": [],
-                "published": published,
-                "abstract": abstract,
-                "pdf_url": pdf_url,
-                "source": "semantic_scholar",
-                "citation_count": citation_count,
-            })
-
-        logger.info("Semantic Scholar query %r: %d papers", q, len(items))
+                results = list(executor.map(_search, wave))
+            for q, data in zip(wave, results):
+                if data is not None:
+                    _collect_items(q, data, seen_ids, all_papers)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
 
     # Top-K by relevance (API order), then sort by citation for processing order
-    if top_k_by_relevance is not None and top_k_by_relevance > 0 and len(all_papers) > top_k_by_relevance:
-        all_papers = all_papers[:top_k_by_relevance]
-        logger.info("Semantic Scholar: took top %d by relevance", top_k_by_relevance)
+    if top_k is not None and len(all_papers) > top_k:
+        all_papers = all_papers[:top_k]
+        logger.info("Semantic Scholar: took top %d by relevance", top_k)
     all_papers.sort(key=lambda p: p.get("citation_count") or 0, reverse=True)
     logger.info("Semantic Scholar total papers fetched: %d (ordered by citation for processing)", len(all_papers))
     return all_papers
@@ -2,20 +2,43 @@
 Topic schema: load and validate topics from YAML.
 """
 
+import copy
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 import yaml
 
+# libyaml C parser when available (much faster than the pure-Python SafeLoader)
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-def load_topics(path: str | Path) -> list[dict[str, Any]]:
-    """Load topics from YAML. Expects key 'topics' with list of topic dicts."""
+
+def load_topics(path: str | Path | IO) -> list[dict[str, Any]]:
+    """Load topics from YAML. Expects key 'topics' with list of topic dicts.
+    Parsed results are cached per file and invalidated when its mtime or size changes;
+    each call returns a fresh copy that callers may modify. An open file-like object is
+    parsed directly, uncached.
+    """
+    if hasattr(path, "read"):
+        return _parse_topics(path.read())
     path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Topics file not found: {path}")
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Topics file not found: {path}") from None
+    return copy.deepcopy(_load_topics_cached(str(path.resolve()), st.st_mtime_ns, st.st_size))
+
+
+@lru_cache(maxsize=8)
+def _load_topics_cached(path: str, mtime_ns: int, size: int) -> list[dict[str, Any]]:
+    """Parse and validate topics; mtime_ns and size are only part of the cache key."""
+    # Bytes go to libyaml as-is (it detects UTF-8/BOM) instead of being decoded in Python first
+    with open(path, "rb") as f:
+        return _parse_topics(f.read())
+
 
-    with open(path, encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+def _parse_topics(raw: str | bytes) -> list[dict[str, Any]]:
+    data = yaml.load(raw, Loader=_YAML_LOADER)
     if not data or "topics" not in data:
         raise ValueError("Topics file must contain a 'topics' list")
 
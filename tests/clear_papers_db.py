@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 清空 papers 表中全部数据，便于重复测试 pipeline。
-用法: PYTHONPATH=. python tests/clear_papers_db.py [--config CONFIG] [--yes]
+用法: PYTHONPATH=. python tests/clear_papers_db.py [--config CONFIG] [--yes] [--drop]
 """
 
 import argparse
@@ -20,6 +20,7 @@ def main() -> int:
     parser = argparse.ArgumentParser(description="清空 papers 表数据（测试用）")
     parser.add_argument("--config", type=Path, default=REPO_ROOT / "config" / "config.yaml", help="config.yaml 路径")
     parser.add_argument("--yes", "-y", action="store_true", help="跳过确认直接清空")
+    parser.add_argument("--drop", action="store_true", help="DROP 后重建 papers 表（大表更快）")
     args = parser.parse_args()
 
     if not args.config.exists():
@@ -32,10 +33,11 @@ def main() -> int:
         print(f"数据库文件不存在: {db_path}", file=sys.stderr)
         return 1
 
+    # --yes 时只需判断是否为空，不必全表 COUNT
+    sql = "SELECT EXISTS(SELECT 1 FROM papers)" if args.yes else "SELECT COUNT(*) FROM papers"
     try:
         with db._conn(db_path) as conn:
-            cur = conn.execute("SELECT COUNT(*) FROM papers")
-            n = cur.fetchone()[0]
+            n = conn.execute(sql).fetchone()[0]
     except Exception as e:
         print(f"读取 papers 表失败: {e}", file=sys.stderr)
         return 1
@@ -52,9 +54,20 @@ def main() -> int:
             print("已取消")
             return 0
 
+    # 单个写事务内删除，删除条数取自 rowcount（无需再扫表）；随后 VACUUM 回收空闲页
     with db._conn(db_path) as conn:
-        conn.execute("DELETE FROM papers")
+        conn.execute("BEGIN IMMEDIATE")
+        if args.drop:
+            conn.execute("DROP TABLE papers")
+        else:
+            n = conn.execute("DELETE FROM papers").rowcount  # 无 WHERE 时 SQLite 走 truncate 优化
         conn.commit()
+        conn.execute("VACUUM")
+    if args.drop:
+        db.ensure_db(db_path)
+        if args.yes:
+            print(f"已清空 papers 表（DROP 后重建）: {db_path}")
+            return 0
     print(f"已清空 papers 表（共删除 {n} 条记录）: {db_path}")
     return 0
 
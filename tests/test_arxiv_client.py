@@ -0,0 +1,72 @@
+"""Tests for arXiv Atom feed parsing."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from src import arxiv_client
+
+_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/"
+      xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <opensearch:totalResults>2</opensearch:totalResults>
+  <entry>
+    <id>http://arxiv.org/abs/2401.12345v2</id>
+    <updated>2024-01-23T10:00:00Z</updated>
+    <published>2024-01-22T18:00:00Z</published>
+    <title>Fast   Approximate
+      Nearest Neighbours</title>
+    <summary>We study ANNS.</summary>
+    <author><name>Alice</name></author>
+    <author><name>Bob</name></author>
+    <link href="http://arxiv.org/abs/2401.12345v2" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.12345v2" rel="related" type="application/pdf"/>
+    <category term="cs.DB" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.IR" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>
+  <entry>
+    <id>http://arxiv.org/abs/2312.00001v1</id>
+    <updated>2023-12-01T00:00:00Z</updated>
+    <published>2023-12-01T00:00:00Z</published>
+    <title>Old</title>
+    <summary>Too old.</summary>
+    <author><name>Carol</name></author>
+    <category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>
+</feed>
+"""
+
+
+def test_parse_feed_filters_by_cutoff_and_normalizes():
+    cutoff = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    papers = arxiv_client._parse_feed(_FEED, cutoff)
+    assert len(papers) == 1
+    p = papers[0]
+    assert p["arxiv_id"] == "2401.12345v2"
+    assert p["title"] == "Fast Approximate Nearest Neighbours"
+    assert p["authors"] == ["Alice", "Bob"]
+    assert p["categories"] == ["cs.DB", "cs.IR"]
+    assert p["published"] == "2024-01-22T18:00:00+00:00"
+    assert p["pdf_url"] == "http://arxiv.org/pdf/2401.12345v2"
+    assert p["abstract"] == "We study ANNS."
+
+
+def test_parse_feed_empty_page_raises():
+    feed = _FEED.split(b"<entry>")[0] + b"</feed>"
+    with pytest.raises(RuntimeError):
+        arxiv_client._parse_feed(feed, datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+
+def test_fetch_papers_merges_cross_listed_categories(monkeypatch):
+    per_cat = {
+        "cs.DB": [{"arxiv_id": "2401.1", "categories": ["cs.DB", "cs.IR"]}],
+        "cs.IR": [
+            {"arxiv_id": "2401.1", "categories": ["cs.IR", "cs.LG"]},
+            {"arxiv_id": "2401.2", "categories": ["cs.IR"]},
+        ],
+    }
+    monkeypatch.setattr(arxiv_client, "_fetch_category", lambda cat, *a, **k: per_cat[cat])
+    papers = arxiv_client.fetch_papers(["cs.DB", "cs.IR"], 10, delay_between_categories=0)
+    assert [p["arxiv_id"] for p in papers] == ["2401.1", "2401.2"]
+    assert papers[0]["categories"] == ["cs.DB", "cs.IR", "cs.LG"]
+    assert papers[1]["categories"] == ["cs.IR"]
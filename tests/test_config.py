@@ -1,8 +1,7 @@
 """Tests for config loading and validation."""
 
+import io
 import os
-import tempfile
-from pathlib import Path
 
 import pytest
 import yaml
@@ -44,17 +43,70 @@ def test_load_config_missing_file():
 
 def test_load_config_env_override(monkeypatch):
     monkeypatch.setenv(ENV_MODEL_API_KEY, "env-key-123")
-    fd, path = tempfile.mkstemp(suffix=".yaml")
-    try:
-        with os.fdopen(fd, "w") as f:
-            yaml.safe_dump({
-                "arxiv": {"categories": ["cs.LG"], "max_results_per_category": 5},
-                "model": {"base_url": "http://x", "model_name": "m", "api_key": "file-key"},
-                "thresholds": {"relevance": 0.7},
-                "storage": {"db_path": "d", "pdf_dir": "p", "text_dir": "t", "save_text": False},
-                "email": {"smtp_host": "h", "smtp_port": 25, "from_addr": "a", "to_addr": "b", "use_tls": False},
-            }, f, default_flow_style=False)
-        cfg = load_config(path)
-        assert cfg["model"]["api_key"] == "env-key-123"
-    finally:
-        os.unlink(path)
+    stream = io.StringIO(yaml.safe_dump({
+        "arxiv": {"categories": ["cs.LG"], "max_results_per_category": 5},
+        "model": {"base_url": "http://x", "model_name": "m", "api_key": "file-key"},
+        "thresholds": {"relevance": 0.7},
+        "storage": {"db_path": "d", "pdf_dir": "p", "text_dir": "t", "save_text": False},
+        "email": {"smtp_host": "h", "smtp_port": 25, "from_addr": "a", "to_addr": "b", "use_tls": False},
+    }, default_flow_style=False))
+    cfg = load_config(stream)
+    assert cfg["model"]["api_key"] == "env-key-123"
+
+
+def test_load_config_cached_copy_is_independent(monkeypatch, tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump({
+        "arxiv": {"categories": ["cs.LG"], "max_results_per_category": 5},
+        "model": {"base_url": "http://x", "model_name": "m", "api_key": "file-key"},
+        "thresholds": {"relevance": 0.7},
+        "storage": {"db_path": "d", "pdf_dir": "p", "text_dir": "t", "save_text": False},
+        "email": {"smtp_host": "h", "smtp_port": 25, "from_addr": "a", "to_addr": "b", "use_tls": False},
+    }))
+    monkeypatch.setenv(ENV_MODEL_API_KEY, "env-key")
+    first = load_config(path)
+    assert first["model"]["api_key"] == "env-key"
+    first["thresholds"]["relevance"] = 0.1
+    # Env override and caller edits must not leak into later loads of the cached parse
+    monkeypatch.delenv(ENV_MODEL_API_KEY)
+    second = load_config(path)
+    assert second["model"]["api_key"] == "file-key"
+    assert second["thresholds"]["relevance"] == 0.7
+
+
+def test_load_config_cache_sees_same_mtime_edit(tmp_path):
+    path = tmp_path / "config.yaml"
+    cfg = {
+        "arxiv": {"categories": ["cs.LG"], "max_results_per_category": 5},
+        "model": {"base_url": "http://x", "model_name": "m"},
+        "thresholds": {"relevance": 0.7},
+        "storage": {"db_path": "d", "pdf_dir": "p", "text_dir": "t", "save_text": False},
+        "email": {"smtp_host": "h", "smtp_port": 25, "from_addr": "a", "to_addr": "b", "use_tls": False},
+    }
+    path.write_text(yaml.safe_dump(cfg))
+    st = path.stat()
+    assert load_config(path)["model"]["model_name"] == "m"
+    # Edit within the filesystem's mtime granularity: only the size tells the files apart
+    cfg["model"]["model_name"] = "other-model"
+    path.write_text(yaml.safe_dump(cfg))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert load_config(path)["model"]["model_name"] == "other-model"
+
+
+def test_validate_config_reports_all_missing_sections():
+    with pytest.raises(ValueError, match="model, storage, email"):
+        validate_config({"arxiv": {}, "thresholds": {}})
+
+
+def test_validate_config_rejects_max_results_over_api_cap():
+    c = {
+        "arxiv": {"categories": ["cs.LG"], "max_results_per_category": 2001},
+        "model": {"base_url": "http://x", "model_name": "m"},
+        "thresholds": {"relevance": 0.7},
+        "storage": {"db_path": "d", "pdf_dir": "p", "text_dir": "t"},
+        "email": {"smtp_host": "h", "smtp_port": 25, "from_addr": "a", "to_addr": "b"},
+    }
+    with pytest.raises(ValueError, match="max_results_per_category"):
+        validate_config(c)
+    c["arxiv"]["max_results_per_category"] = 2000
+    validate_config(c)
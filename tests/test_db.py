@@ -1,7 +1,9 @@
 """Tests for DB helpers."""
 
+import sqlite3
 import tempfile
 from pathlib import Path
+from uuid import uuid4
 
 import pytest
 
@@ -12,6 +14,27 @@ from src import db
 def db_path():
     with tempfile.TemporaryDirectory() as d:
         yield Path(d) / "test.db"
+        db.close_connections()
+
+
+@pytest.fixture(scope="session")
+def _template_conn():
+    """Schema built once per session; each test gets a page copy instead of rerunning the DDL."""
+    c = sqlite3.connect(":memory:")
+    db.ensure_db(c)
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def conn(_template_conn):
+    """In-memory DB: no file, journal or fsync; the db helpers use the connection directly."""
+    c = sqlite3.connect(f"file:test{uuid4().hex}?mode=memory&cache=shared", uri=True)
+    c.execute("PRAGMA journal_mode=MEMORY")
+    c.execute("PRAGMA synchronous=OFF")
+    _template_conn.backup(c)
+    yield c
+    c.close()
 
 
 def test_ensure_db(db_path):
@@ -20,39 +43,81 @@ def test_ensure_db(db_path):
     db.ensure_db(db_path)  # idempotent
 
 
-def test_upsert_and_status(db_path):
-    db.ensure_db(db_path)
-    db.upsert_paper_metadata(db_path, "2401.12345", "Test Title", "cs.LG", db.NEW)
-    assert db.get_status(db_path, "2401.12345") == db.NEW
-    db.upsert_paper_metadata(db_path, "2401.12345", "Updated Title", "cs.LG,cs.AI")
-    assert db.get_status(db_path, "2401.12345") == db.NEW
+def test_upsert_and_status(conn):
+    db.upsert_paper_metadata(conn, "2401.12345", "Test Title", "cs.LG", db.NEW)
+    assert db.get_status(conn, "2401.12345") == db.NEW
+    db.upsert_paper_metadata(conn, "2401.12345", "Updated Title", "cs.LG,cs.AI")
+    assert db.get_status(conn, "2401.12345") == db.NEW
 
 
-def test_mark_status(db_path):
-    db.ensure_db(db_path)
-    db.upsert_paper_metadata(db_path, "2401.11111", "T", "cs.LG", db.NEW)
-    db.mark_status(db_path, "2401.11111", db.STAGE1_OK, stage1_json='{"x":1}')
-    assert db.get_status(db_path, "2401.11111") == db.STAGE1_OK
-    row = db.get_paper(db_path, "2401.11111")
+def test_mark_status(conn):
+    db.upsert_paper_metadata(conn, "2401.11111", "T", "cs.LG", db.NEW)
+    db.mark_status(conn, "2401.11111", db.STAGE1_OK, stage1_json='{"x":1}')
+    assert db.get_status(conn, "2401.11111") == db.STAGE1_OK
+    row = db.get_paper(conn, "2401.11111")
     assert row is not None
     assert "stage1_json" in row and "x" in (row["stage1_json"] or "")
 
 
-def test_is_processed(db_path):
-    db.ensure_db(db_path)
-    db.upsert_paper_metadata(db_path, "a", "T", "c", db.NEW)
-    assert db.is_processed(db_path, "a") is False
-    db.mark_status(db_path, "a", db.EMAILED)
-    assert db.is_processed(db_path, "a") is True
-    assert db.is_processed(db_path, "nonexistent") is False
+def test_is_processed(conn):
+    db.upsert_paper_metadata(conn, "a", "T", "c", db.NEW)
+    assert db.is_processed(conn, "a") is False
+    db.mark_status(conn, "a", db.EMAILED)
+    assert db.is_processed(conn, "a") is True
+    assert db.is_processed(conn, "nonexistent") is False
 
 
-def test_is_in_progress_or_processed(db_path):
-    db.ensure_db(db_path)
-    assert db.is_in_progress_or_processed(db_path, "x") is False
+def test_is_in_progress_or_processed(conn):
+    assert db.is_in_progress_or_processed(conn, "x") is False
     # STAGE1_OK is resumable (not skipped), so we do not skip
-    db.upsert_paper_metadata(db_path, "x", "T", "c", db.STAGE1_OK)
-    assert db.is_in_progress_or_processed(db_path, "x") is False
+    db.upsert_paper_metadata(conn, "x", "T", "c", db.STAGE1_OK)
+    assert db.is_in_progress_or_processed(conn, "x") is False
     # EMAILED is processed, so we skip
-    db.mark_status(db_path, "x", db.EMAILED)
-    assert db.is_in_progress_or_processed(db_path, "x") is True
+    db.mark_status(conn, "x", db.EMAILED)
+    assert db.is_in_progress_or_processed(conn, "x") is True
+
+
+def test_upsert_many_and_bulk_mark_status(conn):
+    db.upsert_paper_metadata(conn, "old", "Old", "cs.LG", db.STAGE1_OK)
+    db.upsert_many(conn, [
+        ("old", "Old v2", "cs.LG,cs.AI", db.NEW),
+        ("p1", "P1", "cs.AI", db.NEW),
+        ("p2", "P2", "cs.AI", db.NEW),
+    ])
+    # Existing row keeps its status; only metadata is updated
+    assert db.get_status(conn, "old") == db.STAGE1_OK
+    assert db.get_paper(conn, "old")["title"] == "Old v2"
+    db.mark_status(conn, ["p1", "p2"], db.SKIPPED)
+    assert db.get_status(conn, "p1") == db.SKIPPED
+    assert db.get_status(conn, "p2") == db.SKIPPED
+
+
+def test_filter_done_ids_matches_single_lookup(conn):
+    for aid, status in [("e", db.EMAILED), ("s", db.STAGE1_OK), ("f1", db.NEW), ("f3", db.NEW)]:
+        db.upsert_paper_metadata(conn, aid, "T", "c", status)
+    db.mark_status(conn, "f1", db.FAILED)
+    for _ in range(db.MAX_RETRY_COUNT):
+        db.mark_status(conn, "f3", db.FAILED)
+    ids = ["e", "s", "f1", "f3", "missing"]
+    expected = {aid for aid in ids if db.is_in_progress_or_processed(conn, aid)}
+    assert db.filter_done_ids(conn, ids) == expected == {"e", "f3"}
+
+
+def test_upsert_many_1k_rows(conn):
+    rows = [(f"p{i}", f"T{i}", "cs.LG", db.NEW) for i in range(1000)]
+    db.upsert_many(conn, rows)
+    db.mark_status(conn, "p7", db.EMAILED)
+    db.upsert_many(conn, [(aid, title + "!", cats, db.NEW) for aid, title, cats, _ in rows])
+    assert conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0] == 1000
+    assert db.get_paper(conn, "p999")["title"] == "T999!"
+    assert db.get_status(conn, "p7") == db.EMAILED
+
+
+def test_filter_done_ids_across_chunks(conn):
+    ids = [f"p{i}" for i in range(1300)]
+    db.upsert_many(conn, [(aid, "T", "c", db.NEW) for aid in ids])
+    done = {aid for aid in ids[::97]} | {ids[-1]}
+    db.mark_status(conn, list(done), db.EMAILED)
+    assert db.filter_done_ids(conn, ids) == done
+    assert db.filter_done_ids(conn, ids[-3:]) == {ids[-1]}
+    assert db.filter_done_ids(conn, []) == set()
@@ -21,3 +21,81 @@ def test_format_email_body():
     assert "t1" in body and "t2" in body
     assert "2401.1" in body
     assert "JSON" not in body
+
+
+def test_send_digest_emails_reuses_connection_and_reconnects(monkeypatch):
+    import smtplib
+
+    connections = []
+
+    class FakeSMTP:
+        def __init__(self, host, port):
+            self.sent = []
+            connections.append(self)
+
+        def starttls(self, context=None):
+            pass
+
+        def login(self, user, password):
+            pass
+
+        def send_message(self, msg, from_addr, to_addrs):
+            # First connection drops after one message
+            if self is connections[0] and self.sent:
+                raise smtplib.SMTPServerDisconnected("gone")
+            self.sent.append(msg)
+
+        def quit(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(smtplib, "SMTP", FakeSMTP)
+    errors = emailer.send_digest_emails(
+        "smtp.example.com", 587, "u", "p", "a@example.com", "b@example.com", True,
+        [("s1", "b1"), ("s2", "b2"), ("s3", "b3")],
+    )
+    assert errors == [None, None, None]
+    assert len(connections) == 2
+    assert len(connections[0].sent) == 1 and len(connections[1].sent) == 2
+
+
+def test_send_digest_emails_replaces_stale_connection(monkeypatch):
+    import smtplib
+
+    connections = []
+
+    class FakeSMTP:
+        def __init__(self, host, port):
+            self.sent = []
+            connections.append(self)
+
+        def starttls(self, context=None):
+            pass
+
+        def login(self, user, password):
+            pass
+
+        def noop(self):
+            # Only the first connection has gone stale
+            return (421, b"timeout") if self is connections[0] else (250, b"ok")
+
+        def send_message(self, msg, from_addr, to_addrs):
+            self.sent.append(msg)
+
+        def quit(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(smtplib, "SMTP", FakeSMTP)
+    monkeypatch.setattr(emailer, "_SMTP_IDLE_CHECK_S", -1.0)
+    errors = emailer.send_digest_emails(
+        "smtp.example.com", 587, "u", "p", "a@example.com", "b@example.com", True,
+        [("s1", "b1"), ("s2", "b2"), ("s3", "b3")],
+    )
+    assert errors == [None, None, None]
+    assert len(connections) == 2
+    assert len(connections[0].sent) == 1 and len(connections[1].sent) == 2
@@ -0,0 +1,22 @@
+"""Tests for the orjson/stdlib JSON helpers."""
+
+import json
+
+import pytest
+
+from src import fastjson
+
+
+def test_loads_roundtrip_and_stdlib_errors():
+    assert fastjson.loads('{"a": [1, 2.5, "中文"]}') == {"a": [1, 2.5, "中文"]}
+    assert fastjson.loads(b'{"a": 1}') == {"a": 1}
+    with pytest.raises(json.JSONDecodeError, match="delimiter"):
+        fastjson.loads('{"a" 1}')
+
+
+def test_dumps_indent_matches_stdlib():
+    obj = {"title": "中文 title", "items": ["x", "y"], "n": 1, "nested": {"k": None}}
+    assert fastjson.dumps(obj, indent=True) == json.dumps(obj, ensure_ascii=False, indent=2)
+    assert json.loads(fastjson.dumps(obj)) == obj
+    # Non-str keys fall back to the stdlib
+    assert json.loads(fastjson.dumps({1: "a"})) == {"1": "a"}
@@ -0,0 +1,58 @@
+"""Tests for the persistent LLM reply cache."""
+
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from src import db, model_client
+from src.llm_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def db_path():
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "test.db"
+        db.ensure_db(path)
+        yield path
+        db.close_connections()
+
+
+MESSAGES = [{"role": "system", "content": "sys"}, {"role": "user", "content": "paper"}]
+
+
+def test_cache_key_depends_on_model_and_messages():
+    assert cache_key("m", 0, MESSAGES) == cache_key("m", 0.0, [dict(m) for m in MESSAGES])
+    assert cache_key("m", 0, MESSAGES) != cache_key("other", 0, MESSAGES)
+    assert cache_key("m", 0, MESSAGES) != cache_key("m", 0, MESSAGES[:1])
+    assert cache_key("m", 0, MESSAGES) != cache_key("m", 0.7, MESSAGES)
+
+
+def test_put_get_and_expiry(db_path):
+    cache = ResponseCache(db_path)
+    assert cache.get("m", 0, MESSAGES) is None
+    cache.put("m", 0, MESSAGES, '{"ok": 1}')
+    assert cache.get("m", 0, MESSAGES) == '{"ok": 1}'
+    assert cache.get("other", 0, MESSAGES) is None
+
+    with db._conn(db_path) as conn:
+        conn.execute("UPDATE llm_cache SET created_at = '2000-01-01 00:00:00'")
+        conn.commit()
+    assert cache.get("m", 0, MESSAGES) is None
+    ResponseCache(db_path)  # prunes expired rows on startup
+    assert db.get_cached_response(db_path, cache_key("m", 0, MESSAGES)) is None
+
+
+def test_chat_completion_returns_cached_reply_without_calling_api(db_path):
+    cache = ResponseCache(db_path)
+    cache.put("m", 0, MESSAGES, "cached")
+
+    class NoCallClient:
+        @property
+        def chat(self):
+            raise AssertionError("API should not be called on a cache hit")
+
+    reply = model_client.chat_completion(NoCallClient(), "m", MESSAGES, temperature=0, cache=cache)
+    assert reply == "cached" and isinstance(reply, model_client.CachedReply)
+    # Same prompt at another temperature is a different request
+    assert cache.get("m", 0.7, MESSAGES) is None
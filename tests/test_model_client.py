@@ -23,6 +23,12 @@ def test_parse_stage1_clamp_relevance():
     assert out["overall_relevance"] == 0.0
 
 
+def test_parse_stage1_non_numeric_relevance_is_zero():
+    raw = '{"paper_id":"x","topics":[{"topic_id":"a","relevance":NaN},{"topic_id":"b","relevance":"high"}]}'
+    out = model_client.parse_stage1_json(raw, "x")
+    assert [t["relevance"] for t in out["topics"]] == [0.0, 0.0]
+
+
 def test_parse_stage1_invalid_json():
     with pytest.raises(ValueError, match="JSON"):
         model_client.parse_stage1_json("not json", "x")
@@ -112,6 +118,39 @@ def test_parse_stage1_missing_colon():
     assert out["topics"][0]["relevance"] == 0.7
 
 
+def test_parse_stage1_json_keeps_backticks_and_braces_inside_strings():
+    """Strict JSON whose reason quotes code (`vLLM`, {x}) parses as-is, without repair."""
+    raw = (
+        '<think>ok</think>\n'
+        '{"paper_id": "2401.3", "topics": [{"topic_id": "llm-opt", "relevance": 0.6, '
+        '"reason": "extends `vLLM` with a {prefix} cache"}], "overall_relevance": 0.6, "decision": "keep"}'
+    )
+    out = model_client.parse_stage1_json(raw, "2401.3")
+    assert out["topics"][0]["reason"] == "extends `vLLM` with a {prefix} cache"
+    assert out["decision"] == "keep"
+
+
+def test_parse_stage1_batch_json_fenced_array():
+    """A batch reply wrapped in a markdown fence parses; the closing fence is ignored."""
+    raw = (
+        "```json\n"
+        '[{"paper_id": "a", "topics": [{"topic_id": "t", "relevance": 0.9}], "decision": "keep"},'
+        ' {"paper_id": "b", "topics": [], "decision": "drop"}]\n'
+        "```"
+    )
+    out = model_client.parse_stage1_batch_json(raw, [{"arxiv_id": "a"}, {"arxiv_id": "b"}])
+    assert [pid for pid, _ in out] == ["a", "b"]
+    assert out[0][1]["topics"][0]["relevance"] == 0.9
+
+
+def test_find_matching_close_nested_and_unbalanced():
+    """Bracket matching by find jumps: nested pairs balance, a missing close gives -1."""
+    s = 'x {"a": {"b": [1, {}]}, "c": 2} tail }'
+    assert model_client._find_matching_close(s, 2, "{", "}") == s.index(" tail") - 1
+    assert model_client._find_matching_close(s, s.index("["), "[", "]") == s.index("]")
+    assert model_client._find_matching_close('{"a": {', 0, "{", "}") == -1
+
+
 def test_parse_stage2_json():
     raw = '''{"paper_id":"2401.2","title":"T","categories":["cs.LG"],"problem":"P","motivation":"M","key_challenges":["C1"],"approach":"A","assumptions_limitations":[],"evidence_results":["E1"],"takeaways":["t1","t2","t3"]}'''
     out = model_client.parse_stage2_json(raw, "2401.2")
@@ -129,30 +168,254 @@ def test_build_stage1_prompt():
     assert "A Paper" in msgs[1]["content"]
 
 
-def test_call_local_llm():
-    """Call local LLM (vLLM) using config; requires server at base_url.
-    Uses model id from GET /v1/models when config id returns 404."""
+def test_stage1_prompts_share_prefix_across_papers():
+    topics = [{"id": "anns", "name": "ANNS", "description": "Nearest neighbor search", "keywords": []}]
+    a = {"arxiv_id": "2401.1", "title": "A Paper", "categories": ["cs.LG"], "abstract": "We propose..."}
+    b = {"arxiv_id": "2401.2", "title": "B Paper", "categories": ["cs.DB"], "abstract": "We study..."}
+    msgs_a = model_client.build_stage1_prompt(topics, a)
+    msgs_b = model_client.build_stage1_prompt(topics, b)
+    assert msgs_a[0] == msgs_b[0]
+    prefix = msgs_a[1]["content"].split("Paper:\n")[0]
+    assert prefix and msgs_b[1]["content"].startswith(prefix)
+    assert model_client.STAGE1_OUTPUT_SPEC in prefix
+
+
+def test_stage1_batch_prompts_share_prefix_across_batch_sizes():
+    topics = [{"id": "anns", "name": "ANNS", "description": "Nearest neighbor search", "keywords": []}]
+    papers = [{"arxiv_id": f"2401.{i}", "title": f"Paper {i}", "categories": [], "abstract": "..."} for i in range(3)]
+    one = model_client.build_stage1_batch_prompt(topics, papers[:1])
+    three = model_client.build_stage1_batch_prompt(topics, papers)
+    assert one[0] == three[0]
+    prefix = one[1]["content"].split("Papers to classify")[0]
+    assert three[1]["content"].startswith(prefix)
+    assert model_client.STAGE1_BATCH_OUTPUT_SPEC in prefix
+
+
+class _FlakyCompletions:
+    """Fake client.chat.completions: raises the queued errors, then answers."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.last_kwargs = kwargs
+        if self.errors:
+            raise self.errors.pop(0)
+        message = type("Msg", (), {"content": "ok", "reasoning": None})()
+        return type("Resp", (), {"choices": [type("Choice", (), {"message": message})()]})()
+
+
+def _fake_client(completions):
+    chat = type("Chat", (), {"completions": completions})()
+    return type("Client", (), {"chat": chat})()
+
+
+def _status_error(status):
+    import httpx
+    import openai
+
+    response = httpx.Response(status, request=httpx.Request("POST", "http://127.0.0.1/v1/chat/completions"))
+    return openai.APIStatusError("err", response=response, body=None)
+
+
+def test_chat_completion_retries_transient_errors():
+    completions = _FlakyCompletions([_status_error(503), _status_error(429)])
+    out = model_client.chat_completion(
+        _fake_client(completions), "m", [], base_delay=0.001, server_restart_wait_s=0,
+    )
+    assert out == "ok" and completions.calls == 3
+
+
+def test_chat_completion_does_not_retry_bad_request():
+    completions = _FlakyCompletions([_status_error(400)])
+    with pytest.raises(Exception):
+        model_client.chat_completion(
+            _fake_client(completions), "m", [], base_delay=0.001, server_restart_wait_s=0,
+        )
+    assert completions.calls == 1
+
+
+def test_chat_completion_passes_response_format_only_when_set():
+    completions = _FlakyCompletions([])
+    model_client.chat_completion(_fake_client(completions), "m", [], server_restart_wait_s=0)
+    assert "response_format" not in completions.last_kwargs
+    model_client.chat_completion(
+        _fake_client(completions), "m", [], server_restart_wait_s=0,
+        response_format={"type": "json_object"},
+    )
+    assert completions.last_kwargs["response_format"] == {"type": "json_object"}
+
+
+def test_chat_completion_raises_programming_errors_at_once():
+    completions = _FlakyCompletions([TypeError("bad kwargs")])
+    with pytest.raises(TypeError):
+        model_client.chat_completion(
+            _fake_client(completions), "m", [], base_delay=0.001, server_restart_wait_s=60,
+        )
+    assert completions.calls == 1
+
+
+def test_chat_completion_waits_on_limiter_each_attempt():
+    class RecordingLimiter:
+        def __init__(self):
+            self.acquired, self.drained = [], 0
+
+        def acquire(self, estimated_tokens=0):
+            self.acquired.append(estimated_tokens)
+
+        def drain(self):
+            self.drained += 1
+
+    limiter = RecordingLimiter()
+    completions = _FlakyCompletions([_status_error(429)])
+    messages = [{"role": "user", "content": "x" * 400}]
+    model_client.chat_completion(
+        _fake_client(completions), "m", messages, max_tokens=50,
+        base_delay=0.001, server_restart_wait_s=0, limiter=limiter,
+    )
+    assert len(limiter.acquired) == 2 and limiter.acquired[0] >= 150
+    assert limiter.drained == 1
+
+
+class _StreamingCompletions:
+    """Fake client.chat.completions for stream=True: yields the chunks, records how many were read."""
+
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.read = 0
+        self.closed = False
+        self.calls = 0
+        self.fail_after = fail_after  # {call number: exception raised after that many chunks}
+
+    def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        outer = self
+        self.calls += 1
+        fail = (self.fail_after or {}).get(self.calls)
+
+        class Stream:
+            def __iter__(self):
+                for n, text in enumerate(outer.chunks):
+                    if fail is not None and n == fail[0]:
+                        raise fail[1]
+                    outer.read += 1
+                    delta = type("Delta", (), {"content": text})()
+                    yield type("Chunk", (), {"choices": [type("Choice", (), {"delta": delta})()]})()
+
+            def close(self):
+                outer.closed = True
+
+        return Stream()
+
+
+def test_chat_completion_stops_stream_after_json_reply():
+    chunks = ["<think>try {x}</think>", '{"paper_id": "<arxiv_id>"} then ', '{"paper_id": "p", ',
+              '"reason": "a } in text"', "}", " That is my answer.", " More chatter."]
+    completions = _StreamingCompletions(chunks)
+    out = model_client.chat_completion(
+        _fake_client(completions), "m", [], server_restart_wait_s=0, stop_at_json_end=True,
+    )
+    assert completions.read == 5 and completions.closed
+    assert out.endswith('"reason": "a } in text"}')
+
+
+def test_chat_completion_retries_transport_error_mid_stream():
+    import httpx
+
+    completions = _StreamingCompletions(
+        ['{"paper_id": ', '"p"}'],
+        fail_after={1: (1, httpx.ReadTimeout("read timed out")), 2: (1, httpx.RemoteProtocolError("peer closed"))},
+    )
+    out = model_client.chat_completion(
+        _fake_client(completions), "m", [], max_retries=3, base_delay=0.001,
+        server_restart_wait_s=0, stop_at_json_end=True,
+    )
+    assert out == '{"paper_id": "p"}' and completions.calls == 3
+
+
+def test_chat_completion_polls_server_during_restart_wait(monkeypatch):
+    monkeypatch.setattr(model_client, "_RESTART_POLL_S", 0.01)
+    completions = _FlakyCompletions([_status_error(503), _status_error(503)])
+    client = _fake_client(completions)
+    probes = []
+
+    def list_models():
+        probes.append(1)
+        if len(probes) < 2:
+            raise ConnectionError("still down")
+
+    client.models = type("Models", (), {"list": staticmethod(list_models)})()
+    out = model_client.chat_completion(
+        client, "m", [], max_retries=2, base_delay=0.001, server_restart_wait_s=60,
+    )
+    # Returned after two probes, not after the full 60s wait
+    assert out == "ok" and len(probes) == 2 and completions.calls == 3
+
+
+@pytest.fixture(scope="session")
+def llm_config():
     config_path = Path(__file__).resolve().parent.parent / "config" / "config.yaml"
     if not config_path.exists():
         pytest.skip(f"Config not found: {config_path}")
-    config = load_config(config_path)
-    model_cfg = config["model"]
-    base_url = model_cfg["base_url"].rstrip("/")
-    model_name = model_cfg["model_name"]
-    api_key = model_cfg.get("api_key") or "dummy"
-    timeout_s = model_cfg.get("timeout_s", 60)
+    return load_config(config_path)["model"]
 
+
+@pytest.fixture(scope="session")
+def llm_client(llm_config):
+    """One OpenAI client (and its httpx pool) for every live-LLM test in the session."""
     from openai import OpenAI
     client = OpenAI(
-        base_url=base_url,
-        api_key=api_key,
-        timeout=timeout_s,
+        base_url=llm_config["base_url"].rstrip("/"),
+        api_key=llm_config.get("api_key") or "dummy",
+        timeout=llm_config.get("timeout_s", 60),
+        max_retries=0,
     )
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def http_session():
+    import requests
+    with requests.Session() as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def llm_server(llm_config, http_session):
+    """Probe the server once (2s) so an absent one skips at once instead of paying timeout_s x retries."""
+    import requests
+    base_url = llm_config["base_url"].rstrip("/")
+    try:
+        http_session.get(f"{base_url}/models", timeout=2)
+    except requests.RequestException as e:
+        pytest.skip(f"Local LLM not reachable at {base_url}: {e}")
+    return base_url
+
+
+def _discover_model(session, base_url: str) -> str | None:
+    """First model id served at GET {base_url}/models, or None if unavailable."""
+    r = session.get(f"{base_url}/models", timeout=10)
+    if r.status_code != 200:
+        return None
+    models = r.json().get("data") or []
+    return models[0]["id"] if models else None
+
+
+@pytest.mark.xdist_group("local_llm")  # one worker talks to the LLM server
+def test_call_local_llm(llm_config, llm_server, llm_client, http_session):
+    """Call local LLM (vLLM) using config; requires server at base_url.
+    Uses model id from GET /v1/models when config id returns 404."""
+    base_url = llm_server
+    model_name = llm_config["model_name"]
+    timeout_s = llm_config.get("timeout_s", 60)
     messages = [{"role": "user", "content": "Reply with exactly: OK"}]
 
     try:
         reply = model_client.chat_completion(
-            client,
+            llm_client,
             model_name=model_name,
             messages=messages,
             temperature=0,
@@ -162,17 +425,11 @@ def test_call_local_llm():
         )
     except Exception as e:
         if "404" in str(e) or "does not exist" in str(e):
-            import requests
-            r = requests.get(f"{base_url}/models", timeout=10)
-            if r.status_code != 200:
+            model_name = _discover_model(http_session, base_url)
+            if model_name is None:
                 pytest.skip(f"Local LLM not available: {e}")
-            data = r.json()
-            models = data.get("data") or []
-            if not models:
-                pytest.skip(f"No models listed at {base_url}/models")
-            model_name = models[0]["id"]
             reply = model_client.chat_completion(
-                client,
+                llm_client,
                 model_name=model_name,
                 messages=messages,
                 temperature=0,
@@ -0,0 +1,106 @@
+"""Tests for PDF text extraction helpers."""
+
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from src import pdf_utils
+
+fitz = pytest.importorskip("fitz")
+
+
+def _make_pdf(path: Path, pages: list[str]) -> None:
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=6)
+    doc.save(str(path))
+    doc.close()
+
+
+def test_extract_text_stops_after_references_with_same_result():
+    body = "\n".join(f"Body line {i} of the paper." for i in range(60))
+    pages = [f"Page {n}\n{body}" for n in range(4)]
+    pages.append("1 Conclusion\nWe conclude.\nReferences\n[1] A. Author. Title.")
+    pages += [f"Appendix {n}\n{body}" for n in range(4)]
+    with tempfile.TemporaryDirectory() as d:
+        pdf = Path(d) / "p.pdf"
+        _make_pdf(pdf, pages)
+        full = pdf_utils.extract_text_fitz(pdf)
+        early = pdf_utils.extract_text_fitz(pdf, max_chars=2000)
+        assert "Appendix" in full and "Appendix" not in early
+        assert pdf_utils.extract_text(pdf, max_chars=2000) == pdf_utils.extract_key_sections(full, 2000)
+        # Short cap never reached: whole document is read
+        assert pdf_utils.extract_text_fitz(pdf, max_chars=10 ** 6) == full
+
+        # Boundary: text through the References page is exactly max_chars long (or one less),
+        # so it is not over the cap yet and reading must go on
+        doc = fitz.open(pdf)
+        through_refs = "\n\n".join(t for page in list(doc)[:5] for t in pdf_utils._page_text_parts(page))
+        doc.close()
+        for cap in (len(through_refs), len(through_refs) - 1):
+            assert pdf_utils.extract_text(pdf, max_chars=cap) == pdf_utils.extract_key_sections(full, cap)
+
+
+def test_extract_text_finds_late_references_header_across_pages():
+    body = "\n".join(f"Body line {i} of the paper." for i in range(60))
+    # Cap is passed on page 1; the header closes page 6, so its trailing newline only
+    # appears once page 7's text is joined after it
+    pages = [f"Page {n}\n{body}" for n in range(6)]
+    pages.append(f"Page 6\n{body}\nReferences")
+    pages += [f"Appendix {n}\n{body}" for n in range(4)]
+    with tempfile.TemporaryDirectory() as d:
+        pdf = Path(d) / "p.pdf"
+        _make_pdf(pdf, pages)
+        full = pdf_utils.extract_text_fitz(pdf)
+        early = pdf_utils.extract_text_fitz(pdf, max_chars=2000)
+        assert "Appendix 0" in early and "Appendix 1" not in early
+        for cap in (500, 2000, 8000):
+            assert pdf_utils.extract_text(pdf, max_chars=cap) == pdf_utils.extract_key_sections(full, cap)
+
+
+def test_extract_key_sections_cuts_on_line_boundaries():
+    lines = [f"line {i:04d} " + "x" * 70 for i in range(400)]
+    text = "\n".join(lines)
+    out = pdf_utils.extract_key_sections(text, 8000)
+    head, _, tail = out.partition("\n\n[...中间内容已省略...]\n\n")
+    assert len(out) <= 8000 + 40
+    # Both kept parts consist of whole lines only
+    assert set(head.split("\n")) <= set(lines)
+    assert set(tail.split("\n")) <= set(lines)
+    assert tail.endswith(lines[-1])
+
+
+def test_download_pdfs_reports_each_download_as_it_finishes(monkeypatch, tmp_path):
+    def fake_download(url, save_path, **kwargs):
+        if "bad" in url:
+            raise OSError("404")
+
+    monkeypatch.setattr(pdf_utils, "download_pdf", fake_download)
+    jobs = [("http://x/a.pdf", tmp_path / "a.pdf"), ("http://x/bad.pdf", tmp_path / "bad.pdf")]
+    seen = []
+    results = pdf_utils.download_pdfs(jobs, max_workers=2, on_done=lambda p, e: seen.append((p.name, e is None)))
+    assert sorted(seen) == [("a.pdf", True), ("bad.pdf", False)]
+    assert results[tmp_path / "a.pdf"] is None
+
+
+def test_extract_text_reuses_cached_text_for_identical_pdf(monkeypatch, tmp_path):
+    a, b = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    _make_pdf(a, ["Introduction\nSame paper body."])
+    b.write_bytes(a.read_bytes())  # same PDF saved under another id
+    cache = tmp_path / "cache"
+    first = pdf_utils.extract_text(a, cache_dir=cache)
+    monkeypatch.setattr(pdf_utils, "extract_text_fitz", lambda *args, **kw: pytest.fail("PDF parsed again"))
+    assert pdf_utils.extract_text(b, cache_dir=cache) == first
+    assert "Same paper body." in first
+
+
+def test_download_pdfs_per_host_cap_is_configurable(monkeypatch, tmp_path):
+    # All four downloads hit one host; they only meet at the barrier if the cap admits four at once
+    barrier = threading.Barrier(4, timeout=5)
+    monkeypatch.setattr(pdf_utils, "download_pdf", lambda url, save_path, **kwargs: barrier.wait())
+    jobs = [(f"https://arxiv.org/pdf/{i}", tmp_path / f"{i}.pdf") for i in range(4)]
+    results = pdf_utils.download_pdfs(jobs, max_workers=4, max_per_host=4)
+    assert all(err is None for err in results.values())
@@ -0,0 +1,259 @@
+"""Tests for pipeline pre-filter helpers and run_pipeline with the network faked out."""
+
+import json
+import re
+import threading
+import time
+
+import pytest
+import yaml
+
+from src import arxiv_client, db, emailer, model_client, pdf_utils, pipeline
+
+
+TOPICS = [
+    {"id": "a", "keywords": ["KV cache", "KV cache compression", "vLLM"]},
+    {"id": "b", "keywords": ["kv cache offloading", "Speculative Decoding"]},
+]
+
+
+def test_keyword_set_drops_subsumed_keywords():
+    assert pipeline._build_keyword_set(TOPICS) == {"kv cache", "vllm", "speculative decoding"}
+
+
+def test_has_keyword_match_is_case_insensitive_substring():
+    kws = pipeline._build_keyword_set(TOPICS)
+    assert pipeline._has_keyword_match({"title": "Fast KV Cache Compression", "abstract": ""}, kws)
+    assert pipeline._has_keyword_match({"title": "", "abstract": "built on top of vLLM."}, kws)
+    assert not pipeline._has_keyword_match({"title": "Graph learning", "abstract": "molecules"}, kws)
+
+
+def test_keyword_automaton_agrees_with_substring_scan():
+    pytest.importorskip("ahocorasick")
+    kws = pipeline._build_keyword_set(TOPICS)
+    automaton = pipeline._build_keyword_automaton(kws)
+    for paper in (
+        {"title": "Fast KV Cache Compression", "abstract": ""},
+        {"title": "Graph learning", "abstract": "molecules"},
+        {"title": "", "abstract": "speculative decoding in vllm"},
+    ):
+        assert pipeline._has_keyword_match(paper, kws, automaton) == pipeline._has_keyword_match(paper, kws)
+
+
+# ── run_pipeline with arXiv, LLM and SMTP faked ───────────────────────────────
+
+ABSTRACT = "LLM serving with a paged KV cache. " * 20  # long enough for the abstract-only path
+
+
+def _paper(pid, title=None, abstract=ABSTRACT):
+    return {
+        "arxiv_id": pid, "title": title or f"Paper {pid}", "authors": ["A"], "categories": ["cs.DC"],
+        "published": "2024-01-01T00:00:00+00:00", "updated": "", "abstract": abstract,
+        "pdf_url": f"http://x/{pid}.pdf",
+    }
+
+
+def _stage1(pid, relevance=0.95):
+    return {
+        "paper_id": pid, "topics": [{"topic_id": "llm", "relevance": relevance, "reason": "r"}],
+        "overall_relevance": relevance, "decision": "keep",
+    }
+
+
+class FakeLLM:
+    """Replaces model_client.chat_completion; records each call as (kind, paper ids)."""
+
+    def __init__(self, batch_reply=None, stage2_delay=None):
+        self.calls: list[tuple[str, list[str]]] = []
+        self.stage2_messages: dict[str, list[dict[str, str]]] = {}
+        self.lock = threading.Lock()
+        # batch_reply(ids) -> ids to answer for, or None for an unparseable reply
+        self.batch_reply = batch_reply or (lambda ids: ids)
+        self.stage2_delay = stage2_delay or (lambda pid: 0)
+
+    def __call__(self, client, model_name, messages, **kwargs):
+        system, user = messages[0]["content"], messages[-1]["content"]
+        if system == model_client.STAGE1_BATCH_SYSTEM_PROMPT:
+            ids = re.findall(r'^Paper \d+ \(id: "([^"]+)"\)', user, re.MULTILINE)
+            self._record("batch", ids)
+            answered = self.batch_reply(ids)
+            return "not json" if answered is None else json.dumps([_stage1(pid) for pid in answered])
+        pid = re.search(r"Title: Paper (\w+)", user).group(1)
+        if system == model_client.STAGE1_SYSTEM_PROMPT:
+            self._record("single", [pid])
+            return json.dumps(_stage1(pid))
+        self._record("stage2", [pid])
+        self.stage2_messages[pid] = messages
+        time.sleep(self.stage2_delay(pid))
+        return json.dumps({"title": f"Paper {pid}", "problem": "p", "approach": "a", "takeaways": ["t"]})
+
+    def _record(self, kind, ids):
+        with self.lock:
+            self.calls.append((kind, ids))
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """run(papers, fake_llm, thresholds=None, **model_cfg) -> (stats, paper ids in digest order, db_path)."""
+    db_path = tmp_path / "data" / "arxiv.db"
+    topics_path = tmp_path / "topics.yaml"
+    topics_path.write_text(yaml.safe_dump({"topics": [
+        {"id": "llm", "name": "LLM systems", "description": "LLM serving", "keywords": ["KV cache"]},
+    ]}))
+
+    def _run(papers, fake_llm, thresholds=None, **model_cfg):
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(yaml.safe_dump({
+            "arxiv": {"categories": ["cs.DC"], "max_results_per_category": 10},
+            "model": {"base_url": "http://127.0.0.1:1/v1", "model_name": "m", "cache_ttl_days": 0, **model_cfg},
+            "thresholds": {"relevance": 0.6, **(thresholds or {})},
+            "storage": {
+                "db_path": str(db_path), "pdf_dir": str(tmp_path / "pdfs"),
+                "text_dir": str(tmp_path / "text"), "save_text": False,
+            },
+            "email": {"smtp_host": "h", "smtp_port": 25, "from_addr": "a", "to_addr": "b", "use_tls": False},
+        }))
+        digest_ids: list[str] = []
+        real_format = emailer.format_html_digest
+
+        def format_digest(summaries, *args, **kwargs):
+            digest_ids.extend(s["paper_id"] for s in summaries)
+            return real_format(summaries, *args, **kwargs)
+
+        monkeypatch.setattr(arxiv_client, "fetch_papers", lambda **kw: [dict(p) for p in papers])
+        monkeypatch.setattr(model_client, "chat_completion", fake_llm)
+        monkeypatch.setattr(emailer, "format_html_digest", format_digest)
+        monkeypatch.setattr(emailer, "send_digest_emails", lambda messages, **kw: [None] * len(messages))
+        stats = pipeline.run_pipeline(config_path, topics_path)
+        return stats, digest_ids, db_path
+
+    return _run
+
+
+def test_batch_leftovers_are_rebatched_once(run):
+    papers = [_paper(f"p{i}") for i in range(4)]
+    llm = FakeLLM(batch_reply=lambda ids: ids[:2] if len(ids) == 4 else ids)
+    stats, digest, _ = run(papers, llm, stage1_batch_size=4)
+    assert llm.calls[:2] == [("batch", ["p0", "p1", "p2", "p3"]), ("batch", ["p2", "p3"])]
+    assert stats["stage1_failed"] == 0 and stats["stage2_ok"] == 4
+
+
+def test_failed_batch_of_four_is_split_in_halves(run):
+    papers = [_paper(f"p{i}") for i in range(4)]
+    llm = FakeLLM(batch_reply=lambda ids: None if len(ids) == 4 else ids)
+    stats, _, _ = run(papers, llm, stage1_batch_size=4)
+    stage1_calls = [c for c in llm.calls if c[0] != "stage2"]
+    assert stage1_calls == [
+        ("batch", ["p0", "p1", "p2", "p3"]), ("batch", ["p0", "p1"]), ("batch", ["p2", "p3"]),
+    ]
+    assert stats["stage2_ok"] == 4
+
+
+def test_failed_small_batch_falls_back_to_single_calls(run):
+    papers = [_paper(f"p{i}") for i in range(3)]
+    llm = FakeLLM(batch_reply=lambda ids: None)
+    stats, _, _ = run(papers, llm, stage1_batch_size=3)
+    stage1_calls = [c for c in llm.calls if c[0] != "stage2"]
+    assert stage1_calls == [("batch", ["p0", "p1", "p2"])] + [("single", [f"p{i}"]) for i in range(3)]
+    assert stats["stage1_failed"] == 0 and stats["stage2_ok"] == 3
+
+
+def test_parallel_stage2_keeps_queue_order(run):
+    papers = [_paper(f"p{i}") for i in range(4)]
+    # Earlier papers finish last
+    llm = FakeLLM(stage2_delay=lambda pid: 0.05 * (4 - int(pid[1:])))
+    stats, digest, _ = run(papers, llm, stage2_workers=4)
+    assert digest == ["p0", "p1", "p2", "p3"]
+    assert stats["stage2_ok"] == 4
+
+
+def test_run_pipeline_closes_its_db_connection(run):
+    run([_paper("p0")], FakeLLM())
+    assert not getattr(db._local, "conns", None)
+
+
+def test_duplicate_content_is_classified_once(run):
+    papers = [_paper("p0", title="Paper p0: KV cache"), _paper("p1", title="paper P0 -- KV cache!")]
+    llm = FakeLLM()
+    stats, digest, db_path = run(papers, llm)
+    assert stats["skipped_duplicate"] == 1
+    assert [c for c in llm.calls if c[0] == "single"] == [("single", ["p0"])]
+    assert db.get_status(db_path, "p1") == db.SKIPPED
+    assert digest == ["p0"]
+
+
+def test_stage2_text_is_cut_to_fit_context_tokens(run):
+    paper = _paper("p0", abstract=ABSTRACT * 20)  # ~14k chars, sent whole on the abstract-only path
+    llm = FakeLLM()
+    stats, _, _ = run([paper], llm, stage2_max_tokens=100, context_tokens=2000)
+    messages = llm.stage2_messages["p0"]
+    assert model_client.estimate_tokens(messages) + 100 <= 2000 + 50
+    assert stats["stage2_ok"] == 1
+
+
+def test_stage1_checkpoint_is_reused_only_for_the_same_topics(run):
+    llm = FakeLLM()
+    _, _, db_path = run([_paper("p0")], llm)
+    for pid, saved_hash in (("p1", "other-topics"), ("p2", None)):
+        db.upsert_paper_metadata(db_path, pid, f"Paper {pid}", "cs.DC")
+        db.mark_status(db_path, pid, db.STAGE1_OK, stage1_json=json.dumps(_stage1(pid)), topics_hash=saved_hash)
+    llm = FakeLLM()
+    stats, _, _ = run([_paper("p1"), _paper("p2")], llm)
+    # p1 was classified against another topic set; p2 predates topics_hash and is trusted
+    assert [c for c in llm.calls if c[0] == "single"] == [("single", ["p1"])]
+    assert db.get_paper(db_path, "p1")["topics_hash"] == pipeline._topics_hash(
+        [{"id": "llm", "name": "LLM systems", "description": "LLM serving"}]
+    )
+    assert stats["stage2_ok"] == 2
+
+
+def test_unparseable_reply_is_repaired_by_repair_model(run):
+    class RepairLLM(FakeLLM):
+        def __init__(self):
+            super().__init__()
+            self.models: list[str] = []
+
+        def __call__(self, client, model_name, messages, **kwargs):
+            self.models.append(model_name)
+            if messages[0]["content"].startswith("Return only valid JSON"):
+                return json.dumps(_stage1("p0"))
+            if messages[0]["content"] == model_client.STAGE1_SYSTEM_PROMPT:
+                return "no json here"
+            return super().__call__(client, model_name, messages, **kwargs)
+
+    llm = RepairLLM()
+    stats, _, _ = run([_paper("p0")], llm, repair_model_name="small")
+    assert llm.models == ["m", "small", "m"]  # Stage 1, its repair, Stage 2
+    assert stats["stage1_failed"] == 0 and stats["stage2_ok"] == 1
+
+
+def test_borderline_papers_skip_pdf_with_abstract_only_below(run, monkeypatch):
+    class ScoredLLM(FakeLLM):
+        def __call__(self, client, model_name, messages, **kwargs):
+            if messages[0]["content"] == model_client.STAGE1_SYSTEM_PROMPT:
+                pid = re.search(r"Title: Paper (\w+)", messages[-1]["content"]).group(1)
+                return json.dumps(_stage1(pid, relevance=0.65 if pid == "p0" else 0.8))
+            return super().__call__(client, model_name, messages, **kwargs)
+
+    fetched = []
+    monkeypatch.setattr(pdf_utils, "download_pdf", lambda url, path, **kw: path)
+    monkeypatch.setattr(pipeline, "_get_full_text", lambda paper, *a, **kw: fetched.append(paper["arxiv_id"]) or "text")
+    stats, _, _ = run([_paper("p0"), _paper("p1")], ScoredLLM(), thresholds={"abstract_only_below": 0.7})
+    # p0 is borderline (0.6 <= 0.65 < 0.7): summarized from its abstract, no PDF
+    assert fetched == ["p1"]
+    assert stats["abstract_only"] == 1 and stats["stage2_ok"] == 2
+
+
+def test_next_pdf_is_downloaded_during_current_stage2(run, monkeypatch):
+    downloads = []
+
+    def failing_download(url, path, **kwargs):
+        downloads.append((path.stem, threading.current_thread() is threading.main_thread()))
+        raise OSError("offline")
+
+    monkeypatch.setattr(pdf_utils, "download_pdf", failing_download)
+    short = "LLM serving with a paged KV cache. " * 3  # too short for the abstract-only path
+    stats, _, _ = run([_paper("p0", abstract=short), _paper("p1", abstract=short)], FakeLLM())
+    # p1 is fetched in the background while p0 is summarized, and its failure is not retried
+    assert sorted(downloads) == [("p0", True), ("p1", False)]
+    assert stats["stage2_ok"] == 2
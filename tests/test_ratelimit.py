@@ -0,0 +1,38 @@
+"""Tests for the token-bucket rate limiter."""
+
+import time
+
+import pytest
+
+from src.ratelimit import LLMRateLimiter, TokenBucket
+
+
+def test_token_bucket_burst_then_throttle():
+    bucket = TokenBucket(rate=20.0, capacity=2)
+    t0 = time.monotonic()
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    bucket.acquire()
+    bucket.acquire()
+    # Two tokens beyond the burst at 20/s -> at least ~0.1s total
+    assert time.monotonic() - t0 >= 0.09
+
+
+def test_token_bucket_drain():
+    bucket = TokenBucket.per_interval(0.05)
+    bucket.drain()
+    assert bucket.acquire() > 0
+
+
+def test_token_bucket_rejects_bad_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_llm_rate_limiter_tokens_per_minute():
+    limiter = LLMRateLimiter(tpm=600)  # 10 tokens/s, one minute of burst
+    assert limiter.acquire(600) == 0.0
+    t0 = time.monotonic()
+    limiter.acquire(1)
+    assert time.monotonic() - t0 >= 0.05
+    assert LLMRateLimiter().acquire(10 ** 6) == 0.0
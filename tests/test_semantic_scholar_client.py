@@ -0,0 +1,69 @@
+"""Tests for the Semantic Scholar search client (HTTP faked)."""
+
+import json
+import threading
+import time
+
+from src import semantic_scholar_client
+
+
+class _Response:
+    status_code = 200
+    headers: dict[str, str] = {}
+
+    def __init__(self, items):
+        self.content = json.dumps({"data": items}).encode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+
+def _items(prefix, n):
+    return [{"paperId": f"{prefix}{i}", "title": f"Title {prefix}{i}", "citationCount": i} for i in range(n)]
+
+
+def test_fetch_stops_querying_once_top_k_is_filled(monkeypatch):
+    queries = []
+
+    def fake_get(url, params=None, **kwargs):
+        queries.append(params["query"])
+        return _Response(_items(params["query"], 3))
+
+    monkeypatch.setattr(semantic_scholar_client._SESSION, "get", fake_get)
+    papers = semantic_scholar_client.fetch_papers(
+        ["a", "b", "c"], top_k_by_relevance=3, delay_between_queries=0,
+    )
+    assert queries == ["a"]
+    # Top-K kept in relevance order, then sorted by citations
+    assert [p["arxiv_id"] for p in papers] == [f"semantic_scholar:a{i}" for i in (2, 1, 0)]
+
+
+def test_concurrent_queries_merge_in_query_order(monkeypatch):
+    queries = []
+    lock = threading.Lock()
+
+    def fake_get(url, params=None, **kwargs):
+        q = params["query"]
+        time.sleep(0.05 if q == "a" else 0)  # first query answers last
+        with lock:
+            queries.append(q)
+        return _Response(_items(q, 2))
+
+    monkeypatch.setattr(semantic_scholar_client._SESSION, "get", fake_get)
+    papers = semantic_scholar_client.fetch_papers(
+        ["a", "b", "c", "d"], top_k_by_relevance=3, delay_between_queries=0, max_workers=2,
+    )
+    # One wave of two queries fills top 3; the second wave is never sent
+    assert sorted(queries) == ["a", "b"]
+    assert {p["arxiv_id"] for p in papers} == {"semantic_scholar:a0", "semantic_scholar:a1", "semantic_scholar:b0"}
+
+
+def test_burst_lets_first_queries_skip_the_delay(monkeypatch):
+    monkeypatch.setattr(
+        semantic_scholar_client._SESSION, "get",
+        lambda url, params=None, **kwargs: _Response(_items(params["query"], 1)),
+    )
+    start = time.monotonic()
+    papers = semantic_scholar_client.fetch_papers(["a", "b", "c"], delay_between_queries=30, burst=3)
+    assert time.monotonic() - start < 5
+    assert len(papers) == 3